@@ -0,0 +1,83 @@
+# benchmarks/copy_vs_read_sql.py
+"""
+Benchmark the COPY-based extraction against pd.read_sql_query on a synthetic xdr_data
+table.
+
+Runs against the local PostgreSQL configured through the DB_* environment variables:
+
+    python benchmarks/copy_vs_read_sql.py --rows 1000000 --repeat 3
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from synthetic_xdr import generate_xdr_data, load_into_postgres
+from db_connection import get_connection
+from load_data import load_data_from_postgres
+
+
+def time_load(query, method, repeat):
+    """
+    Time load_data_from_postgres for one method and report the best wall time and peak
+    Python memory.
+    """
+    timings = []
+    peak = 0
+    rows = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = load_data_from_postgres(query, method=method)
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        rows = len(df)
+        del df
+    return min(timings), peak, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=1000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per method, the best one is reported",
+    )
+    parser.add_argument(
+        "--table",
+        default="xdr_data_benchmark",
+        help="Table to (re)create for the benchmark",
+    )
+    parser.add_argument(
+        "--skip-load", action="store_true", help="Reuse an already loaded table"
+    )
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        print(
+            f"Generating and loading {args.rows:,} synthetic rows into {args.table}..."
+        )
+        with get_connection() as connection:
+            load_into_postgres(
+                connection, generate_xdr_data(args.rows), table=args.table
+            )
+
+    query = f"SELECT * FROM {args.table}"
+    print(f"{'method':<10}{'rows':>12}{'best (s)':>12}{'peak (MB)':>12}")
+    results = {}
+    for method in ("read_sql", "copy"):
+        seconds, peak, rows = time_load(query, method, args.repeat)
+        results[method] = seconds
+        print(f"{method:<10}{rows:>12,}{seconds:>12.2f}{peak / 2**20:>12.1f}")
+    print(f"speedup: {results['read_sql'] / results['copy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
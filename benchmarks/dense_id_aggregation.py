@@ -0,0 +1,104 @@
+# benchmarks/dense_id_aggregation.py
+"""
+Benchmark the engagement aggregation with a pandas hash groupby against NumPy bincount
+reductions over dense MSISDN codes, on synthetic sessions held in memory (no database
+needed):
+
+    python benchmarks/dense_id_aggregation.py --rows 10000000 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+
+from id_encoding import encode_ids, aggregate_by_codes  # noqa: E402
+from new_engagement_analysis import aggregate_metrics, ENGAGEMENT_METRICS  # noqa: E402
+
+
+def generate_sessions(n_rows, n_users=None, seed=42, null_fraction=0.01):
+    """
+    Generate the engagement columns of xdr_data with the dtypes pandas infers from the
+    database (float64 MSISDNs with missing values).
+    """
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(1, int(n_rows / 1.5))
+    msisdn = (33600000000 + rng.integers(0, n_users, n_rows)).astype("float64")
+    msisdn[rng.random(n_rows) < null_fraction] = np.nan
+    return pd.DataFrame(
+        {
+            "MSISDN/Number": msisdn,
+            "Bearer Id": rng.integers(0, 2**53, n_rows).astype("float64"),
+            "Dur. (ms)": rng.integers(7000, 1900000, n_rows).astype("float64"),
+            "Total DL (Bytes)": rng.uniform(8e6, 9e8, n_rows),
+            "Total UL (Bytes)": rng.uniform(2.8e6, 7.8e7, n_rows),
+        }
+    )
+
+
+def best_time(function, repeat):
+    """
+    Run a function repeat times and return its best wall time and its last result.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=10000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument(
+        "--users", type=int, default=None, help="Number of distinct subscribers"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per method, the best one is reported",
+    )
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} synthetic sessions...")
+    df = generate_sessions(args.rows, args.users)
+    key = "MSISDN/Number"
+
+    groupby_seconds, expected = best_time(
+        lambda: df.groupby(key).agg(**ENGAGEMENT_METRICS).reset_index(), args.repeat
+    )
+    encode_seconds, encoding = best_time(lambda: encode_ids(df[key]), args.repeat)
+    codes_seconds, result = best_time(
+        lambda: aggregate_by_codes(df, key, ENGAGEMENT_METRICS, encoding=encoding),
+        args.repeat,
+    )
+    metrics_seconds, _ = best_time(lambda: aggregate_metrics(df), args.repeat)
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"{'method':<34}{'best (s)':>10}")
+    print(f"{'pandas groupby':<34}{groupby_seconds:>10.2f}")
+    print(f"{'encode MSISDN (once)':<34}{encode_seconds:>10.2f}")
+    print(f"{'bincount over codes':<34}{codes_seconds:>10.2f}")
+    print(f"{'encode + bincount':<34}{encode_seconds + codes_seconds:>10.2f}")
+    print(f"{'aggregate_metrics':<34}{metrics_seconds:>10.2f}")
+    print(
+        f"{len(expected):,} subscribers; speedup with codes reused: "
+        f"{groupby_seconds / codes_seconds:.1f}x, including the encoding: "
+        f"{groupby_seconds / (encode_seconds + codes_seconds):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/import_time.py
+"""
+Measure the cold import time of the scripts modules and the dashboard with `python -X
+importtime`.
+
+Each module is imported in a fresh interpreter; the report lists its cumulative import
+time and the top-level packages that contributed most of it:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --modules dashboard load_data --top 8 --repeat 3
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(ROOT, "scripts")
+
+DEFAULT_MODULES = [
+    "load_data",
+    "sql_queries",
+    "overview_analysis",
+    "users_overview",
+    "new_engagement_analysis",
+    "expriance_analytics",
+    "satisfaction_analysis",
+    "eda",
+    "dashboard_artifacts",
+    "shared_data",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh interpreter and parse its -X importtime output.
+
+    :return: List of (self microseconds, cumulative microseconds, depth, module name).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SCRIPTS_DIR, ROOT]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(f"warning: importing {module} failed:\n{result.stderr.splitlines()[-1]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append(
+                (int(self_us), int(cumulative_us), (len(indent) - 1) // 2, name)
+            )
+    return rows
+
+
+def summarize(rows, module, top):
+    """
+    Return the cumulative import time of a module and its heaviest top-level packages by
+    self time.
+    """
+    total = next(
+        (
+            cumulative
+            for _, cumulative, depth, name in rows
+            if name == module and depth == 0
+        ),
+        None,
+    )
+    if total is None:
+        total = sum(self_us for self_us, _, _, _ in rows)
+    per_package = defaultdict(int)
+    for self_us, _, _, name in rows:
+        per_package[name.split(".")[0]] += self_us
+    heaviest = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total, heaviest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import"
+    )
+    parser.add_argument("--top", type=int, default=5, help="Packages listed per module")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per module, the fastest one is reported",
+    )
+    args = parser.parse_args()
+
+    print(f"{'module':<26}{'import (ms)':>12}  heaviest packages (self ms)")
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        summaries = [summarize(rows, module, args.top) for rows in runs]
+        total, heaviest = min(summaries, key=lambda summary: summary[0])
+        packages = ", ".join(f"{package} {us / 1000:.0f}" for package, us in heaviest)
+        print(f"{module:<26}{total / 1000:>12.0f}  {packages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/index_report.py
+"""
+Measure the managed xdr_data indexes with EXPLAIN (ANALYZE, BUFFERS) on every telecom
+query.
+
+The queries read the xdr_data table, so point the DB_* environment variables at a
+throwaway PostgreSQL database: the script replaces its xdr_data table with synthetic
+sessions and drops and recreates its indexes, so it must be confirmed with
+--replace-xdr-data.
+
+    python benchmarks/index_report.py --rows 1000000 --output reports --replace-xdr-data
+"""
+
+import argparse
+
+from synthetic_xdr import generate_xdr_data, load_into_postgres
+from db_connection import DB_NAME, get_connection
+from index_advisor import run_index_report
+from xdr_schema import XDR_TABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=1000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument(
+        "--output",
+        default="reports",
+        help="Directory receiving the report and the JSON plans",
+    )
+    parser.add_argument(
+        "--skip-load", action="store_true", help="Reuse an already loaded table"
+    )
+    parser.add_argument(
+        "--timestamps",
+        action="store_true",
+        help='Store "Start"/"End" as timestamps so the BRIN index applies',
+    )
+    parser.add_argument(
+        "--runs", type=int, default=3, help="Number of times each query is explained"
+    )
+    parser.add_argument(
+        "--replace-xdr-data",
+        action="store_true",
+        help=f"Confirm that {XDR_TABLE} and its indexes in the target database "
+        "may be dropped",
+    )
+    args = parser.parse_args()
+
+    if not args.replace_xdr_data:
+        parser.error(
+            f"refusing to modify {XDR_TABLE} in {DB_NAME!r} without --replace-xdr-data"
+        )
+    if not args.skip_load:
+        print(
+            f"Generating and loading {args.rows:,} synthetic rows into {XDR_TABLE}..."
+        )
+        with get_connection() as connection:
+            load_into_postgres(
+                connection, generate_xdr_data(args.rows), table=XDR_TABLE
+            )
+            if args.timestamps:
+                with connection.cursor() as cursor:
+                    for column in ("Start", "End"):
+                        cursor.execute(
+                            f"ALTER TABLE {XDR_TABLE} "
+                            f'ALTER COLUMN "{column}" TYPE timestamp '
+                            f"USING to_timestamp(\"{column}\", 'MM/DD/YYYY HH24:MI')"
+                        )
+                    cursor.execute(f"ANALYZE {XDR_TABLE}")
+                connection.commit()
+
+    report_path = run_index_report(
+        output_dir=args.output, runs=args.runs, confirm_throwaway=True
+    )
+    with open(report_path) as f:
+        print(f.read())
+
+
+if __name__ == "__main__":
+    main()
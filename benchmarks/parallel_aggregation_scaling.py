@@ -0,0 +1,79 @@
+# benchmarks/parallel_aggregation_scaling.py
+"""
+Benchmark the engagement aggregation sharded over 1 to N worker processes, on synthetic
+sessions held in memory (no database needed):
+
+    python benchmarks/parallel_aggregation_scaling.py \\
+        --rows 20000000 --workers 1 2 4 8 16 32
+"""
+
+import argparse
+import os
+import pandas as pd
+
+from dense_id_aggregation import (
+    generate_sessions,
+    best_time,
+)  # adds scripts/ to sys.path
+from parallel_aggregation import aggregate_in_parallel  # noqa: E402
+from new_engagement_analysis import ENGAGEMENT_METRICS  # noqa: E402
+
+
+def main():
+    default_workers = sorted(
+        {1, 2, 4, 8, 16, 32, os.cpu_count() or 1}
+        & set(range(1, (os.cpu_count() or 1) + 1))
+    )
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=20000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument(
+        "--users", type=int, default=None, help="Number of distinct subscribers"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=default_workers,
+        help="Worker counts to run",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per worker count, the best one is reported",
+    )
+    parser.add_argument(
+        "--shard-dir", default=None, help="Directory of the shard files"
+    )
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} synthetic sessions...")
+    df = generate_sessions(args.rows, args.users)
+
+    print(f"{'workers':>8}{'best (s)':>10}{'speedup':>10}{'efficiency':>12}")
+    baseline_seconds, expected = None, None
+    for n_workers in args.workers:
+        seconds, result = best_time(
+            lambda: aggregate_in_parallel(
+                df, ENGAGEMENT_METRICS, n_workers=n_workers, shard_dir=args.shard_dir
+            ),
+            args.repeat,
+        )
+        if expected is None:
+            baseline_seconds, expected = seconds, result
+        else:
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        speedup = baseline_seconds / seconds
+        print(
+            f"{n_workers:>8}{seconds:>10.2f}{speedup:>9.2f}x"
+            f"{speedup / n_workers * args.workers[0]:>11.0%}"
+        )
+    print(f"{len(expected):,} subscribers; this machine has {os.cpu_count()} CPUs")
+
+
+if __name__ == "__main__":
+    main()
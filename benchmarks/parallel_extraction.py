@@ -0,0 +1,91 @@
+# benchmarks/parallel_extraction.py
+"""
+Benchmark the partitioned parallel extraction of xdr_data against a single connection.
+
+Runs against the local PostgreSQL configured through the DB_* environment variables:
+
+    python benchmarks/parallel_extraction.py --rows 1000000 --partitions 1 2 4 8
+"""
+
+import argparse
+import time
+
+from synthetic_xdr import generate_xdr_data, load_into_postgres
+from db_connection import get_connection
+from load_data import load_data_from_postgres, load_data_in_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=1000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Partition counts to run",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=["hash", "range"],
+        default="hash",
+        help="Partitioning strategy",
+    )
+    parser.add_argument("--column", default="MSISDN/Number", help="Partition column")
+    parser.add_argument(
+        "--method",
+        choices=["read_sql", "copy"],
+        default="copy",
+        help="Extraction method",
+    )
+    parser.add_argument(
+        "--table",
+        default="xdr_data_benchmark",
+        help="Table to (re)create for the benchmark",
+    )
+    parser.add_argument(
+        "--skip-load", action="store_true", help="Reuse an already loaded table"
+    )
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        print(
+            f"Generating and loading {args.rows:,} synthetic rows into {args.table}..."
+        )
+        with get_connection() as connection:
+            load_into_postgres(
+                connection, generate_xdr_data(args.rows), table=args.table
+            )
+
+    query = f"SELECT * FROM {args.table}"
+
+    start = time.perf_counter()
+    baseline = load_data_from_postgres(query, method=args.method)
+    baseline_seconds = time.perf_counter() - start
+    print(f"single connection: {len(baseline):,} rows in {baseline_seconds:.2f}s")
+    del baseline
+
+    for n_partitions in args.partitions:
+        start = time.perf_counter()
+        df, timings = load_data_in_parallel(
+            query,
+            n_partitions=n_partitions,
+            partition_column=args.column,
+            strategy=args.strategy,
+            method=args.method,
+        )
+        seconds = time.perf_counter() - start
+        print(
+            f"\n{n_partitions} partitions: {len(df):,} rows in {seconds:.2f}s "
+            f"({baseline_seconds / seconds:.2f}x)"
+        )
+        print(timings[["partition", "rows", "seconds"]].to_string(index=False))
+        del df
+
+
+if __name__ == "__main__":
+    main()
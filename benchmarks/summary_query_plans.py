@@ -0,0 +1,46 @@
+# benchmarks/summary_query_plans.py
+"""
+Compare the total database time of the separate and consolidated telecom summary query
+plans.
+
+Runs against the xdr_data table of the PostgreSQL configured through the DB_*
+environment variables (load a synthetic one first with copy_vs_read_sql.py --table
+xdr_data if needed):
+
+    python benchmarks/summary_query_plans.py --repeat 3
+"""
+
+import argparse
+
+import synthetic_xdr  # noqa: F401  (puts scripts/ on sys.path)
+from sql_queries import run_telecom_queries, run_consolidated_telecom_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per plan, the best one is reported"
+    )
+    args = parser.parse_args()
+
+    plans = {
+        "separate": lambda: run_telecom_queries(max_workers=1),
+        "consolidated": lambda: run_consolidated_telecom_queries(max_workers=1),
+    }
+    totals = {}
+    for plan, run in plans.items():
+        reports = [run()[1] for _ in range(args.repeat)]
+        best = min(reports, key=lambda report: report["seconds"].sum())
+        totals[plan] = best["seconds"].sum()
+        print(f"\n{plan} plan: {totals[plan]:.2f}s total DB time")
+        print(best.to_string(index=False))
+
+    print(
+        f"\nconsolidated / separate: {totals['consolidated'] / totals['separate']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# benchmarks/synthetic_xdr.py
+
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+)
+
+from xdr_schema import XDR_SCHEMA, quote_identifier  # noqa: E402
+
+HANDSETS = {
+    "Apple": [
+        "Apple iPhone 6S (A1688)",
+        "Apple iPhone 6 (A1586)",
+        "Apple iPhone 7 (A1778)",
+        "Apple iPhone Se (A1723)",
+        "Apple iPhone 8 (A1905)",
+    ],
+    "Samsung": [
+        "Samsung Galaxy S8 (Sm-G950F)",
+        "Samsung Galaxy A5 Sm-A520F",
+        "Samsung Galaxy J5 (Sm-J530)",
+        "Samsung Galaxy J3 (Sm-J330)",
+        "Samsung Galaxy S7 (Sm-G930X)",
+    ],
+    "Huawei": [
+        "Huawei B528S-23A",
+        "Huawei E5180",
+        "Huawei P20 Lite Huawei Nova 3E",
+        "Huawei P20",
+        "Huawei Y6 2018",
+    ],
+    "Sony Mobile Communications Ab": ["Sony Xperia Xz1", "Sony Xperia Xa1"],
+    "Xiaomi Communications Co Ltd": ["Xiaomi Redmi 5 Plus", "Xiaomi Mi A2"],
+}
+
+
+def generate_xdr_data(n_rows, n_users=None, seed=42, null_fraction=0.01):
+    """
+    Generate a synthetic xdr_data table with the same 55 columns as the real extract.
+
+    :param n_rows: Number of sessions (rows).
+    :param n_users: Number of distinct subscribers, defaults to n_rows / 1.5 like the
+        real data.
+    :param seed: Random seed.
+    :param null_fraction: Fraction of missing MSISDN/IMSI values.
+    :return: DataFrame with raw (float64 / object) dtypes as pandas infers them from the
+        database.
+    """
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(1, int(n_rows / 1.5))
+
+    user = rng.integers(0, n_users, n_rows)
+    msisdn = (33600000000 + user).astype("float64")
+    imsi = (208200000000000 + user).astype("float64")
+    msisdn[rng.random(n_rows) < null_fraction] = np.nan
+    imsi[rng.random(n_rows) < null_fraction] = np.nan
+
+    manufacturers = np.array(list(HANDSETS))
+    manufacturer = manufacturers[
+        rng.choice(len(manufacturers), n_rows, p=[0.4, 0.35, 0.15, 0.05, 0.05])
+    ]
+    handset = np.empty(n_rows, dtype=object)
+    for name, models in HANDSETS.items():
+        mask = manufacturer == name
+        handset[mask] = np.array(models, dtype=object)[
+            rng.integers(0, len(models), mask.sum())
+        ]
+
+    start = pd.Timestamp("2019-04-04") + pd.to_timedelta(
+        rng.integers(0, 25 * 86400, n_rows), unit="s"
+    )
+    duration = rng.gamma(2.0, 50000.0, n_rows).round()
+    end = start + pd.to_timedelta(duration, unit="ms")
+
+    data = {
+        "Bearer Id": rng.integers(
+            6917538000000000000, 9223372036854775807, n_rows, dtype=np.int64
+        ).astype("float64"),
+        "Start": start.strftime("%-m/%-d/%Y %-H:%M"),
+        "Start ms": rng.integers(0, 1000, n_rows).astype("float64"),
+        "End": end.strftime("%-m/%-d/%Y %-H:%M"),
+        "End ms": rng.integers(0, 1000, n_rows).astype("float64"),
+        "Dur. (ms)": duration,
+        "IMSI": imsi,
+        "MSISDN/Number": msisdn,
+        "IMEI": (35000000000000 + rng.integers(0, n_users, n_rows)).astype("float64"),
+        "Last Location Name": np.char.add(
+            "L", rng.integers(0, max(1, n_rows // 3), n_rows).astype(str)
+        ).astype(object),
+    }
+
+    for column, dtype in XDR_SCHEMA.items():
+        if column in data or column in ("Handset Manufacturer", "Handset Type"):
+            continue
+        if "RTT" in column:
+            values = rng.gamma(2.0, 30.0, n_rows)
+        elif "(%)" in column:
+            values = rng.uniform(0, 100, n_rows)
+        elif "TP" in column:
+            values = rng.gamma(1.5, 8000.0, n_rows)
+        elif column.startswith(("Social", "Google", "Email", "Youtube", "Netflix")):
+            values = rng.uniform(0, 2.3e7, n_rows)
+        elif column.startswith(("Gaming", "Other")):
+            values = rng.uniform(0, 8.4e8, n_rows)
+        else:
+            values = rng.gamma(2.0, 1e6, n_rows)
+        values[rng.random(n_rows) < 0.005] = np.nan
+        data[column] = values.round()
+
+    data["Handset Manufacturer"] = manufacturer.astype(object)
+    data["Handset Type"] = handset
+    app_dl = [
+        c
+        for c in XDR_SCHEMA
+        if c.split(" ")[0]
+        in ("Social", "Google", "Email", "Youtube", "Netflix", "Gaming", "Other")
+        and " DL " in c
+    ]
+    data["Total DL (Bytes)"] = (
+        pd.DataFrame({c: data[c] for c in app_dl}).sum(axis=1).to_numpy()
+    )
+    data["Total UL (Bytes)"] = (
+        pd.DataFrame({c: data[c.replace(" DL ", " UL ")] for c in app_dl})
+        .sum(axis=1)
+        .to_numpy()
+    )
+
+    return pd.DataFrame(data, columns=list(XDR_SCHEMA))
+
+
+def load_into_postgres(connection, df, table="xdr_data_benchmark"):
+    """
+    (Re)create a table with the xdr_data layout and bulk load the DataFrame into it with
+    COPY.
+
+    Numeric columns are stored as double precision and the rest as text, like the
+    original dump.
+    """
+    sql_types = {
+        column: (
+            "double precision" if pd.api.types.is_numeric_dtype(df[column]) else "text"
+        )
+        for column in df.columns
+    }
+    column_definitions = ", ".join(
+        f"{quote_identifier(column)} {sql_type}"
+        for column, sql_type in sql_types.items()
+    )
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} ({column_definitions})")
+        cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"ANALYZE {table}")
+    connection.commit()
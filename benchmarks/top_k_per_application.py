@@ -0,0 +1,81 @@
+# benchmarks/top_k_per_application.py
+"""
+Benchmark the top users per application: the per-application groupby and nlargest loop
+against one aggregation into a users x applications matrix with a partial selection per
+column, on synthetic sessions held in memory (no database needed):
+
+    python benchmarks/top_k_per_application.py --rows 2000000 --k 10 --repeat 3
+"""
+
+import argparse
+import time
+import pandas as pd
+
+from synthetic_xdr import generate_xdr_data
+from new_engagement_analysis import APPLICATIONS, top_k_users_per_application
+from xdr_schema import APPLICATION_COLUMNS
+
+
+def loop_top_k(df, applications, k):
+    """
+    The previous implementation: one groupby and nlargest per application.
+    """
+    top_users = {}
+    for app in applications:
+        app_data = df.groupby("MSISDN/Number")[app].sum().reset_index()
+        top_users[app] = app_data.nlargest(k, app)
+    return top_users
+
+
+def best_time(function, repeat):
+    """
+    Run a function repeat times and return its best wall time and its last result.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows", type=int, default=2000000, help="Number of synthetic sessions"
+    )
+    parser.add_argument("--k", type=int, default=10, help="Users per application")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per method, the best one is reported",
+    )
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} synthetic sessions...")
+    df = generate_xdr_data(args.rows)[["MSISDN/Number"] + APPLICATION_COLUMNS]
+
+    print(f"{'applications':<16}{'loop (s)':>10}{'matrix (s)':>12}{'speedup':>10}")
+    for label, applications in (("DL", APPLICATIONS), ("DL + UL", APPLICATION_COLUMNS)):
+        loop_seconds, expected = best_time(
+            lambda: loop_top_k(df, applications, args.k), args.repeat
+        )
+        matrix_seconds, (result, _) = best_time(
+            lambda: top_k_users_per_application(
+                df, k=args.k, applications=applications
+            ),
+            args.repeat,
+        )
+        for app in applications:
+            pd.testing.assert_frame_equal(result[app], expected[app])
+        print(
+            f"{label:<16}{loop_seconds:>10.2f}{matrix_seconds:>12.2f}"
+            f"{loop_seconds / matrix_seconds:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
+import json
+import os
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from load_data import load_data_from_postgres
-from new_engagement_analysis import aggregate_metrics, top_10_customers
-from expriance_analytics import aggregate_per_customer, kmeans_clustering, treat_missing_and_outliers
-from satisfaction_analysis import calculate_satisfaction_score
+from shared_data import get_xdr_data, get_derived, start_background_refresh
+from table_pager import (PAGE_SIZE, FILTER_OPERATORS, parse_filter_value, frame_order, fetch_frame_page,
+                         fetch_sql_page, count_sql_rows, indexed_columns, ROW_KEY)
+from xdr_schema import XDR_SCHEMA
+from dashboard_artifacts import PAGE_BUILDERS, load_artifact_bundle
+from density_plot import plot_points
+from user_features import build_user_features
+from lazy_imports import lazy_module
+
+# Plotting libraries load when a page first draws a chart
+plt = lazy_module("matplotlib.pyplot")
+sns = lazy_module("seaborn")
 
 # Configure Streamlit
 st.set_page_config(page_title="Telecom Insights Dashboard", layout="wide")
@@ -17,20 +25,130 @@ page = st.sidebar.radio("Go to", ["User Overview Analysis",
                                   "Experience Analysis", 
                                   "Satisfaction Analysis"])
 
-# Database query for loading data
-query = "SELECT * FROM xdr_data"
-df = load_data_from_postgres(query)
-st.write(df)  # Display the dataframe to verify data loading
+# In read-only mode ("artifacts") the pages only load the bundle published by
+# `python scripts/dashboard_artifacts.py` and never query xdr_data
+READ_ONLY = os.getenv("DASHBOARD_MODE", "live") == "artifacts"
+
+if not READ_ONLY:
+    # The xdr_data frame is loaded once per process and shared by every session; a background
+    # thread swaps in a fresh copy when xdr_data changes
+    get_xdr_data()
+    start_background_refresh()
 
 # Define the analysis functions
+def table_controls(key, dtypes, sort_options):
+    """
+    Draw the sort and filter widgets of a table.
+
+    :param key: Prefix of the widget keys.
+    :param dtypes: Dict of column -> dtype of the columns that can be filtered.
+    :param sort_options: Choices of the sort box; "(none)" keeps the stored order.
+    :return: Tuple (sort column or None, descending, list of filters). A filter whose value does
+        not fit its column is reported with a warning and left out.
+    """
+    sort_column, order_column, filter_column, operator_column, value_column = st.columns(5)
+    sort_by = sort_column.selectbox("Sort by", sort_options, key=f"{key}_sort")
+    descending = order_column.checkbox("Descending", key=f"{key}_descending")
+    filter_by = filter_column.selectbox("Filter on", ["(none)"] + list(dtypes), key=f"{key}_filter")
+    filter_op = operator_column.selectbox("Operator", list(FILTER_OPERATORS), key=f"{key}_operator")
+    filter_value = value_column.text_input("Value", key=f"{key}_value")
+
+    filters = []
+    if filter_by != "(none)" and filter_value:
+        try:
+            filters.append((filter_by, filter_op, parse_filter_value(dtypes[filter_by], filter_op, filter_value)))
+        except ValueError as e:
+            st.warning(f"Filter on {filter_by} ignored: {e}")
+    return None if sort_by == "(none)" else sort_by, descending, filters
+
+def paginated_table(data, key="xdr_data", page_size=PAGE_SIZE):
+    """
+    Display a sortable, filterable in-memory table one page at a time instead of sending every
+    row to the browser.
+    """
+    if data is None:
+        st.error("The table could not be loaded.")
+        return
+    sort_by, descending, filters = table_controls(key, data.dtypes.to_dict(), ["(none)"] + list(data.columns))
+    order = frame_order(data, filters, sort_by, descending)
+
+    pages = max(1, -(-len(order) // page_size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    st.dataframe(fetch_frame_page(data, order, page - 1, page_size))
+    st.caption(f"Page {page} of {pages:,} ({len(order):,} rows)")
+
+def sql_paginated_table(key="xdr_data", page_size=PAGE_SIZE):
+    """
+    Display xdr_data one page at a time, fetching each page from PostgreSQL.
+
+    Pages reached one after another start from the keyset cursor of the previous page, so
+    their latency does not grow with the page number; sorting is offered on the indexed columns
+    only, which PostgreSQL can read in order without sorting every matching row. Cursors end with
+    the row key (table_pager.ROW_KEY) rather than the physical row id, so they stay valid while
+    rows are updated or the table is vacuumed.
+    """
+    sortable = indexed_columns()
+    if sortable is None:
+        st.error("Could not load xdr_data from PostgreSQL.")
+        return
+    if not sortable:
+        st.warning(f"xdr_data has no btree index to sort by, so pages follow the {ROW_KEY} order. "
+                   "Create the indexes of scripts/index_advisor.py to sort them.")
+    dtypes = {column: pd.api.types.pandas_dtype(dtype) for column, dtype in XDR_SCHEMA.items()}
+    sort_by, descending, filters = table_controls(key, dtypes, sortable or ["(none)"])
+
+    # Cursors of the pages visited with the current sort and filters: page number -> cursor of
+    # its last row; page 1 starts at the beginning
+    view = json.dumps([sort_by, descending, filters], default=str)
+    state = st.session_state.setdefault(f"{key}_cursors", {})
+    if state.get("view") != view:
+        state.update(view=view, cursors={0: None})
+    cursors = state["cursors"]
+
+    page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+    # A page reached without the cursor of the page before it is fetched with OFFSET
+    offset = 0 if page - 1 in cursors else (page - 1) * page_size
+    rows, cursor = fetch_sql_page(filters=filters, sort_by=sort_by, descending=descending,
+                                  page_size=page_size, offset=offset, after=cursors.get(page - 1))
+    if rows is None:
+        st.error("Could not load xdr_data from PostgreSQL.")
+        return
+    if cursor is not None:
+        cursors[page] = cursor
+    st.dataframe(rows)
+    caption = f"Page {page}" + (" (last page)" if cursor is None else "")
+    if st.checkbox("Count matching rows", key=f"{key}_count"):
+        total = count_sql_rows(filters)
+        if total is not None:
+            caption += f" of {max(1, -(-total // page_size)):,} ({total:,} rows)"
+    st.caption(caption)
+
+def page_tables(page_name):
+    """
+    Return the tables of a dashboard page: from the artifact bundle in read-only mode, otherwise
+    built once per data generation from the per-user features every page shares.
+    """
+    if READ_ONLY:
+        return load_artifact_bundle()
+    tables = get_derived(
+        f"{page_name}_tables",
+        lambda shared: PAGE_BUILDERS[page_name](get_derived("user_features", build_user_features)),
+    )
+    if tables is None:
+        st.error("Could not load xdr_data from PostgreSQL.")
+        st.stop()
+    return tables
+
 def user_engagement_analysis():
     st.title("User Engagement Analysis")
     st.subheader("Engagement Metrics")
-    engagement_data = aggregate_metrics(df)
-    st.dataframe(engagement_data.head())
+    tables = page_tables("engagement")
+    st.dataframe(tables["engagement_metrics"].head())
 
     st.subheader("Top 10 Customers by Engagement Metrics")
-    top_10_sessions, top_10_duration, top_10_data_volume = top_10_customers(engagement_data)
+    top_10_sessions = tables["top_10_sessions"]
+    top_10_duration = tables["top_10_duration"]
+    top_10_data_volume = tables["top_10_data_volume"]
 
     fig, ax = plt.subplots()
     sns.barplot(x=top_10_sessions['sessions_frequency'], y=top_10_sessions['MSISDN/Number'], ax=ax)
@@ -50,35 +168,42 @@ def user_engagement_analysis():
 def experience_analysis():
     st.title("Experience Analysis")
     st.subheader("Experience Metrics")
-    experience_data = aggregate_per_customer(df)
-    st.dataframe(experience_data.head())
-
-    # Clean the data to handle missing values
-    experience_data = treat_missing_and_outliers(experience_data)
+    tables = page_tables("experience")
+    st.dataframe(tables["experience_metrics"].head())
 
     st.subheader("Experience Clustering")
-    experience_data, kmeans = kmeans_clustering(experience_data, n_clusters=3)
+    experience_data = tables["experience_clusters"]
     fig, ax = plt.subplots()
-    sns.scatterplot(data=experience_data, x='avg_rtt', y='avg_throughput', 
-                    hue='cluster', palette='coolwarm', ax=ax)
+    # Large customer bases are drawn as a per-cluster density image instead of one marker per customer
+    plot_points(ax, experience_data['avg_rtt'], experience_data['avg_throughput'],
+                hue=experience_data['cluster'], palette='coolwarm')
     ax.set_title("Experience Clusters")
     st.pyplot(fig)
+    st.dataframe(tables["experience_centroids"])
 
 def satisfaction_analysis():
     st.title("Satisfaction Analysis")
     st.subheader("Satisfaction Scores")
-    satisfaction_data = calculate_satisfaction_score(df)
-    st.dataframe(satisfaction_data.head())
+    tables = page_tables("satisfaction")
+    st.dataframe(tables["satisfaction_scores"].head())
 
+    # Plot the pre-binned histogram instead of binning every score on each rerun
+    histogram = tables["satisfaction_histogram"]
     fig, ax = plt.subplots()
-    sns.histplot(satisfaction_data['satisfaction_score'], bins=20, kde=True, ax=ax)
+    ax.stairs(histogram['count'], list(histogram['bin_left']) + [histogram['bin_right'].iloc[-1]], fill=True)
     ax.set_title("Distribution of Satisfaction Scores")
     st.pyplot(fig)
 
 # Call the appropriate analysis function based on the selected page
-if page == "User Engagement Analysis":
+if page == "User Overview Analysis":
+    st.title("User Overview Analysis")
+    if READ_ONLY:
+        paginated_table(page_tables("engagement")["engagement_metrics"], key="engagement_metrics")
+    else:
+        sql_paginated_table()
+elif page == "User Engagement Analysis":
     user_engagement_analysis()
 elif page == "Experience Analysis":
     experience_analysis()
 elif page == "Satisfaction Analysis":
-    satisfaction_analysis()
\ No newline at end of file
+    satisfaction_analysis()
@@ -0,0 +1,143 @@
+from collections.abc import Iterable
+import pandas as pd
+from id_encoding import SESSION_START, session_order
+
+# Number of chunk partials buffered by aggregate_in_chunks between merges
+MERGE_EVERY = 8
+
+
+def is_chunked(data):
+    """
+    Check whether the data is a stream of DataFrame chunks (an iterable such as a
+    generator or a list of frames) rather than a single DataFrame.
+    """
+    return isinstance(data, Iterable) and not isinstance(
+        data, (pd.DataFrame, pd.Series, str, bytes)
+    )
+
+
+def partial_aggregate(df, key, spec):
+    """
+    Compute the partial (mergeable) aggregates of one chunk for a named aggregation
+    spec.
+
+    :param df: DataFrame chunk.
+    :param key: Column to group by.
+    :param spec: Dict of output name -> (column, function), function in 'sum', 'count',
+        'mean', 'first'.
+    :return: DataFrame indexed by key with a row count and one or two partial columns
+        per output; a 'first' of sessions with a start time keeps that start alongside
+        its value.
+    """
+    partial_spec = {"__rows": (key, "size")}
+    firsts = []
+    for name, (column, func) in spec.items():
+        if func == "mean":
+            partial_spec[f"{name}__sum"] = (column, "sum")
+            partial_spec[f"{name}__count"] = (column, "count")
+        elif func == "first" and SESSION_START in df.columns:
+            firsts.append((name, column))
+        else:
+            partial_spec[name] = (column, func)
+    partial = df.groupby(key).agg(**partial_spec)
+    for name, column in firsts:
+        # The earliest session with a value, see id_encoding.session_order
+        sessions = df.iloc[session_order(df, column)]
+        sessions = sessions[sessions[column].notna()].drop_duplicates(key)
+        sessions = sessions.set_index(key).reindex(partial.index)
+        partial[name] = sessions[column]
+        partial[f"{name}__start"] = sessions[SESSION_START]
+    return partial
+
+
+def merge_partials(partials, key, spec):
+    """
+    Merge partial aggregates produced by partial_aggregate into one partial aggregate,
+    which can itself be merged again.
+
+    Sums, counts and row counts are added and 'first' keeps the value of the earliest
+    session when the partials hold start times, the first non-null value in partial
+    order otherwise.
+    """
+    partials = pd.concat(partials)
+    merge_spec = {"__rows": ("__rows", "sum")}
+    firsts = []
+    for name, (column, func) in spec.items():
+        if func == "mean":
+            merge_spec[f"{name}__sum"] = (f"{name}__sum", "sum")
+            merge_spec[f"{name}__count"] = (f"{name}__count", "sum")
+        elif func == "count":
+            merge_spec[name] = (name, "sum")
+        elif func == "first" and f"{name}__start" in partials.columns:
+            firsts.append(name)
+        else:
+            merge_spec[name] = (name, func)
+    merged = partials.groupby(level=0).agg(**merge_spec)
+    merged.index.name = key
+    for name in firsts:
+        earliest = partials[[name, f"{name}__start"]].reset_index(names="__key")
+        earliest = earliest.sort_values([f"{name}__start", name], kind="stable")
+        earliest = (
+            earliest.dropna(subset=[name])
+            .drop_duplicates("__key")
+            .set_index("__key")
+            .reindex(merged.index)
+        )
+        merged[name] = earliest[name]
+        merged[f"{name}__start"] = earliest[f"{name}__start"]
+    return merged
+
+
+def finalize_partial(partial, spec):
+    """
+    Turn a partial aggregate into the final aggregation: means are rebuilt from their
+    sums and counts and the helper columns are dropped.
+    """
+    result = pd.DataFrame(index=partial.index)
+    for name, (column, func) in spec.items():
+        if func == "mean":
+            result[name] = partial[f"{name}__sum"] / partial[f"{name}__count"].where(
+                partial[f"{name}__count"] > 0
+            )
+        else:
+            result[name] = partial[name]
+    return result
+
+
+def combine_partials(partials, key, spec):
+    """
+    Merge partial aggregates produced by partial_aggregate into the final aggregation,
+    see merge_partials.
+    """
+    return finalize_partial(merge_partials(partials, key, spec), spec)
+
+
+def aggregate_in_chunks(chunks, key, spec, merge_every=MERGE_EVERY):
+    """
+    Aggregate a stream of DataFrame chunks per key without holding all the rows in
+    memory.
+
+    The partials of every merge_every chunks are folded into a running aggregate, so
+    memory holds one partial per key plus those of the last few chunks.
+
+    :param chunks: Iterable of DataFrame chunks.
+    :param key: Column to group by.
+    :param spec: Dict of output name -> (column, function) as accepted by
+        DataFrame.groupby().agg().
+    :param merge_every: Number of chunk partials buffered before they are merged.
+    :return: DataFrame equivalent to df.groupby(key).agg(**spec) on the concatenated
+        chunks.
+    """
+    running, pending = None, []
+    for chunk in chunks:
+        pending.append(partial_aggregate(chunk, key, spec))
+        if len(pending) >= merge_every:
+            running = merge_partials(
+                pending if running is None else [running] + pending, key, spec
+            )
+            pending = []
+    if running is not None:
+        pending.insert(0, running)
+    if not pending:
+        return pd.DataFrame(columns=list(spec)).rename_axis(key)
+    return combine_partials(pending, key, spec)
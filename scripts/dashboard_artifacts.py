@@ -0,0 +1,231 @@
+# scripts/dashboard_artifacts.py
+
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import expriance_analytics
+import satisfaction_analysis
+from load_data import load_xdr_data
+from new_engagement_analysis import aggregate_metrics, top_10_customers
+from snapshot_cache import read_snapshot, write_snapshot
+from user_features import build_user_features
+
+# Artifact bundle settings
+ARTIFACT_DIR = os.getenv("DASHBOARD_ARTIFACT_DIR", "artifacts")
+ARTIFACT_KEEP = int(os.getenv("DASHBOARD_ARTIFACT_KEEP", "3"))
+LATEST_FILE = "LATEST"
+HISTOGRAM_BINS = 20
+
+EXPERIENCE_CLUSTER_METRICS = ["avg_tcp_retransmission", "avg_rtt", "avg_throughput"]
+
+# In-process cache of the loaded bundles: version -> dict of artifact name -> DataFrame
+_bundles = {}
+
+
+def build_engagement_tables(df):
+    """
+    Build the per-user engagement table and the top 10 customers per engagement metric.
+    """
+    engagement = aggregate_metrics(df)
+    top_10_sessions, top_10_duration, top_10_data_volume = top_10_customers(engagement)
+    return {
+        "engagement_metrics": engagement,
+        "top_10_sessions": top_10_sessions.reset_index(drop=True),
+        "top_10_duration": top_10_duration.reset_index(drop=True),
+        "top_10_data_volume": top_10_data_volume.reset_index(drop=True),
+    }
+
+
+def build_experience_tables(df, n_clusters=3):
+    """
+    Build the per-customer experience table, its k-means clusters and the cluster
+    centroids (in standardized units).
+    """
+    metrics = expriance_analytics.aggregate_per_customer(df)
+    clusters, kmeans = expriance_analytics.kmeans_clustering(
+        expriance_analytics.treat_missing_and_outliers(metrics.copy()),
+        n_clusters=n_clusters,
+    )
+    centroids = pd.DataFrame(
+        kmeans.cluster_centers_, columns=EXPERIENCE_CLUSTER_METRICS
+    )
+    centroids.insert(0, "cluster", range(len(centroids)))
+    return {
+        "experience_metrics": metrics,
+        "experience_clusters": clusters[
+            ["MSISDN/Number"] + EXPERIENCE_CLUSTER_METRICS + ["cluster"]
+        ],
+        "experience_centroids": centroids,
+    }
+
+
+def histogram_table(values, bins=HISTOGRAM_BINS):
+    """
+    Bin values into a table with the left edge, right edge and count of every bin.
+    """
+    counts, edges = np.histogram(pd.Series(values).dropna(), bins=bins)
+    return pd.DataFrame(
+        {"bin_left": edges[:-1], "bin_right": edges[1:], "count": counts}
+    )
+
+
+def build_satisfaction_tables(df, bins=HISTOGRAM_BINS):
+    """
+    Score every customer as in the satisfaction analysis, see
+    satisfaction_analysis.calculate_scores.
+
+    Missing values and outliers are treated on the per-customer table, so the shared
+    session frame is left untouched.
+    """
+    customers = satisfaction_analysis.calculate_scores(
+        satisfaction_analysis.treat_missing_and_outliers(
+            satisfaction_analysis.aggregate_per_customer(df)
+        )
+    )
+
+    scores = customers[
+        ["MSISDN/Number", "engagement_score", "experience_score", "satisfaction_score"]
+    ]
+    return {
+        "satisfaction_scores": scores,
+        "satisfaction_histogram": histogram_table(scores["satisfaction_score"], bins),
+    }
+
+
+# Dashboard page -> builder of its tables from the session frame or its user feature
+# table
+PAGE_BUILDERS = {
+    "engagement": build_engagement_tables,
+    "experience": build_experience_tables,
+    "satisfaction": build_satisfaction_tables,
+}
+
+
+def build_dashboard_artifacts(df, output_dir=None, keep=None, version=None):
+    """
+    Compute every dashboard table offline and publish them as a new versioned bundle.
+
+    The bundle is written to output_dir/<version>/ (one Arrow IPC file per table plus a
+    manifest.json) and only becomes the latest once complete, so a running dashboard
+    never reads a partial bundle. Older bundles beyond the keep most recent are removed.
+
+    :param df: Session DataFrame with the dashboard columns (see
+        xdr_schema.COLUMN_SETS["dashboard"]).
+    :param output_dir: Directory holding the bundles, defaults to ARTIFACT_DIR.
+    :param keep: Number of bundles to keep, defaults to ARTIFACT_KEEP.
+    :param version: Bundle version, defaults to the current UTC time followed by a
+        random suffix, so two builds in the same second do not collide; an existing
+        version is never overwritten.
+    :return: Version of the published bundle.
+    """
+    output_dir = output_dir or ARTIFACT_DIR
+    keep = ARTIFACT_KEEP if keep is None else keep
+    version = version or (
+        time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-{uuid.uuid4().hex[:8]}"
+    )
+
+    # Every page projects the same per-user features, computed in one pass
+    features = build_user_features(df)
+    tables = {}
+    for builder in PAGE_BUILDERS.values():
+        tables.update(builder(features))
+
+    bundle_dir = os.path.join(output_dir, version)
+    os.makedirs(bundle_dir)
+    for name, table in tables.items():
+        write_snapshot(table, os.path.join(bundle_dir, f"{name}.arrow"))
+    with open(os.path.join(bundle_dir, "manifest.json"), "w") as f:
+        json.dump(
+            {
+                "version": version,
+                "created": time.time(),
+                "source_rows": len(df),
+                "tables": {name: len(table) for name, table in tables.items()},
+            },
+            f,
+            indent=2,
+        )
+
+    # Publish atomically
+    latest_path = os.path.join(output_dir, LATEST_FILE)
+    with open(f"{latest_path}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{latest_path}.tmp", latest_path)
+
+    versions = sorted(
+        name
+        for name in os.listdir(output_dir)
+        if os.path.isdir(os.path.join(output_dir, name))
+    )
+    for old_version in versions[:-keep] if keep else []:
+        if old_version != version:
+            shutil.rmtree(os.path.join(output_dir, old_version))
+    return version
+
+
+def latest_version(artifact_dir=None):
+    """
+    Return the version of the latest published bundle, or None if there is none.
+    """
+    latest_path = os.path.join(artifact_dir or ARTIFACT_DIR, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path) as f:
+        return f.read().strip()
+
+
+def load_artifact_bundle(artifact_dir=None, version=None):
+    """
+    Load a bundle of dashboard tables. Bundles are memory-mapped and kept per process,
+    so only the first session after a new bundle is published reads it from disk.
+
+    :param artifact_dir: Directory holding the bundles, defaults to ARTIFACT_DIR.
+    :param version: Bundle version, defaults to the latest.
+    :return: Dict of table name -> DataFrame, plus "manifest" -> dict.
+    """
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    version = version or latest_version(artifact_dir)
+    if version is None:
+        raise FileNotFoundError(f"No dashboard artifact bundle in {artifact_dir}")
+
+    key = os.path.join(os.path.abspath(artifact_dir), version)
+    if key not in _bundles:
+        with open(os.path.join(key, "manifest.json")) as f:
+            manifest = json.load(f)
+        bundle = {
+            name: read_snapshot(os.path.join(key, f"{name}.arrow"))
+            for name in manifest["tables"]
+        }
+        bundle["manifest"] = manifest
+        # Only the current bundle is kept in memory
+        _bundles.clear()
+        _bundles[key] = bundle
+    return _bundles[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the dashboard artifact bundle from xdr_data."
+    )
+    parser.add_argument(
+        "--output", default=ARTIFACT_DIR, help="Directory holding the bundles"
+    )
+    parser.add_argument(
+        "--keep", type=int, default=ARTIFACT_KEEP, help="Number of bundles to keep"
+    )
+    args = parser.parse_args()
+
+    df = load_xdr_data("dashboard")
+    if df is None:
+        raise SystemExit("Could not load xdr_data")
+    version = build_dashboard_artifacts(df, output_dir=args.output, keep=args.keep)
+    print(f"Published dashboard artifact bundle {version} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/db_connection.py
+
+import os
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from lazy_imports import lazy_object
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Fetch database connection parameters from environment variables
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_FETCH_SIZE = int(os.getenv("DB_FETCH_SIZE", "100000"))
+
+# SQLAlchemy loads when the first engine is created
+create_engine = lazy_object("sqlalchemy", "create_engine")
+URL = lazy_object("sqlalchemy.engine", "URL")
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def build_database_url():
+    """
+    Build the SQLAlchemy URL of the PostgreSQL database from the DB_* environment
+    variables.
+    """
+    return URL.create(
+        "postgresql+psycopg2",
+        username=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=int(DB_PORT) if DB_PORT else None,
+        database=DB_NAME,
+    )
+
+
+def get_engine(db_url=None):
+    """
+    Return the process-wide pooled SQLAlchemy engine, creating it on first use.
+
+    Engines are cached per URL so every loader and query function borrows connections
+    from the same pool instead of paying the TCP and authentication setup on each call.
+
+    :param db_url: Optional database URL, defaults to the one built from the DB_*
+        variables.
+    :return: SQLAlchemy Engine.
+    """
+    url = db_url or build_database_url()
+    key = (
+        str(url) if isinstance(url, str) else url.render_as_string(hide_password=False)
+    )
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            connect_args = {}
+            if DB_STATEMENT_TIMEOUT_MS > 0:
+                connect_args["options"] = (
+                    f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+                )
+
+            engine = create_engine(
+                url,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+                connect_args=connect_args,
+            )
+            _engines[key] = engine
+    return engine
+
+
+@contextmanager
+def get_connection(db_url=None):
+    """
+    Borrow a raw psycopg2 connection from the pooled engine.
+
+    The connection is handed back to the pool (and its transaction rolled back) on exit.
+    """
+    connection = get_engine(db_url).raw_connection()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+def dispose_engines():
+    """
+    Close every pooled connection, e.g. before forking worker processes.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
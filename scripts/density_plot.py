@@ -0,0 +1,126 @@
+# scripts/density_plot.py
+
+import os
+import numpy as np
+import pandas as pd
+from lazy_imports import lazy_module, lazy_object
+
+# Plotting libraries load on first use
+sns = lazy_module("seaborn")
+LogNorm = lazy_object("matplotlib.colors", "LogNorm")
+Patch = lazy_object("matplotlib.patches", "Patch")
+
+# Above this many points scatter plots are drawn as binned density images
+DENSITY_THRESHOLD = int(os.getenv("DENSITY_PLOT_THRESHOLD", "50000"))
+DENSITY_BINS = 200
+
+
+def density_grids(x, y, groups=None, bins=DENSITY_BINS):
+    """
+    Bin points into a 2D grid per group in one vectorized pass.
+
+    Points with a missing coordinate (or group) are skipped.
+
+    :param x: Array-like of x coordinates.
+    :param y: Array-like of y coordinates.
+    :param groups: Optional array-like of group labels (e.g. clusters).
+    :param bins: Number of bins along each axis.
+    :return: Tuple (counts of shape (bins, bins, n_groups), x edges, y edges, group
+        labels).
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    if groups is None:
+        codes, labels = np.zeros(len(x), dtype="int64"), np.array([None])
+    else:
+        codes, labels = pd.factorize(pd.Series(groups).to_numpy(), sort=True)
+
+    keep = np.isfinite(x) & np.isfinite(y) & (codes >= 0)
+    x, y, codes = x[keep], y[keep], codes[keep]
+    if len(x) == 0:
+        return (
+            np.zeros((bins, bins, len(labels))),
+            np.linspace(0, 1, bins + 1),
+            np.linspace(0, 1, bins + 1),
+            labels,
+        )
+
+    # Degenerate ranges get a unit width so every point still falls in a bin
+    x_range = (x.min(), x.max() if x.max() > x.min() else x.min() + 1)
+    y_range = (y.min(), y.max() if y.max() > y.min() else y.min() + 1)
+    counts, (x_edges, y_edges, _) = np.histogramdd(
+        np.column_stack([x, y, codes]),
+        bins=[bins, bins, len(labels)],
+        range=[x_range, y_range, (-0.5, len(labels) - 0.5)],
+    )
+    return counts, x_edges, y_edges, labels
+
+
+def draw_density(
+    ax, x, y, hue=None, bins=DENSITY_BINS, palette="coolwarm", cmap="viridis"
+):
+    """
+    Draw points as a density image. Without hue the image is a log-scaled count heatmap;
+    with hue each bin takes the color of its dominant group and an opacity growing with
+    its log count.
+    """
+    counts, x_edges, y_edges, labels = density_grids(x, y, hue, bins)
+    extent = [x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]]
+
+    if hue is None:
+        grid = counts[:, :, 0].T
+        image = ax.imshow(
+            np.ma.masked_equal(grid, 0),
+            origin="lower",
+            extent=extent,
+            aspect="auto",
+            interpolation="nearest",
+            cmap=cmap,
+            norm=LogNorm(vmin=1, vmax=max(grid.max(), 1)),
+        )
+        ax.figure.colorbar(image, ax=ax, label="points per bin")
+        return
+
+    colors = np.array(sns.color_palette(palette, len(labels)))
+    total = counts.sum(axis=2)
+    rgba = np.zeros(total.shape + (4,))
+    rgba[:, :, :3] = colors[counts.argmax(axis=2)]
+    rgba[:, :, 3] = np.log1p(total) / np.log1p(max(total.max(), 1))
+    ax.imshow(
+        rgba.transpose(1, 0, 2),
+        origin="lower",
+        extent=extent,
+        aspect="auto",
+        interpolation="nearest",
+    )
+    ax.legend(
+        handles=[
+            Patch(color=color, label=str(label)) for color, label in zip(colors, labels)
+        ],
+        title=getattr(hue, "name", None),
+    )
+
+
+def plot_points(
+    ax, x, y, hue=None, threshold=None, bins=DENSITY_BINS, palette="coolwarm"
+):
+    """
+    Scatter the points, or draw them as a density image when there are more than
+    threshold of them, so the render time and figure size stop growing with the number
+    of rows.
+
+    :param threshold: Point count above which the density mode is used, defaults to
+        DENSITY_THRESHOLD.
+    :return: "scatter" or "density", the mode that was used.
+    """
+    threshold = DENSITY_THRESHOLD if threshold is None else threshold
+    if len(x) <= threshold:
+        sns.scatterplot(
+            x=x, y=y, hue=hue, palette=palette if hue is not None else None, ax=ax
+        )
+        return "scatter"
+
+    draw_density(ax, x, y, hue, bins, palette)
+    ax.set_xlabel(getattr(x, "name", None))
+    ax.set_ylabel(getattr(y, "name", None))
+    return "density"
@@ -1,10 +1,14 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.decomposition import PCA
+from lazy_imports import lazy_module, lazy_object
 from load_data import load_data_from_postgres
 from overview_analysis import clean_data
+from density_plot import plot_points
+
+# Plotting and modelling libraries load on first use
+plt = lazy_module('matplotlib.pyplot')
+sns = lazy_module('seaborn')
+PCA = lazy_object('sklearn.decomposition', 'PCA')
 
 def load_and_prepare_data(query):
     """
@@ -74,7 +78,7 @@ def bivariate_analysis(df):
     
     for app in applications:
         plt.figure(figsize=(10, 6))
-        sns.scatterplot(x=df[app], y=df['total_data'])
+        plot_points(plt.gca(), df[app], df['total_data'])
         plt.title(f'Relationship between {app} and Total Data')
         plt.xlabel(app)
         plt.ylabel('Total Data (DL + UL)')
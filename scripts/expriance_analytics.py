@@ -1,11 +1,23 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from lazy_imports import lazy_module, lazy_object
 from load_data import load_data_from_postgres
 from overview_analysis import clean_data
+from user_features import aggregate_per_user
+from xdr_schema import XDR_TABLE
+
+# Plotting and modelling libraries load on first use
+plt = lazy_module('matplotlib.pyplot')
+sns = lazy_module('seaborn')
+StandardScaler = lazy_object('sklearn.preprocessing', 'StandardScaler')
+KMeans = lazy_object('sklearn.cluster', 'KMeans')
+
+EXPERIENCE_METRICS = {
+    'avg_tcp_retransmission': ('TCP DL Retrans. Vol (Bytes)', 'mean'),
+    'avg_rtt': ('Avg RTT DL (ms)', 'mean'),
+    'handset_type': ('Handset Type', 'first'),
+    'avg_throughput': ('Avg Bearer TP DL (kbps)', 'mean')
+}
 
 def load_and_prepare_data(query):
     """
@@ -24,25 +36,23 @@ def treat_missing_and_outliers(df):
         df[column] = np.where(df[column] > df[column].mean() + 3 * df[column].std(), df[column].mean(), df[column])
         df[column] = np.where(df[column] < df[column].mean() - 3 * df[column].std(), df[column].mean(), df[column])
     
-    for column in df.select_dtypes(include=[object]).columns:
+    for column in df.select_dtypes(include=[object, 'category']).columns:
         df[column] = df[column].fillna(df[column].mode()[0])
     
     return df
 
-def aggregate_per_customer(df):
+def aggregate_per_customer(df=None, backend='pandas', source=XDR_TABLE):
     """
     Aggregate, per customer, the following information:
     - Average TCP retransmission
     - Average RTT
     - Handset type
     - Average throughput
+
+    Accepts sessions (a DataFrame or a stream of DataFrame chunks) or a feature table from
+    user_features.build_user_features; see user_features.aggregate_per_user for the backends.
     """
-    user_aggregated_data = df.groupby('MSISDN/Number').agg(
-        avg_tcp_retransmission=('TCP DL Retrans. Vol (Bytes)', 'mean'),
-        avg_rtt=('Avg RTT DL (ms)', 'mean'),
-        handset_type=('Handset Type', 'first'),
-        avg_throughput=('Avg Bearer TP DL (kbps)', 'mean')
-    ).reset_index()
+    user_aggregated_data = aggregate_per_user(df, EXPERIENCE_METRICS, backend, source)
     
     return user_aggregated_data
 
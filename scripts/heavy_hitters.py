@@ -0,0 +1,234 @@
+# scripts/heavy_hitters.py
+
+import math
+import numpy as np
+import pandas as pd
+from id_encoding import hash_keys
+
+HEAVY_HITTER_CAPACITY = 1000
+
+# Leaderboard -> (key column, weight column(s), function): "count" counts the
+# non-missing values of the column, "sum" adds up the column(s)
+LEADERBOARDS = {
+    "handsets": ("Handset Type", "Handset Type", "count"),
+    "manufacturers": ("Handset Manufacturer", "Handset Manufacturer", "count"),
+    "subscribers_by_sessions": ("MSISDN/Number", "Bearer Id", "count"),
+    "subscribers_by_duration": ("MSISDN/Number", "Dur. (ms)", "sum"),
+    "subscribers_by_data_volume": (
+        "MSISDN/Number",
+        ["Total DL (Bytes)", "Total UL (Bytes)"],
+        "sum",
+    ),
+}
+
+
+def _reduce(counters, capacity):
+    # Misra-Gries reduction: subtract the (capacity + 1)-th largest counter from every
+    # counter and drop the ones left at zero, so at most capacity counters remain
+    if len(counters) <= capacity:
+        return counters
+    threshold = counters.nlargest(capacity + 1).iloc[-1]
+    counters = counters - threshold
+    return counters[counters > 0]
+
+
+def chunk_weights(df, key, columns, func="count"):
+    """
+    Compute the weight of every key of a chunk: the count of non-missing values of a
+    column, or the sum of one or more columns. Rows with a missing key are skipped.
+
+    :return: Series of key -> weight.
+    """
+    if func == "count":
+        weights = df[columns].notna().astype(float)
+    elif func == "sum":
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        weights = df[columns].astype(float).sum(axis=1)
+    else:
+        raise ValueError(f"Unknown heavy hitter function: {func}")
+    if (weights < 0).any():
+        raise ValueError("Heavy hitter weights must not be negative")
+    return weights.groupby(df[key], observed=True, dropna=True, sort=False).sum()
+
+
+def summarize(weights, capacity=HEAVY_HITTER_CAPACITY):
+    """
+    Build a heavy hitter summary from per-key weights.
+
+    The summary is a Misra-Gries summary (equivalent to Space-Saving): at most capacity
+    counters, each a lower bound of the true weight of its key that misses it by at most
+    error_bound().
+
+    :param weights: Series of key -> non-negative weight.
+    :param capacity: Maximum number of counters kept.
+    :return: Dict with "capacity", "total" (weight seen) and "counters" (Series of key
+        -> counter).
+    """
+    return {
+        "capacity": capacity,
+        "total": float(weights.sum()),
+        "counters": _reduce(weights[weights > 0].astype(float), capacity),
+    }
+
+
+def update_summary(summary, df, key, columns, func="count"):
+    """
+    Fold a chunk of sessions into a summary, see chunk_weights for the weights.
+    """
+    return merge_summaries(
+        summary, summarize(chunk_weights(df, key, columns, func), summary["capacity"])
+    )
+
+
+def merge_summaries(*summaries):
+    """
+    Merge summaries built on different chunks or shards; the result has the smallest
+    capacity and the error bound of a summary built on all their data.
+    """
+    capacity = min(summary["capacity"] for summary in summaries)
+    counters = pd.concat([summary["counters"] for summary in summaries])
+    counters = counters.groupby(level=0, observed=True, sort=False).sum()
+    return {
+        "capacity": capacity,
+        "total": sum(summary["total"] for summary in summaries),
+        "counters": _reduce(counters, capacity),
+    }
+
+
+def error_bound(summary):
+    """
+    Return the largest amount by which a counter can underestimate the weight of its
+    key; a key without a counter weighs at most this much.
+    """
+    return max(summary["total"] - float(summary["counters"].sum()), 0.0) / (
+        summary["capacity"] + 1
+    )
+
+
+def top_heavy_hitters(summary, k=10):
+    """
+    Return the k heaviest keys of a summary with the bounds of their true weights.
+
+    :return: DataFrame indexed by key with "lower" and "upper" bounds, by descending
+        lower bound, and "guaranteed" telling whether the key is certainly among the
+        true top k.
+    """
+    bound = error_bound(summary)
+    ranked = summary["counters"].sort_values(ascending=False, kind="stable")
+    top = pd.DataFrame({"lower": ranked.iloc[:k], "upper": ranked.iloc[:k] + bound})
+    # A key is surely in the top k if no key outside it can outweigh its lower bound
+    challenger = ranked.iloc[k] + bound if len(ranked) > k else bound
+    top["guaranteed"] = top["lower"] >= challenger
+    return top
+
+
+def build_leaderboards(chunks, boards=None, capacity=HEAVY_HITTER_CAPACITY):
+    """
+    Maintain heavy hitter summaries over a stream of session chunks in one pass.
+
+    Memory is bounded by the chunk size and capacity counters per board, whatever the
+    stream length.
+
+    :param chunks: DataFrame or iterable of DataFrame chunks.
+    :param boards: Dict of name -> (key column, weight column(s), function), defaults to
+        LEADERBOARDS.
+    :param capacity: Counters per board.
+    :return: Dict of name -> summary.
+    """
+    boards = boards or LEADERBOARDS
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    summaries = {name: summarize(pd.Series(dtype=float), capacity) for name in boards}
+    for chunk in chunks:
+        for name, (key, columns, func) in boards.items():
+            summaries[name] = update_summary(summaries[name], chunk, key, columns, func)
+    return summaries
+
+
+def stream_value_counts(chunks, column, n=10, capacity=HEAVY_HITTER_CAPACITY):
+    """
+    Count the most frequent values of a column over a stream of chunks with bounded
+    memory.
+
+    The counts are exact while the column has at most capacity distinct values, and
+    otherwise lower bounds within error_bound() of the true counts.
+
+    :return: Series of value -> count, by descending count, like value_counts().head(n).
+    """
+    summary = build_leaderboards(chunks, {column: (column, column, "count")}, capacity)[
+        column
+    ]
+    counts = top_heavy_hitters(summary, n)["lower"]
+    return counts.rename("count").rename_axis(column)
+
+
+def count_min_sketch(epsilon=0.001, delta=0.01):
+    """
+    Create an empty Count-Min sketch answering the weight of any key with an
+    overestimate of at most epsilon times the total weight, with probability 1 - delta.
+
+    :return: Dict with "table" (depth x width counters), "epsilon", "delta" and "total".
+    """
+    width = math.ceil(math.e / epsilon)
+    depth = math.ceil(math.log(1 / delta))
+    return {
+        "table": np.zeros((depth, width)),
+        "epsilon": epsilon,
+        "delta": delta,
+        "total": 0.0,
+    }
+
+
+def _cells(table, keys):
+    # Double hashing (Kirsch-Mitzenmacher): row i uses h1 + i * h2
+    hashes = hash_keys(pd.Index(keys))
+    h1, h2 = hashes & 0xFFFFFFFF, (hashes >> np.uint64(32)) | np.uint64(1)
+    depth, width = table.shape
+    return [
+        ((h1 + np.uint64(i) * h2) % np.uint64(width)).astype(np.intp)
+        for i in range(depth)
+    ]
+
+
+def update_count_min(sketch, weights):
+    """
+    Add per-key weights (a Series of key -> weight, see chunk_weights) to a Count-Min
+    sketch.
+    """
+    table = sketch["table"]
+    for row, cells in enumerate(_cells(table, weights.index)):
+        table[row] += np.bincount(
+            cells, weights=weights.to_numpy(dtype=float), minlength=table.shape[1]
+        )
+    sketch["total"] += float(weights.sum())
+    return sketch
+
+
+def merge_count_min(*sketches):
+    """
+    Merge Count-Min sketches built with the same epsilon and delta on different shards.
+    """
+    shapes = {sketch["table"].shape for sketch in sketches}
+    if len(shapes) > 1:
+        raise ValueError(
+            f"Count-Min sketches of different sizes cannot be merged: {sorted(shapes)}"
+        )
+    return {
+        "table": sum(sketch["table"] for sketch in sketches),
+        "epsilon": sketches[0]["epsilon"],
+        "delta": sketches[0]["delta"],
+        "total": sum(sketch["total"] for sketch in sketches),
+    }
+
+
+def query_count_min(sketch, keys):
+    """
+    Estimate the weight of keys; each estimate is at least the true weight.
+
+    :return: Series of key -> estimate.
+    """
+    table = sketch["table"]
+    estimates = np.min(
+        [table[row, cells] for row, cells in enumerate(_cells(table, keys))], axis=0
+    )
+    return pd.Series(estimates, index=pd.Index(keys))
@@ -0,0 +1,244 @@
+# scripts/hyperloglog.py
+
+import numpy as np
+import pandas as pd
+from id_encoding import hash_keys
+from snapshot_cache import read_snapshot, write_snapshot
+
+# 2**14 registers: 16 KB per sketch and a relative standard error of about 0.8%
+HLL_PRECISION = 14
+# Per-group sketches use 2**12 registers (4 KB, about 1.6% error) as there can be
+# thousands of groups
+GROUPED_HLL_PRECISION = 12
+MIN_PRECISION, MAX_PRECISION = 11, 18
+
+
+def day_of_start(chunk):
+    """
+    Return the day of the start of every session, the grouping of daily cardinalities.
+    """
+    return pd.to_datetime(chunk["Start"]).dt.floor("D")
+
+
+# Named groupings of distinct_counts: name -> column or function of a chunk returning
+# the labels
+DISTINCT_GROUPINGS = {
+    "handset": "Handset Type",
+    "location": "Last Location Name",
+    "day": day_of_start,
+}
+
+
+def hll_sketch(precision=HLL_PRECISION):
+    """
+    Create an empty HyperLogLog sketch with 2**precision registers.
+    """
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(
+            f"HyperLogLog precision must be between {MIN_PRECISION} and {MAX_PRECISION}"
+        )
+    return {"precision": precision, "registers": np.zeros(2**precision, dtype=np.uint8)}
+
+
+def hash_ids(values):
+    """
+    Hash identifiers to 64 bits, skipping missing ones, see id_encoding.hash_keys.
+    """
+    return hash_keys(pd.Series(values).dropna())
+
+
+def register_updates(hashes, precision):
+    """
+    Split hashes into register positions (the first precision bits) and ranks (the
+    position of the first set bit in the remaining bits).
+    """
+    rest_bits = 64 - precision
+    positions = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    # rest has at most 53 bits, so its float64 exponent is its exact bit length
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    return positions, (rest_bits - bit_length + 1).astype(np.uint8)
+
+
+def update_hll(sketch, values):
+    """
+    Add identifiers to a sketch.
+    """
+    positions, ranks = register_updates(hash_ids(values), sketch["precision"])
+    np.maximum.at(sketch["registers"], positions, ranks)
+    return sketch
+
+
+def merge_hll(*sketches):
+    """
+    Merge sketches built on different chunks or partitions; they must share the same
+    precision.
+    """
+    precisions = {sketch["precision"] for sketch in sketches}
+    if len(precisions) > 1:
+        raise ValueError(
+            "HyperLogLog sketches of different precisions cannot be merged: "
+            f"{sorted(precisions)}"
+        )
+    return {
+        "precision": sketches[0]["precision"],
+        "registers": np.maximum.reduce([s["registers"] for s in sketches]),
+    }
+
+
+def hll_estimate(sketch):
+    """
+    Estimate the number of distinct identifiers added to a sketch.
+    """
+    registers = sketch["registers"]
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Linear counting is more accurate for small cardinalities
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+
+def hll_error(precision=HLL_PRECISION):
+    """
+    Return the relative standard error of the estimates of a sketch.
+    """
+    return 1.04 / np.sqrt(2**precision)
+
+
+def hll_to_bytes(sketch):
+    """
+    Serialize a sketch: one byte of precision followed by the registers.
+    """
+    return bytes([sketch["precision"]]) + sketch["registers"].tobytes()
+
+
+def hll_from_bytes(data):
+    """
+    Deserialize a sketch written by hll_to_bytes.
+    """
+    precision = data[0]
+    registers = np.frombuffer(data, dtype=np.uint8, offset=1).copy()
+    if len(registers) != 2**precision:
+        raise ValueError("Corrupted HyperLogLog sketch")
+    return {"precision": precision, "registers": registers}
+
+
+def save_sketches(sketches, path):
+    """
+    Save per-group sketches (see grouped_hll) as an Arrow IPC file of labels and
+    serialized sketches, so dashboards can merge and estimate them without reading
+    xdr_data.
+    """
+    write_snapshot(
+        pd.DataFrame(
+            {
+                "label": [None if label is None else str(label) for label in sketches],
+                "sketch": [hll_to_bytes(sketch) for sketch in sketches.values()],
+            }
+        ),
+        path,
+    )
+
+
+def load_sketches(path):
+    """
+    Load per-group sketches written by save_sketches; labels come back as strings.
+    """
+    table = read_snapshot(path)
+    return {
+        label: hll_from_bytes(data)
+        for label, data in zip(table["label"], table["sketch"])
+    }
+
+
+def grouped_hll(chunks, column="IMSI", by=None, precision=None):
+    """
+    Build one sketch per group over a stream of chunks, e.g. those of
+    load_xdr_data(columns, chunksize=...).
+
+    :param chunks: DataFrame or iterable of DataFrame chunks.
+    :param column: Identifier column to count.
+    :param by: None for a single sketch, a DISTINCT_GROUPINGS name, a column or a
+        function of a chunk returning the group labels. Rows without a label are
+        skipped.
+    :param precision: Sketch precision, defaults to HLL_PRECISION without grouping and
+        to GROUPED_HLL_PRECISION otherwise.
+    :return: Dict of group label -> sketch (a single None label without grouping).
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    by = DISTINCT_GROUPINGS.get(by, by) if isinstance(by, str) else by
+    precision = precision or (HLL_PRECISION if by is None else GROUPED_HLL_PRECISION)
+
+    sketches = {}
+    for chunk in chunks:
+        if by is None:
+            update_hll(sketches.setdefault(None, hll_sketch(precision)), chunk[column])
+            continue
+        labels = by(chunk) if callable(by) else chunk[by]
+        for label, rows in pd.Series(chunk[column].to_numpy()).groupby(
+            labels.to_numpy(), sort=False
+        ):
+            update_hll(sketches.setdefault(label, hll_sketch(precision)), rows)
+    return sketches
+
+
+def distinct_counts(chunks, column="IMSI", by=None, precision=None, exact=False):
+    """
+    Estimate the number of distinct identifiers (IMSI, MSISDN, ...) overall or per group
+    in one pass over a stream of chunks, holding only the sketches in memory.
+
+    :param exact: Also count the distinct identifiers exactly (holding them all in
+        memory) and report the relative error of every estimate.
+    :return: DataFrame indexed by group with "estimate", plus "exact" and
+        "relative_error" when exact is set. See grouped_hll for the other parameters.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    by_labels = DISTINCT_GROUPINGS.get(by, by) if isinstance(by, str) else by
+    seen = []
+
+    def tracked(stream):
+        for chunk in stream:
+            if exact:
+                labels = (
+                    None
+                    if by_labels is None
+                    else (by_labels(chunk) if callable(by_labels) else chunk[by_labels])
+                )
+                pairs = pd.DataFrame({"group": labels, "id": chunk[column]}).dropna(
+                    subset=["id"]
+                )
+                if by_labels is not None:
+                    pairs = pairs.dropna(subset=["group"])
+                seen.append(pairs.drop_duplicates())
+            yield chunk
+
+    sketches = grouped_hll(tracked(chunks), column, by, precision)
+    counts = pd.DataFrame(
+        {
+            "estimate": {
+                label: hll_estimate(sketch) for label, sketch in sketches.items()
+            }
+        }
+    )
+    counts.index.name = by if isinstance(by, str) else None
+    if exact:
+        pairs = pd.concat(seen) if seen else pd.DataFrame(columns=["group", "id"])
+        if by_labels is None:
+            counts["exact"] = pairs["id"].nunique()
+        else:
+            counts["exact"] = (
+                pairs.groupby("group", sort=False)["id"]
+                .nunique()
+                .reindex(counts.index)
+                .fillna(0)
+                .astype("int64")
+            )
+        counts["relative_error"] = (counts["estimate"] - counts["exact"]) / counts[
+            "exact"
+        ].where(counts["exact"] > 0)
+    return counts
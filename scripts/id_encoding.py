@@ -0,0 +1,198 @@
+# scripts/id_encoding.py
+
+import numpy as np
+import pandas as pd
+
+# Code of a missing identifier; such rows are left out of every aggregation, like a
+# pandas groupby
+MISSING_CODE = -1
+
+SUBSCRIBER_ID_COLUMNS = ["MSISDN/Number", "IMSI"]
+
+# Start time of a session. When the sessions carry it, 'first' takes the value of the
+# earliest session, ties broken by the smallest value, rather than the first in row
+# order, so the result does not depend on how the rows were read (see
+# sql_pushdown.SESSION_ORDER for the SQL side).
+SESSION_START = "Start"
+
+
+def encode_ids(values):
+    """
+    Map identifiers to dense int32 codes 0..n-1 in ascending identifier order.
+
+    :param values: Series or array of identifiers (float64 with NaNs, Int64, ...).
+    :return: Tuple (int32 codes with MISSING_CODE for missing identifiers, Index of the
+        identifiers where position i holds the identifier of code i).
+    """
+    codes, dictionary = pd.factorize(pd.Series(values), sort=True, use_na_sentinel=True)
+    dtype = np.int32 if len(dictionary) < 2**31 else np.int64
+    return codes.astype(dtype, copy=False), pd.Index(dictionary)
+
+
+def decode_ids(codes, dictionary):
+    """
+    Map codes back to their identifiers; MISSING_CODE gives a missing value.
+    """
+    return pd.Index(
+        pd.api.extensions.take(
+            dictionary.array, np.asarray(codes, dtype=np.intp), allow_fill=True
+        )
+    )
+
+
+def hash_keys(keys):
+    """
+    Hash a Series or Index of keys to 64 bits; numeric keys are hashed as integers so
+    the same MSISDN read as float64 or Int64 gets the same hash.
+    """
+    if pd.api.types.is_numeric_dtype(keys.dtype):
+        return pd.util.hash_array(
+            keys.to_numpy(dtype=np.float64, na_value=np.nan).astype(np.int64)
+        )
+    return pd.util.hash_array(keys.to_numpy(dtype=object))
+
+
+def encode_id_columns(df, columns=None):
+    """
+    Encode the subscriber identifier columns of a DataFrame.
+
+    :param columns: Identifier columns, defaults to the SUBSCRIBER_ID_COLUMNS present in
+        df.
+    :return: Dict of column -> (codes, dictionary), see encode_ids.
+    """
+    columns = columns or [
+        column for column in SUBSCRIBER_ID_COLUMNS if column in df.columns
+    ]
+    return {column: encode_ids(df[column]) for column in columns}
+
+
+def aggregation_columns(columns, key, spec):
+    """
+    Return the columns needed to aggregate a spec: the key, the spec columns and the
+    session start when a 'first' is computed and columns hold it.
+    """
+    needed = [key] + [column for column, _ in spec.values()]
+    if SESSION_START in columns and any(func == "first" for _, func in spec.values()):
+        needed.append(SESSION_START)
+    return list(dict.fromkeys(needed))
+
+
+def session_order(df, column):
+    """
+    Return the row positions of df ordered by session start, then by the value of
+    column, with missing starts last; the order in which 'first' picks values.
+    """
+    starts = df[SESSION_START]
+    if not pd.api.types.is_datetime64_any_dtype(starts.dtype):
+        starts = pd.to_datetime(starts, errors="coerce")
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    keys = pd.DataFrame({"start": starts.to_numpy(), "value": values.to_numpy()})
+    return keys.sort_values(["start", "value"], kind="stable").index.to_numpy()
+
+
+def _float_values(series):
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values, ~np.isnan(values)
+
+
+def group_count(codes, n_groups, series):
+    """
+    Count the non-missing values of each group.
+    """
+    valid = series.notna().to_numpy() & (codes >= 0)
+    return np.bincount(codes[valid], minlength=n_groups)
+
+
+def group_sum(codes, n_groups, series):
+    """
+    Sum the values of each group, skipping missing values (an empty group sums to 0).
+
+    Integer columns are summed exactly in int64 once the total could exceed the float64
+    mantissa.
+    """
+    keep = codes >= 0
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+        values = series.to_numpy(dtype=np.int64)
+        if np.abs(values).sum(dtype=np.float64) >= 2**53:
+            totals = np.zeros(n_groups, dtype=np.int64)
+            np.add.at(totals, codes[keep], values[keep])
+            return totals
+    values, valid = _float_values(series)
+    keep &= valid
+    return np.bincount(codes[keep], weights=values[keep], minlength=n_groups)
+
+
+def group_mean(codes, n_groups, series):
+    """
+    Average the values of each group, skipping missing values (an empty group gives
+    NaN).
+    """
+    values, valid = _float_values(series)
+    keep = valid & (codes >= 0)
+    totals = np.bincount(codes[keep], weights=values[keep], minlength=n_groups)
+    counts = np.bincount(codes[keep], minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def group_first(codes, n_groups, series, order=None):
+    """
+    Return the first non-missing value of each group, keeping the dtype of the series.
+
+    :param order: Optional row positions giving the order in which values count as
+        first, defaults to row order.
+    """
+    rank = np.arange(len(series))
+    if order is not None:
+        rank[order] = np.arange(len(series))
+    positions = np.flatnonzero(series.notna().to_numpy() & (codes >= 0))
+    first = np.full(n_groups, len(series), dtype=np.int64)
+    np.minimum.at(first, codes[positions], rank[positions])
+    found = first < len(series)
+    if order is not None:
+        first = order[np.where(found, first, 0)]
+    return series.iloc[np.where(found, first, 0)].reset_index(drop=True).where(found)
+
+
+GROUP_REDUCERS = {
+    "sum": group_sum,
+    "count": group_count,
+    "mean": group_mean,
+    "first": group_first,
+}
+
+
+def aggregate_by_codes(df, key, spec, encoding=None):
+    """
+    Aggregate a DataFrame per identifier with NumPy reductions over dense codes instead
+    of a pandas hash groupby.
+
+    :param df: DataFrame.
+    :param key: Identifier column to group by.
+    :param spec: Dict of output name -> (column, function), function in GROUP_REDUCERS.
+    :param encoding: Optional (codes, dictionary) of df[key] from encode_ids, so a frame
+        aggregated several times is encoded once.
+    :return: DataFrame equal to df.groupby(key).agg(**spec).reset_index(), with the same
+        dtypes; when df has a SESSION_START column 'first' follows session_order rather
+        than row order.
+    """
+    unsupported = [func for _, func in spec.values() if func not in GROUP_REDUCERS]
+    if unsupported:
+        raise ValueError(f"Unsupported aggregation functions: {unsupported}")
+
+    codes, dictionary = encoding if encoding is not None else encode_ids(df[key])
+    # The output dtypes are those of the groupby on an empty frame
+    dtypes = df.iloc[:0].groupby(key).agg(**spec).dtypes
+
+    result = pd.DataFrame({key: pd.Series(dictionary, dtype=df[key].dtype)})
+    for name, (column, func) in spec.items():
+        if func == "first" and SESSION_START in df.columns:
+            values = group_first(
+                codes, len(dictionary), df[column], session_order(df, column)
+            )
+        else:
+            values = GROUP_REDUCERS[func](codes, len(dictionary), df[column])
+        result[name] = pd.Series(values).astype(dtypes[name])
+    return result
@@ -0,0 +1,323 @@
+# scripts/index_advisor.py
+
+import json
+import os
+from statistics import median
+from db_connection import DB_NAME, get_connection
+from sql_queries import TELECOM_QUERIES
+from xdr_schema import XDR_TABLE
+
+# Indexes managed by the advisor. "types" restricts an index to columns of those
+# PostgreSQL types, e.g. a BRIN index on "Start" only pays off when it is a real
+# timestamp column.
+MANAGED_INDEXES = [
+    {
+        "name": "xdr_data_start_brin",
+        "column": "Start",
+        "types": ("timestamp without time zone", "timestamp with time zone", "date"),
+        "sql": (
+            f"CREATE INDEX IF NOT EXISTS xdr_data_start_brin ON {XDR_TABLE} "
+            f'USING brin ("Start")'
+        ),
+    },
+    {
+        "name": "xdr_data_imsi_btree",
+        "column": "IMSI",
+        "types": None,
+        "sql": (
+            f'CREATE INDEX IF NOT EXISTS xdr_data_imsi_btree ON {XDR_TABLE} ("IMSI") '
+            f'INCLUDE ("Total UL (Bytes)", "Total DL (Bytes)")'
+        ),
+    },
+    {
+        "name": "xdr_data_msisdn_btree",
+        "column": "MSISDN/Number",
+        "types": None,
+        "sql": (
+            f"CREATE INDEX IF NOT EXISTS xdr_data_msisdn_btree ON {XDR_TABLE} "
+            f'("MSISDN/Number") '
+            f'INCLUDE ("Dur. (ms)", "Total DL (Bytes)", "Total UL (Bytes)")'
+        ),
+    },
+    {
+        "name": "xdr_data_msisdn_hash",
+        "column": "MSISDN/Number",
+        "types": None,
+        "sql": (
+            f"CREATE INDEX IF NOT EXISTS xdr_data_msisdn_hash ON {XDR_TABLE} "
+            f'USING hash ("MSISDN/Number")'
+        ),
+    },
+    {
+        "name": "xdr_data_handset_btree",
+        "column": "Handset Manufacturer",
+        "types": None,
+        "sql": (
+            f"CREATE INDEX IF NOT EXISTS xdr_data_handset_btree ON {XDR_TABLE} "
+            f'("Handset Manufacturer", "Handset Type")'
+        ),
+    },
+    {
+        "name": "xdr_data_location_btree",
+        "column": "Last Location Name",
+        "types": None,
+        "sql": (
+            f"CREATE INDEX IF NOT EXISTS xdr_data_location_btree ON {XDR_TABLE} "
+            f'("Last Location Name") INCLUDE ("Avg RTT DL (ms)", "Avg RTT UL (ms)")'
+        ),
+    },
+]
+
+MANAGED_STATISTICS = [
+    f"CREATE STATISTICS IF NOT EXISTS xdr_data_handset_stats (ndistinct, dependencies) "
+    f'ON "Handset Manufacturer", "Handset Type" FROM {XDR_TABLE}',
+]
+
+# Larger per-column samples for the skewed grouping columns
+STATISTICS_TARGETS = {
+    "Handset Manufacturer": 1000,
+    "Handset Type": 1000,
+    "Last Location Name": 1000,
+    "IMSI": 500,
+    "MSISDN/Number": 500,
+}
+
+
+def column_types(connection, table=XDR_TABLE):
+    """
+    Return the PostgreSQL data type of every column of a table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = %s",
+            (table,),
+        )
+        return dict(cursor.fetchall())
+
+
+def apply_indexes():
+    """
+    Create the managed indexes and extended statistics, raise the statistics targets and
+    ANALYZE.
+
+    :return: List of (index name, status) where status is "created" or the reason it was
+        skipped.
+    """
+    applied = []
+    with get_connection() as connection:
+        types = column_types(connection)
+        with connection.cursor() as cursor:
+            for index in MANAGED_INDEXES:
+                column_type = types.get(index["column"])
+                if column_type is None:
+                    applied.append((index["name"], "skipped: column not found"))
+                elif index["types"] and column_type not in index["types"]:
+                    applied.append(
+                        (index["name"], f"skipped: column type is {column_type}")
+                    )
+                else:
+                    cursor.execute(index["sql"])
+                    applied.append((index["name"], "created"))
+
+            for statement in MANAGED_STATISTICS:
+                cursor.execute(statement)
+            for column, target in STATISTICS_TARGETS.items():
+                if column in types:
+                    cursor.execute(
+                        f"ALTER TABLE {XDR_TABLE} "
+                        f'ALTER COLUMN "{column}" SET STATISTICS {target}'
+                    )
+            cursor.execute(f"ANALYZE {XDR_TABLE}")
+        connection.commit()
+    return applied
+
+
+def drop_indexes():
+    """
+    Drop the managed indexes and extended statistics and restore the default statistics
+    targets.
+    """
+    with get_connection() as connection:
+        types = column_types(connection)
+        with connection.cursor() as cursor:
+            for index in MANAGED_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {index['name']}")
+            cursor.execute("DROP STATISTICS IF EXISTS xdr_data_handset_stats")
+            for column in STATISTICS_TARGETS:
+                if column in types:
+                    cursor.execute(
+                        f"ALTER TABLE {XDR_TABLE} "
+                        f'ALTER COLUMN "{column}" SET STATISTICS -1'
+                    )
+            cursor.execute(f"ANALYZE {XDR_TABLE}")
+        connection.commit()
+
+
+def plan_outline(plan):
+    """
+    Summarize a JSON plan node tree as a compact string, e.g. 'Limit > Sort >
+    HashAggregate > Seq Scan'.
+    """
+    label = plan["Node Type"]
+    if "Index Name" in plan:
+        label += f" ({plan['Index Name']})"
+    children = plan.get("Plans", [])
+    if not children:
+        return label
+    if len(children) == 1:
+        return f"{label} > {plan_outline(children[0])}"
+    return f"{label} > [" + ", ".join(plan_outline(child) for child in children) + "]"
+
+
+def explain_query(query, connection):
+    """
+    Run a query under EXPLAIN (ANALYZE, BUFFERS) and extract its timings and buffer
+    usage.
+
+    :return: Dict with planning/execution milliseconds, shared buffer hits/reads, the
+        plan outline and the full JSON plan.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.strip().rstrip(';')}"
+        )
+        result = cursor.fetchone()[0]
+    connection.rollback()
+
+    explained = result[0] if isinstance(result, list) else json.loads(result)[0]
+    plan = explained["Plan"]
+    return {
+        "planning_ms": explained.get("Planning Time"),
+        "execution_ms": explained.get("Execution Time"),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks"),
+        "shared_read_blocks": plan.get("Shared Read Blocks"),
+        "outline": plan_outline(plan),
+        "plan": explained,
+    }
+
+
+def summarize_runs(runs):
+    """
+    Combine repeated explain_query results of one query.
+
+    The first run pays for reading the table into the buffer cache; the later ones show
+    the steady state, so both are reported.
+
+    :return: Dict with the first run's milliseconds and blocks read, the median of the
+        later runs (the first run when there is only one), the plan outline and the JSON
+        plan of the last run.
+    """
+    warm = runs[1:] or runs
+    return {
+        "first_ms": runs[0]["execution_ms"],
+        "warm_ms": median(run["execution_ms"] for run in warm),
+        "shared_read_blocks": runs[0]["shared_read_blocks"],
+        "warm_read_blocks": warm[-1]["shared_read_blocks"],
+        "outline": runs[-1]["outline"],
+        "plan": runs[-1]["plan"],
+    }
+
+
+def explain_queries(queries=None, runs=1):
+    """
+    Explain every query of the telecom query set on one pooled connection.
+
+    :param runs: Number of times each query is run, back to back.
+    :return: Dict of query name -> summarize_runs result.
+    """
+    if runs < 1:
+        raise ValueError(f"Number of runs must be positive: {runs}")
+    queries = queries or TELECOM_QUERIES
+    with get_connection() as connection:
+        return {
+            name: summarize_runs(
+                [explain_query(query, connection) for _ in range(runs)]
+            )
+            for name, query in queries.items()
+        }
+
+
+def format_report(before, after, applied):
+    """
+    Format the before/after EXPLAIN results as a Markdown report.
+    """
+    lines = [
+        "# xdr_data index advisor report",
+        "",
+        "## Managed indexes",
+        "",
+    ]
+    lines += [f"- `{name}`: {status}" for name, status in applied]
+    lines += [
+        "",
+        "## Timings",
+        "",
+        "First run: the first execution after the indexes changed. "
+        "Warm: median of the later runs.",
+        "",
+        "| query | first before (ms) | first after (ms) | warm before (ms) "
+        "| warm after (ms) | warm speedup | blocks read before | blocks read after |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = b["warm_ms"] / a["warm_ms"] if a["warm_ms"] else float("nan")
+        lines.append(
+            f"| {name} | {b['first_ms']:.1f} | {a['first_ms']:.1f} "
+            f"| {b['warm_ms']:.1f} | {a['warm_ms']:.1f} | {speedup:.2f}x "
+            f"| {b['shared_read_blocks']} | {a['shared_read_blocks']} |"
+        )
+    lines += ["", "## Plans", ""]
+    for name in before:
+        lines += [
+            f"### {name}",
+            "",
+            f"- before: `{before[name]['outline']}`",
+            f"- after: `{after[name]['outline']}`",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def run_index_report(
+    output_dir="reports", queries=None, runs=3, confirm_throwaway=False
+):
+    """
+    Explain the telecom query set without the managed indexes, apply them, explain it
+    again and write a Markdown report plus the full JSON plans.
+
+    The managed indexes are dropped and recreated and xdr_data is analyzed, so this only
+    runs against a throwaway database and must be confirmed with confirm_throwaway.
+
+    :param output_dir: Directory receiving index_report.md and index_plans.json.
+    :param queries: Dict of name -> SQL query, defaults to TELECOM_QUERIES.
+    :param runs: Number of times each query is explained, the same before and after.
+    :param confirm_throwaway: Confirm that the indexes of the target database may be
+        dropped.
+    :return: Path of the Markdown report.
+    """
+    if not confirm_throwaway:
+        raise ValueError(
+            f"Refusing to drop and recreate the indexes of {XDR_TABLE} in {DB_NAME!r} "
+            f"without confirm_throwaway=True"
+        )
+    drop_indexes()
+    before = explain_queries(queries, runs)
+    applied = apply_indexes()
+    after = explain_queries(queries, runs)
+
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, "index_report.md")
+    with open(report_path, "w") as f:
+        f.write(format_report(before, after, applied))
+    with open(os.path.join(output_dir, "index_plans.json"), "w") as f:
+        json.dump(
+            {
+                name: {"before": before[name]["plan"], "after": after[name]["plan"]}
+                for name in before
+            },
+            f,
+            indent=2,
+        )
+    return report_path
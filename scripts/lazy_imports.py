@@ -0,0 +1,68 @@
+# scripts/lazy_imports.py
+
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access, so heavy
+    libraries (matplotlib, seaborn, sklearn, ...) are not loaded by modules that never
+    use them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+class LazyObject:
+    """
+    Stand-in for a class or function of a module, imported when it is first called or
+    inspected.
+    """
+
+    def __init__(self, module_name, attr):
+        self._module = LazyModule(module_name)
+        self._attr = attr
+
+    def _load(self):
+        return getattr(self._module, self._attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module._name}.{self._attr}>"
+
+
+def lazy_module(name):
+    """
+    Return a stand-in for a module, e.g. plt = lazy_module("matplotlib.pyplot").
+    """
+    return LazyModule(name)
+
+
+def lazy_object(module_name, attr):
+    """
+    Return a stand-in for a class or function, e.g. KMeans =
+    lazy_object("sklearn.cluster", "KMeans").
+    """
+    return LazyObject(module_name, attr)
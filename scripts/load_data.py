@@ -1,44 +1,94 @@
 # scripts/load_data.py
 
-import os
-import psycopg2
+import io
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from db_connection import DB_FETCH_SIZE, get_engine, get_connection
+from xdr_schema import build_select_query, apply_schema, quote_identifier
+from snapshot_cache import load_with_snapshot
+from query_cache import cached_query
 
+# Extraction methods: pandas' read_sql_query or a bulk COPY ... TO STDOUT
+LOAD_METHODS = ("read_sql", "copy")
 
-# Load environment variables from .env file
-load_dotenv()
+# Strategies to split a query into disjoint partitions
+PARTITION_STRATEGIES = ("hash", "range")
 
-# Fetch database connection parameters from environment variables
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
+# PostgreSQL type OIDs that need special handling when parsing COPY output
+DATE_TYPE_OIDS = {1082, 1114, 1184}  # date, timestamp, timestamptz
+TEXT_TYPE_OIDS = {25, 1042, 1043}  # text, char, varchar
 
-def load_data_from_postgres(query):
+
+def read_sql_via_copy(query, connection, params=None):
+    """
+    Runs the query through COPY (query) TO STDOUT into an in-memory CSV buffer and parses it
+    into columns with pandas' vectorized CSV reader, skipping the per-row Python tuples of
+    the DB-API fetch.
+
+    :param query: SQL SELECT query to execute.
+    :param connection: Open psycopg2 connection.
+    :param params: Optional query parameters, bound client-side since COPY takes no parameters.
+    :return: DataFrame with the same columns as pd.read_sql_query would return.
+    """
+    with connection.cursor() as cursor:
+        if params is not None:
+            query = cursor.mogrify(query, params).decode()
+        query = query.strip().rstrip(";")
+
+        # Fetch the result column names and types without reading any rows
+        cursor.execute(f"SELECT * FROM ({query}) AS copy_source LIMIT 0")
+        columns = [column[0] for column in cursor.description]
+        date_columns = [column[0] for column in cursor.description if column[1] in DATE_TYPE_OIDS]
+        text_columns = {column[0]: str for column in cursor.description if column[1] in TEXT_TYPE_OIDS}
+
+        buffer = io.BytesIO()
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buffer)
+
+    buffer.seek(0)
+    if buffer.getbuffer().nbytes == 0:
+        return pd.DataFrame(columns=columns)
+
+    # NULLs are written as empty fields; literal strings such as "NA" must stay strings
+    return pd.read_csv(
+        buffer,
+        names=columns,
+        header=None,
+        dtype=text_columns,
+        parse_dates=date_columns,
+        keep_default_na=False,
+        na_values=[""],
+    )
+
+
+def load_data_from_postgres(query, method="read_sql", params=None, cache=False):
     """
     Connects to the PostgreSQL database and loads data based on the provided SQL query.
 
     :param query: SQL query to execute.
+    :param method: "read_sql" to use pd.read_sql_query or "copy" for the bulk COPY extraction.
+    :param params: Optional query parameters.
+    :param cache: Serve the result from the query result cache while the tables it reads are unchanged.
     :return: DataFrame containing the results of the query.
     """
-    try:
-        # Establish a connection to the database
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method: {method}")
 
-        # Load data using pandas
-        df = pd.read_sql_query(query, connection)
+    if cache:
+        return cached_query(query, lambda: load_data_from_postgres(query, method=method, params=params),
+                            params=params, namespace=f"postgres:{method}")
 
-        # Close the database connection
-        connection.close()
+    try:
+        # Borrow a connection from the shared pool
+        with get_connection() as connection:
+
+            # Load data using pandas
+            if method == "copy":
+                df = read_sql_via_copy(query, connection, params)
+            else:
+                df = pd.read_sql_query(query, connection, params=params)
 
         return df
 
@@ -47,26 +97,226 @@ def load_data_from_postgres(query):
         return None
 
 
-
-def load_data_using_sqlalchemy(query):
+def load_data_using_sqlalchemy(query, method="read_sql", params=None, cache=False):
     """
     Connects to the PostgreSQL database and loads data based on the provided SQL query using SQLAlchemy.
 
     :param query: SQL query to execute.
+    :param method: "read_sql" to use pd.read_sql_query or "copy" for the bulk COPY extraction.
+    :param params: Optional query parameters.
+    :param cache: Serve the result from the query result cache while the tables it reads are unchanged.
     :return: DataFrame containing the results of the query.
     """
-    try:
-        # Create a connection string
-        connection_string = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method: {method}")
+
+    if cache:
+        return cached_query(query, lambda: load_data_using_sqlalchemy(query, method=method, params=params),
+                            params=params, namespace=f"sqlalchemy:{method}")
 
-        # Create an SQLAlchemy engine
-        engine = create_engine(connection_string)
+    try:
+        # Borrow the shared pooled SQLAlchemy engine
+        engine = get_engine()
 
         # Load data into a pandas DataFrame
-        df = pd.read_sql_query(query, engine)
+        if method == "copy":
+            with get_connection() as connection:
+                df = read_sql_via_copy(query, connection, params)
+        else:
+            df = pd.read_sql_query(query, engine, params=params)
 
         return df
 
     except Exception as e:
         print(f"An error occurred: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def stream_data_from_postgres(query, chunksize=None):
+    """
+    Connects to the PostgreSQL database and streams the results of the provided SQL query in chunks.
+
+    A server-side (named) cursor is used so only one chunk of rows is held in memory at a time.
+    Errors are reported and raised again, also in the middle of the stream, so consumers never
+    mistake a broken stream for a complete one.
+
+    :param query: SQL query to execute.
+    :param chunksize: Number of rows per yielded chunk, defaults to DB_FETCH_SIZE.
+    :return: Generator of DataFrames with at most chunksize rows each.
+    """
+    chunksize = chunksize or DB_FETCH_SIZE
+    try:
+        # Borrow a connection from the shared pool; it is returned when the stream ends
+        with get_connection() as connection:
+
+            # Named cursors live on the server and are only valid inside a transaction; a unique
+            # name keeps concurrent streams on the same connection apart
+            with connection.cursor(name=f"xdr_stream_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = chunksize
+                cursor.execute(query)
+
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    columns = [column[0] for column in cursor.description]
+                    yield pd.DataFrame.from_records(rows, columns=columns)
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+
+def partition_conditions(query, n_partitions, partition_column="MSISDN/Number", strategy="hash"):
+    """
+    Build the WHERE conditions splitting the rows of a query into n disjoint partitions.
+
+    "hash" assigns rows by a hash of the partition column, "range" splits the column's
+    [min, max] interval into equal-width ranges. Rows with a NULL key go to the first partition.
+
+    :param query: SQL query whose rows are partitioned; it must return the partition column.
+    :param n_partitions: Number of partitions.
+    :param partition_column: Column used to assign rows to partitions.
+    :param strategy: "hash" or "range".
+    :return: List of SQL conditions, one per partition.
+    """
+    if strategy not in PARTITION_STRATEGIES:
+        raise ValueError(f"Unknown partition strategy: {strategy}")
+
+    column = quote_identifier(partition_column)
+    null_condition = f"{column} IS NULL"
+
+    if strategy == "hash":
+        # Shift the signed 32-bit hash to a non-negative bigint before taking the modulo
+        bucket = f"mod(hashtext({column}::text)::bigint + 2147483648, {n_partitions})"
+        conditions = [f"{bucket} = {i}" for i in range(n_partitions)]
+    else:
+        bounds = load_data_from_postgres(
+            f"SELECT MIN({column}) AS low, MAX({column}) AS high FROM ({query.strip().rstrip(';')}) AS bounds"
+        )
+        low, high = float(bounds["low"].iloc[0]), float(bounds["high"].iloc[0])
+        width = (high - low) / n_partitions
+        edges = [low + i * width for i in range(n_partitions)] + [high]
+        conditions = [f"{column} >= {edges[i]!r} AND {column} < {edges[i + 1]!r}" for i in range(n_partitions)]
+        conditions[-1] = f"{column} >= {edges[-2]!r} AND {column} <= {high!r}"
+
+    conditions[0] = f"({conditions[0]}) OR {null_condition}"
+    return conditions
+
+
+def concat_partitions(frames):
+    """
+    Stack partition frames into one frame with a fresh index, like pd.concat, emptying the list.
+
+    NumPy columns are preallocated at their common dtype and filled partition by partition, each
+    partition being released once copied, so the load peaks at about the size of the result
+    rather than twice it. Other columns (strings, categoricals, ...) are concatenated per column.
+
+    :param frames: List of DataFrames with the same columns.
+    :return: DataFrame of all rows.
+    """
+    dtypes = pd.concat([frame.iloc[:0] for frame in frames]).dtypes
+    n_rows = sum(len(frame) for frame in frames)
+    columns = {
+        column: np.empty(n_rows, dtype=dtype) if isinstance(dtype, np.dtype) and dtype != object else []
+        for column, dtype in dtypes.items()
+    }
+
+    offset = 0
+    while frames:
+        frame = frames.pop(0)
+        for column, values in columns.items():
+            if isinstance(values, np.ndarray):
+                values[offset:offset + len(frame)] = frame[column].to_numpy(dtype=values.dtype)
+            else:
+                values.append(frame[column])
+        offset += len(frame)
+        del frame
+
+    for column, values in columns.items():
+        if isinstance(values, list):
+            columns[column] = pd.concat(values, ignore_index=True).astype(dtypes[column])
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_data_in_parallel(query, n_partitions=4, partition_column="MSISDN/Number", strategy="hash",
+                          method="read_sql"):
+    """
+    Loads the results of a query by fetching n disjoint partitions concurrently, each on its own
+    pooled connection, so the extraction is spread over several PostgreSQL backends.
+
+    The partitions are parsed into separate DataFrames and stacked with concat_partitions, which
+    releases each partition as it is copied into the result.
+
+    :param query: SQL query to execute; it must return the partition column.
+    :param n_partitions: Number of partitions (and worker threads).
+    :param partition_column: Column used to assign rows to partitions.
+    :param strategy: "hash" or "range", see partition_conditions.
+    :param method: Extraction method of each partition, see load_data_from_postgres.
+    :return: Tuple (DataFrame of all rows, DataFrame of per-partition timings).
+    """
+    try:
+        conditions = partition_conditions(query, n_partitions, partition_column, strategy)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return None, None
+
+    base_query = query.strip().rstrip(";")
+
+    def load_partition(partition):
+        start = time.perf_counter()
+        partition_query = f"SELECT * FROM ({base_query}) AS partition_source WHERE {conditions[partition]}"
+        df = load_data_from_postgres(partition_query, method=method)
+        return df, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=n_partitions) as executor:
+        results = list(executor.map(load_partition, range(n_partitions)))
+
+    timings = pd.DataFrame({
+        "partition": range(n_partitions),
+        "condition": conditions,
+        "rows": [None if df is None else len(df) for df, _ in results],
+        "seconds": [seconds for _, seconds in results],
+    })
+
+    frames = [df for df, _ in results]
+    if any(df is None for df in frames):
+        print("An error occurred: at least one partition failed to load")
+        return None, timings
+
+    # Only frames may reference the partitions, so concat_partitions can release them
+    results.clear()
+    return concat_partitions(frames), timings
+
+
+def load_xdr_data(columns=None, where=None, chunksize=None, method="read_sql", snapshot=False, partitions=None):
+    """
+    Loads xdr_data using the declarative schema: only the requested columns are fetched and
+    they are cast to compact dtypes (categoricals, float32 measurements and nullable integer IDs) on ingest.
+
+    :param columns: None for every column, a column set name (see xdr_schema.COLUMN_SETS) or a list of columns.
+    :param where: Optional SQL condition to filter the rows.
+    :param chunksize: When given, stream the data as a generator of typed DataFrame chunks.
+    :param method: Extraction method of the non-streaming load, see load_data_from_postgres.
+    :param snapshot: Serve the typed result from a local snapshot while xdr_data is unchanged, as
+        reported by its version counter (see query_cache.create_version_tracking).
+    :param partitions: When given, fetch this many MSISDN hash partitions in parallel.
+    :return: DataFrame (or generator of DataFrames) containing the typed results.
+    """
+    query = build_select_query(columns, where=where)
+
+    if chunksize is not None:
+        return (apply_schema(chunk) for chunk in stream_data_from_postgres(query, chunksize=chunksize))
+
+    def load_typed(query):
+        if partitions:
+            df, _ = load_data_in_parallel(query, n_partitions=partitions, method=method)
+        else:
+            df = load_data_from_postgres(query, method=method)
+        if df is None:
+            return None
+        return apply_schema(df)
+
+    if snapshot:
+        return load_with_snapshot(query, load_typed, namespace="xdr_schema")
+    return load_typed(query)
@@ -1,11 +1,37 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from lazy_imports import lazy_module, lazy_object
 from load_data import load_data_from_postgres
 from overview_analysis import clean_data
+from user_features import aggregate_per_user, project_user_features
+from chunked_aggregation import is_chunked
+from heavy_hitters import LEADERBOARDS, build_leaderboards, top_heavy_hitters
+from sql_pushdown import top_k_per_column_in_sql
+from xdr_schema import XDR_TABLE
+from top_k import top_k_per_column
+
+# Plotting and modelling libraries load on first use
+plt = lazy_module('matplotlib.pyplot')
+sns = lazy_module('seaborn')
+StandardScaler = lazy_object('sklearn.preprocessing', 'StandardScaler')
+KMeans = lazy_object('sklearn.cluster', 'KMeans')
+
+APPLICATIONS = ['Social Media DL (Bytes)', 'Google DL (Bytes)', 'Email DL (Bytes)',
+                'Youtube DL (Bytes)', 'Netflix DL (Bytes)', 'Gaming DL (Bytes)', 'Other DL (Bytes)']
+
+ENGAGEMENT_METRICS = {
+    'sessions_frequency': ('Bearer Id', 'count'),
+    'total_session_duration': ('Dur. (ms)', 'sum'),
+    'total_download_data': ('Total DL (Bytes)', 'sum'),
+    'total_upload_data': ('Total UL (Bytes)', 'sum')
+}
+
+# Engagement metric -> heavy hitter leaderboard ranking customers by it
+CUSTOMER_LEADERBOARDS = {
+    'sessions_frequency': 'subscribers_by_sessions',
+    'total_session_duration': 'subscribers_by_duration',
+    'total_data_volume': 'subscribers_by_data_volume',
+}
 
 def load_and_prepare_data(query):
     """
@@ -15,16 +41,14 @@ def load_and_prepare_data(query):
     df = clean_data(df)
     return df
 
-def aggregate_metrics(df):
+def aggregate_metrics(df=None, backend='pandas', source=XDR_TABLE):
     """
     Aggregate the engagement metrics per customer id (MSISDN).
+
+    Accepts sessions (a DataFrame or a stream of DataFrame chunks) or a feature table from
+    user_features.build_user_features; see user_features.aggregate_per_user for the backends.
     """
-    user_aggregated_data = df.groupby('MSISDN/Number').agg(
-        sessions_frequency=('Bearer Id', 'count'),
-        total_session_duration=('Dur. (ms)', 'sum'),
-        total_download_data=('Total DL (Bytes)', 'sum'),
-        total_upload_data=('Total UL (Bytes)', 'sum')
-    ).reset_index()
+    user_aggregated_data = aggregate_per_user(df, ENGAGEMENT_METRICS, backend, source)
     
     user_aggregated_data['total_data_volume'] = user_aggregated_data['total_download_data'] + user_aggregated_data['total_upload_data']
     
@@ -33,13 +57,34 @@ def aggregate_metrics(df):
 def top_10_customers(user_aggregated_data):
     """
     Report the top 10 customers per engagement metric.
+
+    Accepts the per-user table of aggregate_metrics, or a stream of session chunks that is
+    aggregated into it first.
     """
+    if is_chunked(user_aggregated_data):
+        user_aggregated_data = aggregate_metrics(user_aggregated_data)
+
     top_10_sessions = user_aggregated_data.nlargest(10, 'sessions_frequency')
     top_10_duration = user_aggregated_data.nlargest(10, 'total_session_duration')
     top_10_data_volume = user_aggregated_data.nlargest(10, 'total_data_volume')
     
     return top_10_sessions, top_10_duration, top_10_data_volume
 
+def stream_top_customers(chunks, k=10):
+    """
+    Report the top k customers per engagement metric over a stream of session chunks, keeping
+    bounded-memory heavy hitter summaries (see heavy_hitters) instead of a per-user table.
+
+    :return: Tuple of DataFrames (sessions, duration, data volume) with the MSISDN/Number and
+        the lower bound of the metric of each customer, by descending lower bound.
+    """
+    boards = {metric: LEADERBOARDS[board] for metric, board in CUSTOMER_LEADERBOARDS.items()}
+    summaries = build_leaderboards(chunks, boards)
+    return tuple(
+        top_heavy_hitters(summaries[metric], k)['lower'].rename(metric).rename_axis('MSISDN/Number').reset_index()
+        for metric in CUSTOMER_LEADERBOARDS
+    )
+
 def normalize_and_cluster(user_aggregated_data):
     """
     Normalize each engagement metric and run a k-means (k=3) to classify customers in three groups of engagement.
@@ -62,25 +107,50 @@ def cluster_statistics(user_aggregated_data):
     
     return cluster_stats
 
-def top_10_users_per_application(df):
+def top_k_users_per_application(df=None, k=10, applications=None):
+    """
+    Aggregate user total traffic per application in one pass and select the top k users of every
+    application with a partial selection over the users x applications matrix.
+
+    :param df: Sessions (DataFrame or chunks) or a feature table of user_features.build_user_features.
+    :param k: Number of users per application.
+    :param applications: Application columns, defaults to APPLICATIONS.
+    :return: Tuple (dict of application -> DataFrame of its top k users and their traffic, Series of
+        the total traffic of every application by descending total).
+    """
+    applications = applications or APPLICATIONS
+    app_data = project_user_features(df, {app: (app, 'sum') for app in applications})
+    return top_k_per_column(app_data, applications, k=k)
+
+def top_10_users_per_application(df=None, backend='pandas', source=XDR_TABLE, k=10, applications=None):
     """
     Aggregate user total traffic per application and derive the top 10 most engaged users per application.
+
+    The totals of every application come from one grouped pass (or from a feature table of
+    user_features.build_user_features), see top_k_users_per_application. With backend='sql' the
+    totals and rankings are computed inside PostgreSQL over source (xdr_data by default) in one
+    query, and df is not used. The other backends compute the totals with
+    user_features.aggregate_per_user.
     """
-    applications = ['Social Media DL (Bytes)', 'Google DL (Bytes)', 'Email DL (Bytes)', 
-                    'Youtube DL (Bytes)', 'Netflix DL (Bytes)', 'Gaming DL (Bytes)', 'Other DL (Bytes)']
-    
-    top_10_users = {}
-    for app in applications:
-        app_data = df.groupby('MSISDN/Number')[app].sum().reset_index()
-        top_10_users[app] = app_data.nlargest(10, app)
-    
+    applications = applications or APPLICATIONS
+
+    if backend == 'sql':
+        return top_k_per_column_in_sql(applications, k=k, source=source)
+    app_data = aggregate_per_user(df, {app: (app, 'sum') for app in applications}, backend)
+    top_10_users, _ = top_k_per_column(app_data, applications, k=k)
     return top_10_users
 
-def plot_top_3_applications(top_10_users):
+def plot_top_3_applications(top_10_users, app_totals=None):
     """
     Plot the top 3 most used applications using appropriate charts.
+
+    Applications are ranked by app_totals (see top_k_users_per_application) when given, otherwise
+    by the traffic of their top users.
     """
-    top_3_apps = sorted(top_10_users, key=lambda x: top_10_users[x][x].sum(), reverse=True)[:3]
+    if app_totals is not None:
+        top_3_apps = [app for app in app_totals.index if app in top_10_users][:3]
+    else:
+        top_3_apps = sorted(top_10_users, key=lambda x: top_10_users[x][x].sum(), reverse=True)[:3]
     
     for app in top_3_apps:
         plt.figure(figsize=(10, 6))
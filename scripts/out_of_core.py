@@ -0,0 +1,173 @@
+# scripts/out_of_core.py
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from id_encoding import aggregate_by_codes, aggregation_columns, hash_keys
+from lazy_imports import lazy_module
+
+pa = lazy_module("pyarrow")
+
+# Out-of-core aggregation settings
+SPILL_DIR = os.getenv("SPILL_DIR") or None
+SPILL_MEMORY_BYTES = int(os.getenv("SPILL_MEMORY_BYTES", str(512 * 2**20)))
+SPILL_PARTITIONS = int(os.getenv("SPILL_PARTITIONS", "64"))
+
+
+def partition_ids(keys, n_partitions):
+    """
+    Assign every key to a partition by hashing it, see hash_keys.
+    """
+    return (hash_keys(keys) % np.uint64(n_partitions)).astype(np.intp)
+
+
+def spill_table(df):
+    """
+    Convert a chunk to an Arrow table for a spill file; categorical columns are written
+    as their values, as the categories of chunks can differ.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def spill_schema(template):
+    """
+    Derive the Arrow schema of the spill files from the dtypes of the stream; columns
+    holding only missing values so far are stored as strings rather than Arrow's null
+    type, so later chunks with values can still be written.
+    """
+    schema = spill_table(template).schema
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def restore_dtypes(df, dtypes):
+    """
+    Cast the columns of a partition read back from its spill file to the dtypes of the
+    chunks.
+    """
+    return df.astype(
+        {column: dtype for column, dtype in dtypes.items() if df[column].dtype != dtype}
+    )
+
+
+def aggregate_out_of_core(
+    chunks,
+    spec,
+    key="MSISDN/Number",
+    memory_bytes=None,
+    n_partitions=None,
+    spill_dir=None,
+):
+    """
+    Aggregate a stream of session chunks per key when the sessions do not fit in memory.
+
+    Chunks are hash-partitioned by key and buffered; whenever the buffers exceed
+    memory_bytes they are appended to one Arrow spill file per partition. Each partition
+    then holds every row of its keys in stream order and is aggregated on its own. If
+    the buffers never exceed the budget nothing is written. A single partition must fit
+    in memory, so raise n_partitions with the data.
+
+    :param chunks: DataFrame or iterable of DataFrame chunks.
+    :param spec: Dict of output name -> (column, function), function in
+        id_encoding.GROUP_REDUCERS.
+    :param key: Column to group by.
+    :param memory_bytes: Budget of the buffered rows, defaults to SPILL_MEMORY_BYTES.
+    :param n_partitions: Number of hash partitions, defaults to SPILL_PARTITIONS.
+    :param spill_dir: Directory of the temporary spill files, defaults to SPILL_DIR or
+        the system temporary directory.
+    :return: DataFrame equal to id_encoding.aggregate_by_codes(pd.concat(chunks), key,
+        spec), the aggregation of the pandas backend, rows sorted by key.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    memory_bytes = SPILL_MEMORY_BYTES if memory_bytes is None else memory_bytes
+    n_partitions = n_partitions or SPILL_PARTITIONS
+
+    buffers = [[] for _ in range(n_partitions)]
+    buffered = 0
+    writers = {}
+    template = None
+    spill_path = None
+    # Every spill file shares one schema, fixed at the first spill
+    schema = None
+
+    def flush():
+        nonlocal schema
+        schema = schema or spill_schema(template)
+        for partition, frames in enumerate(buffers):
+            if not frames:
+                continue
+            table = spill_table(pd.concat(frames, ignore_index=True)).cast(schema)
+            if partition not in writers:
+                sink = pa.OSFile(
+                    os.path.join(spill_path, f"partition_{partition}.arrow"), "wb"
+                )
+                writers[partition] = (sink, pa.ipc.new_stream(sink, schema))
+            writers[partition][1].write_table(table)
+            frames.clear()
+
+    try:
+        for chunk in chunks:
+            chunk = chunk[aggregation_columns(chunk.columns, key, spec)]
+            chunk = chunk[chunk[key].notna()]
+            # The dtypes pd.concat would give the whole stream, e.g. categoricals whose
+            # categories differ between chunks become plain values
+            template = (
+                chunk.iloc[:0]
+                if template is None
+                else pd.concat([template, chunk.iloc[:0]])
+            )
+            if chunk.empty:
+                continue
+            ids = partition_ids(chunk[key], n_partitions)
+            order = np.argsort(ids, kind="stable")
+            bounds = np.searchsorted(ids[order], np.arange(n_partitions + 1))
+            for partition in np.flatnonzero(np.diff(bounds)):
+                buffers[partition].append(
+                    chunk.iloc[order[bounds[partition] : bounds[partition + 1]]]
+                )
+            buffered += int(chunk.memory_usage(index=False, deep=True).sum())
+            if buffered > memory_bytes:
+                spill_path = spill_path or tempfile.mkdtemp(
+                    prefix="xdr_spill_", dir=spill_dir or SPILL_DIR
+                )
+                flush()
+                buffered = 0
+
+        if template is None:
+            return pd.DataFrame(columns=[key] + list(spec))
+        dtypes = template.dtypes.to_dict()
+        if not writers:
+            frames = [frame for partition in buffers for frame in partition]
+            df = pd.concat(frames, ignore_index=True) if frames else template
+            return aggregate_by_codes(restore_dtypes(df, dtypes), key, spec)
+
+        flush()
+        for sink, writer in writers.values():
+            writer.close()
+            sink.close()
+        results = []
+        for partition in sorted(writers):
+            with pa.memory_map(
+                os.path.join(spill_path, f"partition_{partition}.arrow"), "r"
+            ) as source:
+                df = pa.ipc.open_stream(source).read_all().to_pandas()
+            results.append(aggregate_by_codes(restore_dtypes(df, dtypes), key, spec))
+        return pd.concat(results, ignore_index=True).sort_values(
+            key, kind="stable", ignore_index=True
+        )
+    finally:
+        for sink, writer in writers.values():
+            if not sink.closed:
+                writer.close()
+                sink.close()
+        if spill_path is not None:
+            shutil.rmtree(spill_path, ignore_errors=True)
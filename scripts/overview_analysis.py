@@ -1,7 +1,12 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from load_data import load_data_from_postgres
+from chunked_aggregation import is_chunked
+from heavy_hitters import stream_value_counts
+from lazy_imports import lazy_module
+
+# Plotting libraries load on first use
+plt = lazy_module('matplotlib.pyplot')
+sns = lazy_module('seaborn')
 
 def load_and_prepare_data(query):
     """
@@ -14,7 +19,12 @@ def load_and_prepare_data(query):
 def clean_data(df):
     """
     Clean the data by filling missing values and handling outliers.
+
+    A stream of DataFrame chunks is cleaned lazily, chunk by chunk.
     """
+    if is_chunked(df):
+        return (clean_data(chunk) for chunk in df)
+
     # Fill missing values with 0 for numerical columns
     df['Dur. (ms)'] = pd.to_numeric(df['Dur. (ms)'], errors='coerce').fillna(0)
     df['Total DL (Bytes)'] = pd.to_numeric(df['Total DL (Bytes)'], errors='coerce').fillna(0)
@@ -54,14 +64,23 @@ def perform_eda(df):
 def identify_top_10_handsets(df):
     """
     Identify the top 10 handsets used by the customers.
+
+    Accepts a DataFrame or a stream of DataFrame chunks, counted with bounded memory (see
+    heavy_hitters.stream_value_counts).
     """
+    if is_chunked(df):
+        return stream_value_counts(df, 'Handset Type', 10)
     top_10_handsets = df['Handset Type'].value_counts().head(10)
     return top_10_handsets
 
 def identify_top_3_manufacturers(df):
     """
     Identify the top 3 handset manufacturers.
+
+    Accepts a DataFrame or a stream of DataFrame chunks, see identify_top_10_handsets.
     """
+    if is_chunked(df):
+        return stream_value_counts(df, 'Handset Manufacturer', 3)
     top_3_manufacturers = df['Handset Manufacturer'].value_counts().head(3)
     return top_3_manufacturers
 
@@ -0,0 +1,127 @@
+# scripts/parallel_aggregation.py
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from chunked_aggregation import is_chunked
+from id_encoding import aggregate_by_codes, aggregation_columns, decode_ids
+from out_of_core import partition_ids
+
+# Parallel aggregation settings; shards go to /dev/shm (memory-backed) when it exists
+AGGREGATION_WORKERS = int(os.getenv("AGGREGATION_WORKERS", str(os.cpu_count() or 1)))
+SHARD_DIR = os.getenv("SHARD_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else None
+)
+
+
+def write_shards(df, order, path):
+    """
+    Write the columns of a frame, rows in shard order, to memory-mapped .npy files.
+
+    NumPy columns are written as they are; other columns (categoricals, strings,
+    nullable integers, ...) are written as factorized codes and their distinct values
+    are sent to the workers with the task.
+
+    :return: Dict of column -> (file, distinct values or None).
+    """
+    columns = {}
+    for i, column in enumerate(df.columns):
+        values = (
+            df[column].to_numpy() if isinstance(df[column].dtype, np.dtype) else None
+        )
+        uniques = None
+        if values is None or values.dtype == object:
+            values, uniques = pd.factorize(df[column], use_na_sentinel=True)
+            values = values.astype(np.int32 if len(uniques) < 2**31 else np.int64)
+        file = os.path.join(path, f"column_{i}.npy")
+        shard = np.lib.format.open_memmap(
+            file, mode="w+", dtype=values.dtype, shape=values.shape
+        )
+        np.take(values, order, out=shard)
+        shard.flush()
+        del shard
+        columns[column] = (file, uniques)
+    return columns
+
+
+def read_shard(columns, start, stop):
+    """
+    Rebuild rows start:stop of the frame written by write_shards, mapping the files
+    rather than copying them.
+    """
+    data = {}
+    for column, (file, uniques) in columns.items():
+        values = np.load(file, mmap_mode="r")[start:stop]
+        if uniques is not None:
+            values = decode_ids(values, uniques)
+        data[column] = pd.Series(values, copy=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def aggregate_shard(columns, start, stop, key, spec):
+    """
+    Aggregate one shard in a worker process.
+    """
+    return aggregate_by_codes(read_shard(columns, start, stop), key, spec)
+
+
+def aggregate_in_parallel(
+    df, spec, key="MSISDN/Number", n_workers=None, shard_dir=None
+):
+    """
+    Aggregate sessions per key on a pool of worker processes.
+
+    Rows are hash-partitioned by key into one shard per worker and written, grouped by
+    shard, to memory-mapped files that every worker maps instead of receiving a pickled
+    frame. Each worker aggregates the keys of its shard, which no other shard holds, so
+    the results are concatenated.
+
+    :param df: DataFrame or iterable of DataFrame chunks.
+    :param spec: Dict of output name -> (column, function), function in
+        id_encoding.GROUP_REDUCERS.
+    :param key: Column to group by.
+    :param n_workers: Number of worker processes, defaults to AGGREGATION_WORKERS; 1
+        aggregates in the calling process.
+    :param shard_dir: Directory of the temporary shard files, defaults to SHARD_DIR or
+        the system temporary directory.
+    :return: DataFrame equal to id_encoding.aggregate_by_codes(df, key, spec), rows
+        sorted by key.
+    """
+    if is_chunked(df):
+        df = pd.concat(df)
+    n_workers = n_workers or AGGREGATION_WORKERS
+    if n_workers < 1:
+        raise ValueError(f"Number of workers must be positive: {n_workers}")
+    df = df[aggregation_columns(df.columns, key, spec)]
+    if n_workers == 1 or df.empty:
+        return aggregate_by_codes(df, key, spec)
+
+    df = df[df[key].notna()]
+    ids = partition_ids(df[key], n_workers)
+    # Rows of each shard keep their order, so sums add up in the same order as in one
+    # process
+    order = np.argsort(ids, kind="stable")
+    bounds = np.searchsorted(ids[order], np.arange(n_workers + 1))
+    dtypes = aggregate_by_codes(df.iloc[:0], key, spec).dtypes.to_dict()
+
+    path = tempfile.mkdtemp(prefix="xdr_shards_", dir=shard_dir or SHARD_DIR)
+    try:
+        shards = write_shards(df, order, path)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(
+                    aggregate_shard, shards, bounds[i], bounds[i + 1], key, spec
+                )
+                for i in range(n_workers)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    result = pd.concat(results, ignore_index=True).sort_values(
+        key, kind="stable", ignore_index=True
+    )
+    return result.astype(dtypes)
@@ -0,0 +1,331 @@
+# scripts/query_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from db_connection import get_connection
+from snapshot_cache import (
+    UNTRACKED,
+    VERSION_TABLE,
+    normalize_query,
+    table_version,
+    read_snapshot,
+    write_snapshot,
+    write_meta,
+    evict_snapshots,
+)
+from xdr_schema import XDR_TABLE
+
+# Query result cache settings
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", os.path.join("data", "query_cache"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "900"))
+QUERY_CACHE_MEMORY_BYTES = int(os.getenv("QUERY_CACHE_MEMORY_BYTES", str(512 * 2**20)))
+QUERY_CACHE_DISK_BYTES = int(os.getenv("QUERY_CACHE_DISK_BYTES", str(2 * 2**30)))
+QUERY_CACHE_VERSION_INTERVAL = float(os.getenv("QUERY_CACHE_VERSION_INTERVAL", "5"))
+
+# Version counters of the tracked tables, bumped by a statement-level trigger on every
+# insert, update, delete and TRUNCATE (see version_tracking_sql). The bump commits or
+# rolls back with the change itself, and reading one row per table is cheap enough to
+# run before every cached query. VERSION_TABLE and XDR_VERSION_QUERY, the probe of the
+# xdr_data snapshots, live in snapshot_cache, which this module builds on.
+VERSION_FUNCTION = "xdr_table_versions_bump"
+CACHE_VERSION_QUERY = (
+    f"SELECT table_name, version FROM {VERSION_TABLE} ORDER BY table_name"
+)
+
+# In-memory tier: key -> (version, created, bytes, DataFrame), least recently used first
+_memory = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "invalidations": 0,
+}
+_version = {"value": None, "checked": None}
+
+
+def cache_key(query, params=None, namespace=""):
+    """
+    Compute the cache key of a query from its normalized SQL and its parameters.
+    """
+    payload = json.dumps(
+        [namespace, normalize_query(query), params], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def version_tracking_sql(table):
+    """
+    Build the statements creating the version table and the trigger bumping the version
+    of a table.
+    """
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            table_name text PRIMARY KEY,
+            version bigint NOT NULL DEFAULT 0,
+            changed_at timestamptz NOT NULL DEFAULT now()
+        )
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION {VERSION_FUNCTION}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO {VERSION_TABLE} AS versions (table_name, version)
+            VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = versions.version + 1, changed_at = now();
+            RETURN NULL;
+        END
+        $$
+        """,
+        f"INSERT INTO {VERSION_TABLE} (table_name) VALUES ('{table}') "
+        "ON CONFLICT DO NOTHING",
+        f"DROP TRIGGER IF EXISTS {table}_version_bump ON {table}",
+        f"""
+        CREATE TRIGGER {table}_version_bump
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION {VERSION_FUNCTION}()
+        """,
+    ]
+
+
+def create_version_tracking(table=XDR_TABLE):
+    """
+    Start tracking the version of a table; until then results read from it expire only
+    by TTL.
+    """
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            for statement in version_tracking_sql(table):
+                cursor.execute(statement)
+        connection.commit()
+
+
+def tables_read(query, versions):
+    """
+    Return the tracked tables a query reads, or every tracked table if it names none of
+    them.
+    """
+    tables = [
+        table
+        for table in versions
+        if re.search(
+            rf'(?<![\w"]){re.escape(table)}(?![\w"])|"{re.escape(table)}"',
+            query,
+            re.IGNORECASE,
+        )
+    ]
+    return tables or list(versions)
+
+
+def query_version(query, versions):
+    """
+    Build the version token of a query from the versions of the tables it reads.
+    """
+    if versions is None:
+        return None
+    return json.dumps(
+        {table: versions[table] for table in sorted(tables_read(query, versions))}
+    )
+
+
+def current_version(version_query=CACHE_VERSION_QUERY, interval=None):
+    """
+    Return the versions of the tracked tables as a dict of table -> version, probing the
+    database at most once per interval seconds so a burst of cached queries (e.g. a
+    dashboard rerun) shares one probe.
+
+    :return: Dict of table name -> version, or None if the database could not be probed
+        or does not track versions, in which case cached results expire by TTL only.
+    """
+    interval = QUERY_CACHE_VERSION_INTERVAL if interval is None else interval
+    now = time.monotonic()
+    with _lock:
+        if _version["checked"] is not None and now - _version["checked"] < interval:
+            return _version["value"]
+
+    token = table_version(version_query)
+    version = (
+        None
+        if token in (None, UNTRACKED)
+        else {table: value for table, value in json.loads(token)}
+    )
+    with _lock:
+        _version.update(value=version, checked=now)
+    return version
+
+
+def _is_fresh(version, created, current, ttl):
+    # An unreachable database (current is None) leaves cached results usable until they
+    # expire
+    return time.time() - created < ttl and (current is None or version == current)
+
+
+def _remember(key, version, created, df, max_bytes):
+    global _memory_bytes
+    size = int(df.memory_usage(deep=True).sum())
+    if size > max_bytes:
+        return
+    with _lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[2]
+        _memory[key] = (version, created, size, df)
+        _memory_bytes += size
+        while _memory_bytes > max_bytes:
+            _, (_, _, evicted_size, _) = _memory.popitem(last=False)
+            _memory_bytes -= evicted_size
+            _stats["evictions"] += 1
+
+
+def _forget(key):
+    global _memory_bytes
+    with _lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[2]
+
+
+def cached_query(
+    query,
+    loader,
+    params=None,
+    namespace="",
+    ttl=None,
+    cache_dir=None,
+    memory_bytes=None,
+    disk_bytes=None,
+    version_query=CACHE_VERSION_QUERY,
+):
+    """
+    Return the result of a query from the cache, running the loader only on a miss.
+
+    Results are looked up in the in-memory LRU tier, then in the on-disk tier (Arrow IPC
+    files), and are valid while younger than the TTL and while the versions of the
+    tracked tables the query reads are unchanged. Callers get a copy, so modifying a
+    returned DataFrame never alters the cached one.
+
+    :param query: SQL query the result belongs to.
+    :param loader: Function called without arguments returning a DataFrame (or None on
+        failure).
+    :param params: Query parameters, part of the cache key.
+    :param namespace: Distinguishes results of the same query produced by different
+        loaders.
+    :param ttl: Maximum age of a result in seconds, defaults to QUERY_CACHE_TTL.
+    :param cache_dir: Directory of the on-disk tier, defaults to QUERY_CACHE_DIR.
+    :param memory_bytes: Size budget of the in-memory tier, defaults to
+        QUERY_CACHE_MEMORY_BYTES.
+    :param disk_bytes: Size budget of the on-disk tier, defaults to
+        QUERY_CACHE_DISK_BYTES.
+    :param version_query: Freshness probe query, see current_version.
+    :return: DataFrame containing the results of the query.
+    """
+    ttl = QUERY_CACHE_TTL if ttl is None else ttl
+    cache_dir = cache_dir or QUERY_CACHE_DIR
+    memory_bytes = QUERY_CACHE_MEMORY_BYTES if memory_bytes is None else memory_bytes
+    disk_bytes = QUERY_CACHE_DISK_BYTES if disk_bytes is None else disk_bytes
+
+    key = cache_key(query, params, namespace)
+    version = query_version(query, current_version(version_query))
+
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if _is_fresh(entry[0], entry[1], version, ttl):
+                _memory.move_to_end(key)
+                _stats["hits"] += 1
+                _stats["memory_hits"] += 1
+                return entry[3].copy()
+            _stats["invalidations"] += 1
+
+    data_path = os.path.join(cache_dir, f"{key}.arrow")
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+    if entry is not None:
+        # The on-disk copy was written with the same version and time, so it is stale
+        # too
+        _forget(key)
+        for path in (data_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+    elif os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if _is_fresh(meta["version"], meta["created"], version, ttl):
+            os.utime(data_path)
+            df = read_snapshot(data_path)
+            _remember(key, meta["version"], meta["created"], df, memory_bytes)
+            with _lock:
+                _stats["hits"] += 1
+                _stats["disk_hits"] += 1
+            return df.copy()
+        with _lock:
+            _stats["invalidations"] += 1
+        for path in (data_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    with _lock:
+        _stats["misses"] += 1
+    df = loader()
+    if df is None:
+        return None
+
+    created = time.time()
+    _remember(key, version, created, df, memory_bytes)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_snapshot(df, data_path)
+    write_meta(
+        {
+            "query": normalize_query(query),
+            "params": params,
+            "namespace": namespace,
+            "version": version,
+            "created": created,
+            "rows": len(df),
+        },
+        meta_path,
+    )
+
+    evicted = evict_snapshots(cache_dir, disk_bytes, keep=[key])
+    with _lock:
+        _stats["evictions"] += len(evicted)
+    return df.copy()
+
+
+def cache_stats():
+    """
+    Return the hit, miss, eviction and invalidation counters and the size of the
+    in-memory tier.
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory)
+        stats["memory_bytes"] = _memory_bytes
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_query_cache(cache_dir=None, disk=True):
+    """
+    Empty the in-memory tier (and by default the on-disk tier) and reset the counters.
+    """
+    global _memory_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+        _stats.update({name: 0 for name in _stats})
+        _version.update(value=None, checked=None)
+
+    cache_dir = cache_dir or QUERY_CACHE_DIR
+    if disk and os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith((".arrow", ".json")):
+                os.remove(os.path.join(cache_dir, name))
@@ -1,23 +1,28 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.metrics import euclidean_distances
-from sklearn.linear_model import LinearRegression
-from sqlalchemy import create_engine
+from lazy_imports import lazy_object
 from load_data import load_data_from_postgres
 from overview_analysis import clean_data
-from dotenv import load_dotenv
+from user_features import aggregate_per_user
+from xdr_schema import XDR_TABLE
 import os
 
-# Load environment variables from .env file
-load_dotenv()
+# Modelling libraries load on first use; the database settings live in db_connection
+StandardScaler = lazy_object('sklearn.preprocessing', 'StandardScaler')
+KMeans = lazy_object('sklearn.cluster', 'KMeans')
+euclidean_distances = lazy_object('sklearn.metrics', 'euclidean_distances')
+LinearRegression = lazy_object('sklearn.linear_model', 'LinearRegression')
 
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
+CUSTOMER_METRICS = {
+    'sessions_frequency': ('Bearer Id', 'count'),
+    'total_session_duration': ('Dur. (ms)', 'sum'),
+    'total_download_data': ('Total DL (Bytes)', 'sum'),
+    'total_upload_data': ('Total UL (Bytes)', 'sum'),
+    'avg_tcp_retransmission': ('TCP DL Retrans. Vol (Bytes)', 'mean'),
+    'avg_rtt': ('Avg RTT DL (ms)', 'mean'),
+    'handset_type': ('Handset Type', 'first'),
+    'avg_throughput': ('Avg Bearer TP DL (kbps)', 'mean')
+}
 
 def load_and_prepare_data(query):
     """
@@ -36,12 +41,12 @@ def treat_missing_and_outliers(df):
         df[column] = np.where(df[column] > df[column].mean() + 3 * df[column].std(), df[column].mean(), df[column])
         df[column] = np.where(df[column] < df[column].mean() - 3 * df[column].std(), df[column].mean(), df[column])
     
-    for column in df.select_dtypes(include=[object]).columns:
+    for column in df.select_dtypes(include=[object, 'category']).columns:
         df[column] = df[column].fillna(df[column].mode()[0])
     
     return df
 
-def aggregate_per_customer(df):
+def aggregate_per_customer(df=None, backend='pandas', source=XDR_TABLE):
     """
     Aggregate, per customer, the following information:
     - Sessions frequency
@@ -51,17 +56,11 @@ def aggregate_per_customer(df):
     - Average RTT
     - Handset type
     - Average throughput
+
+    Accepts sessions (a DataFrame or a stream of DataFrame chunks) or a feature table from
+    user_features.build_user_features; see user_features.aggregate_per_user for the backends.
     """
-    user_aggregated_data = df.groupby('MSISDN/Number').agg(
-        sessions_frequency=('Bearer Id', 'count'),
-        total_session_duration=('Dur. (ms)', 'sum'),
-        total_download_data=('Total DL (Bytes)', 'sum'),
-        total_upload_data=('Total UL (Bytes)', 'sum'),
-        avg_tcp_retransmission=('TCP DL Retrans. Vol (Bytes)', 'mean'),
-        avg_rtt=('Avg RTT DL (ms)', 'mean'),
-        handset_type=('Handset Type', 'first'),
-        avg_throughput=('Avg Bearer TP DL (kbps)', 'mean')
-    ).reset_index()
+    user_aggregated_data = aggregate_per_user(df, CUSTOMER_METRICS, backend, source)
     
     user_aggregated_data['total_data_volume'] = user_aggregated_data['total_download_data'] + user_aggregated_data['total_upload_data']
     
@@ -90,6 +89,25 @@ def calculate_satisfaction_score(user_aggregated_data):
     user_aggregated_data['satisfaction_score'] = (user_aggregated_data['engagement_score'] + user_aggregated_data['experience_score']) / 2
     return user_aggregated_data
 
+def cluster_engagement_and_experience(user_aggregated_data, n_clusters=3):
+    """
+    Run a k-means on the engagement metrics and another on the experience metrics.
+    """
+    engagement_kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    user_aggregated_data['engagement_cluster'] = engagement_kmeans.fit_predict(user_aggregated_data[['sessions_frequency', 'total_session_duration', 'total_data_volume']])
+    experience_kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    user_aggregated_data['experience_cluster'] = experience_kmeans.fit_predict(user_aggregated_data[['avg_tcp_retransmission', 'avg_rtt', 'avg_throughput']])
+    return user_aggregated_data, engagement_kmeans, experience_kmeans
+
+def calculate_scores(user_aggregated_data, n_clusters=3):
+    """
+    Cluster the customers and calculate their engagement, experience and satisfaction scores.
+    """
+    user_aggregated_data, engagement_kmeans, experience_kmeans = cluster_engagement_and_experience(user_aggregated_data, n_clusters)
+    user_aggregated_data = calculate_engagement_score(user_aggregated_data, engagement_kmeans)
+    user_aggregated_data = calculate_experience_score(user_aggregated_data, experience_kmeans)
+    return calculate_satisfaction_score(user_aggregated_data)
+
 def build_regression_model(user_aggregated_data):
     """
     Build a regression model to predict the satisfaction score of a customer.
@@ -0,0 +1,243 @@
+# scripts/shared_data.py
+
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from load_data import load_xdr_data
+from snapshot_cache import XDR_VERSION_QUERY, table_version
+
+# Shared data layer settings
+DASHBOARD_CACHE_BYTES = int(os.getenv("DASHBOARD_CACHE_BYTES", str(2**30)))
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "300"))
+
+# Process-wide state shared by every dashboard session: the xdr_data frame, the version
+# it was loaded at and a generation number bumped on every refresh
+_state = {"data": None, "version": None, "generation": 0}
+# Derived tables and models: name -> (generation, bytes, value), least recently used
+# first
+_derived = OrderedDict()
+_derived_bytes = 0
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+# Per-name build locks: name -> [lock, number of callers holding or waiting for it]. A
+# lock is dropped as soon as nobody uses it, so the dict only holds the names being
+# built.
+_build_locks = {}
+_stats = {"loads": 0, "refreshes": 0, "hits": 0, "misses": 0, "evictions": 0}
+_refresher = {"thread": None, "stop": None}
+
+
+def load_dashboard_data():
+    """
+    Load the xdr_data columns used by the dashboard pages, with compact dtypes, from the
+    local snapshot while xdr_data is unchanged.
+    """
+    return load_xdr_data("dashboard", snapshot=True)
+
+
+def estimate_size(value):
+    """
+    Estimate the memory held by a derived value: DataFrames, arrays and containers of
+    them are measured directly, anything else (e.g. a fitted model) by its pickled size.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    try:
+        return len(pickle.dumps(value))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _swap(df, version):
+    global _derived_bytes
+    with _lock:
+        _state.update(data=df, version=version, generation=_state["generation"] + 1)
+        _derived.clear()
+        _derived_bytes = 0
+
+
+def get_xdr_data(loader=None):
+    """
+    Return the process-wide xdr_data frame, loading it on first use.
+
+    Concurrent first calls wait for a single load. The frame is shared by every session
+    and must not be modified in place.
+
+    :param loader: Function returning the DataFrame, defaults to load_dashboard_data.
+    :return: DataFrame, or None if the data could not be loaded.
+    """
+    if _state["data"] is None:
+        with _load_lock:
+            if _state["data"] is None:
+                version = table_version(XDR_VERSION_QUERY)
+                df = (loader or load_dashboard_data)()
+                if df is not None:
+                    _swap(df, version)
+                    with _lock:
+                        _stats["loads"] += 1
+    return _state["data"]
+
+
+def refresh_xdr_data(loader=None, force=False):
+    """
+    Reload the shared frame if xdr_data changed since it was loaded.
+
+    The new frame is loaded without holding any lock and then swapped in, so sessions
+    keep reading the previous frame (and its derived tables) until the swap.
+
+    :param loader: Function returning the DataFrame, defaults to load_dashboard_data.
+    :param force: Reload even if the version probe is unchanged, e.g. when version
+        tracking is not installed.
+    :return: True if the shared frame was replaced.
+    """
+    version = table_version(XDR_VERSION_QUERY)
+    if (
+        not force
+        and _state["data"] is not None
+        and (version is None or version == _state["version"])
+    ):
+        return False
+
+    df = (loader or load_dashboard_data)()
+    if df is None:
+        return False
+    _swap(df, version)
+    with _lock:
+        _stats["refreshes"] += 1
+    return True
+
+
+def get_derived(name, builder, loader=None, max_bytes=None):
+    """
+    Return a table or model derived from the shared frame, building it once per data
+    generation.
+
+    Derived values are kept under a memory budget with least-recently-used eviction and
+    are shared by every session, so they must not be modified in place.
+
+    :param name: Name of the derived value, e.g. "engagement_metrics".
+    :param builder: Function called as builder(df) on the shared frame.
+    :param loader: Loader of the shared frame, see get_xdr_data.
+    :param max_bytes: Memory budget of the derived values, defaults to
+        DASHBOARD_CACHE_BYTES.
+    :return: The derived value, or None if the shared frame could not be loaded.
+    """
+    max_bytes = DASHBOARD_CACHE_BYTES if max_bytes is None else max_bytes
+    if get_xdr_data(loader) is None:
+        return None
+
+    # One build per name at a time; sessions asking for the same value wait for it
+    with _lock:
+        build_lock = _build_locks.setdefault(name, [threading.Lock(), 0])
+        build_lock[1] += 1
+    try:
+        with build_lock[0]:
+            return _get_or_build(name, builder, max_bytes)
+    finally:
+        with _lock:
+            build_lock[1] -= 1
+            if build_lock[1] == 0:
+                del _build_locks[name]
+
+
+def _get_or_build(name, builder, max_bytes):
+    global _derived_bytes
+    with _lock:
+        generation = _state["generation"]
+        entry = _derived.get(name)
+        if entry is not None and entry[0] == generation:
+            _derived.move_to_end(name)
+            _stats["hits"] += 1
+            return entry[2]
+        _stats["misses"] += 1
+        df = _state["data"]
+    if df is None:
+        return None
+
+    value = builder(df)
+    size = estimate_size(value)
+
+    with _lock:
+        # Drop the value if a refresh swapped the data while it was being built
+        if generation == _state["generation"] and size <= max_bytes:
+            if name in _derived:
+                _derived_bytes -= _derived.pop(name)[1]
+            _derived[name] = (generation, size, value)
+            _derived_bytes += size
+            while _derived_bytes > max_bytes:
+                _, (_, evicted_size, _) = _derived.popitem(last=False)
+                _derived_bytes -= evicted_size
+                _stats["evictions"] += 1
+    return value
+
+
+def start_background_refresh(interval=None, loader=None):
+    """
+    Start the daemon thread checking xdr_data for changes every interval seconds.
+    Calling it again while the thread runs does nothing, so every dashboard rerun can
+    call it.
+    """
+    interval = DASHBOARD_REFRESH_SECONDS if interval is None else interval
+    with _lock:
+        if _refresher["thread"] is not None and _refresher["thread"].is_alive():
+            return
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    refresh_xdr_data(loader)
+                except Exception as e:
+                    print(f"An error occurred: {e}")
+
+        thread = threading.Thread(target=run, name="xdr-data-refresh", daemon=True)
+        _refresher.update(thread=thread, stop=stop)
+    thread.start()
+
+
+def stop_background_refresh():
+    """
+    Stop the background refresh thread.
+    """
+    with _lock:
+        thread, stop = _refresher["thread"], _refresher["stop"]
+        _refresher.update(thread=None, stop=None)
+    if thread is not None:
+        stop.set()
+        thread.join()
+
+
+def data_layer_stats():
+    """
+    Return the load, refresh and derived value cache counters of the shared data layer.
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["generation"] = _state["generation"]
+        stats["derived_entries"] = len(_derived)
+        stats["derived_bytes"] = _derived_bytes
+        stats["build_locks"] = len(_build_locks)
+    return stats
+
+
+def reset_data_layer():
+    """
+    Drop the shared frame, the derived values and the counters.
+    """
+    global _derived_bytes
+    stop_background_refresh()
+    with _lock:
+        _state.update(data=None, version=None, generation=0)
+        _derived.clear()
+        _derived_bytes = 0
+        _stats.update({name: 0 for name in _stats})
@@ -0,0 +1,154 @@
+# scripts/sql_pushdown.py
+
+from load_data import load_data_from_postgres
+from xdr_schema import XDR_TABLE, quote_identifier
+
+BACKENDS = ("pandas", "sql", "out_of_core", "parallel")
+
+# SQL equivalent of each pandas aggregation used in the named aggregation specs. pandas
+# sums skip NaN (an all-NaN group sums to 0) and 'first' keeps the first non-null value;
+# 'first' is applied to the FIRST_VALUE window column compile_aggregation adds for it,
+# which holds the same value on every row of a group.
+AGGREGATE_TEMPLATES = {
+    "sum": "COALESCE(SUM({column}), 0)",
+    "count": "COUNT({column})",
+    "mean": "AVG({column})",
+    "first": "MAX({column})",
+}
+
+# Order of 'first': sessions by start time, ties broken by the smallest value, like the
+# pandas backend on sessions with a Start column (see id_encoding.SESSION_START).
+# It only uses columns, so subqueries and transition tables can be aggregated too.
+SESSION_ORDER = '"Start"::timestamp'
+
+
+def check_backend(backend):
+    """
+    Validate the name of an aggregation backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown aggregation backend: {backend}")
+
+
+def compile_aggregation(spec, key="MSISDN/Number", source=XDR_TABLE, order=None):
+    """
+    Compile a named aggregation spec into a GROUP BY query.
+
+    Rows with a NULL key are dropped and groups are sorted by key, like
+    DataFrame.groupby. A 'first' column takes the first non-null value of each group in
+    the given row order, ties broken by the smallest value, computed with a FIRST_VALUE
+    window over the non-null values first.
+
+    :param spec: Dict of output name -> (column, function) as accepted by
+        DataFrame.groupby().agg().
+    :param key: Column to group by.
+    :param source: Table name or parenthesized subquery to aggregate.
+    :param order: SQL ordering of the rows for 'first', defaults to SESSION_ORDER;
+        source must have its columns.
+    :return: SQL query string.
+    """
+    key = quote_identifier(key)
+    order = order or SESSION_ORDER
+    select_list, windows = [], []
+    for name, (column, func) in spec.items():
+        column = quote_identifier(column)
+        if func == "first":
+            window = f"first_{len(windows)}"
+            windows.append(
+                f"FIRST_VALUE({column}) OVER (PARTITION BY {key} "
+                f"ORDER BY {column} IS NULL, {order}, {column}) AS {window}"
+            )
+            column = window
+        select_list.append(
+            AGGREGATE_TEMPLATES[func].format(column=column)
+            + f" AS {quote_identifier(name)}"
+        )
+    if windows:
+        source = f"(SELECT source.*, {', '.join(windows)} FROM {source} AS source)"
+    select_list = ",\n               ".join(select_list)
+    return f"""
+        SELECT {key},
+               {select_list}
+        FROM {source} AS source
+        WHERE {key} IS NOT NULL
+        GROUP BY {key}
+        ORDER BY {key}
+    """
+
+
+def compile_top_k_per_column(columns, k=10, key="MSISDN/Number", source=XDR_TABLE):
+    """
+    Compile the per-user totals of several columns and the top k users of each column
+    into one query.
+
+    Ties are broken by key, matching DataFrame.nlargest on the key-sorted per-user
+    table.
+
+    :param columns: Columns to total per user.
+    :param k: Number of users kept per column.
+    :param key: Column to group by.
+    :param source: Table name or parenthesized subquery to aggregate.
+    :return: SQL query string returning key, the totals and a rank_<i> column per
+        column.
+    """
+    key = quote_identifier(key)
+    totals = ",\n                   ".join(
+        f"COALESCE(SUM({quote_identifier(column)}), 0) AS {quote_identifier(column)}"
+        for column in columns
+    )
+    ranks = ",\n                   ".join(
+        f"ROW_NUMBER() OVER (ORDER BY {quote_identifier(column)} DESC, {key}) "
+        f"AS rank_{i}"
+        for i, column in enumerate(columns)
+    )
+    keep = " OR ".join(f"rank_{i} <= {int(k)}" for i in range(len(columns)))
+    return f"""
+        WITH per_user AS (
+            SELECT {key},
+                   {totals}
+            FROM {source} AS source
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+        ),
+        ranked AS (
+            SELECT per_user.*,
+                   {ranks}
+            FROM per_user
+        )
+        SELECT * FROM ranked WHERE {keep}
+    """
+
+
+def aggregate_in_sql(
+    spec, key="MSISDN/Number", source=XDR_TABLE, method="read_sql", order=None
+):
+    """
+    Run a named aggregation inside PostgreSQL and return the per-key table, see
+    compile_aggregation.
+
+    :return: DataFrame with the key and one column per spec entry, like
+        groupby().agg().reset_index().
+    """
+    return load_data_from_postgres(
+        compile_aggregation(spec, key, source, order), method=method
+    )
+
+
+def top_k_per_column_in_sql(
+    columns, k=10, key="MSISDN/Number", source=XDR_TABLE, method="read_sql"
+):
+    """
+    Find the top k users per column inside PostgreSQL.
+
+    :return: Dict of column -> DataFrame with the key and the column total of its top k
+        users.
+    """
+    ranked = load_data_from_postgres(
+        compile_top_k_per_column(columns, k, key, source), method=method
+    )
+    return {
+        column: ranked[ranked[f"rank_{i}"] <= k]
+        .sort_values(f"rank_{i}")[[key, column]]
+        .reset_index(drop=True)
+        for i, column in enumerate(columns)
+    }
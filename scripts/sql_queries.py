@@ -1,80 +1,98 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine
-
-def execute_telecom_queries(db_url):
-    engine = create_engine(db_url)
+from db_connection import get_engine
+from subscriber_summary import projection_query
+from query_cache import cached_query
 
+# Summary queries over xdr_data, in execution order
+TELECOM_QUERIES = {
     # 1. Count of Unique IMSIs
-    unique_imsi_count = pd.read_sql_query("""
+    "unique_imsi_count": """
         SELECT COUNT(DISTINCT "IMSI") AS unique_imsi_count
         FROM xdr_data;
-    """, engine)
+    """,
 
     # 2. Average Duration of Calls
-    average_duration = pd.read_sql_query("""
+    "average_duration": """
         SELECT AVG("Dur. (ms)") AS average_duration
         FROM xdr_data
         WHERE "Dur. (ms)" IS NOT NULL;
-    """, engine)
+    """,
 
     # 3. Total Data Usage per User
-    total_data_usage = pd.read_sql_query("""
-        SELECT "IMSI", 
-               SUM("Total UL (Bytes)") AS total_ul_bytes, 
+    "total_data_usage": """
+        SELECT "IMSI",
+               SUM("Total UL (Bytes)") AS total_ul_bytes,
                SUM("Total DL (Bytes)") AS total_dl_bytes
         FROM xdr_data
         GROUP BY "IMSI"
         ORDER BY total_dl_bytes DESC
         LIMIT 10;
-    """, engine)
+    """,
 
     # 4. Average RTT by Last Location Name
-    avg_rtt_by_location = pd.read_sql_query("""
-        SELECT "Last Location Name", 
-               AVG("Avg RTT DL (ms)") AS avg_rtt_dl, 
+    "avg_rtt_by_location": """
+        SELECT "Last Location Name",
+               AVG("Avg RTT DL (ms)") AS avg_rtt_dl,
                AVG("Avg RTT UL (ms)") AS avg_rtt_ul
         FROM xdr_data
         GROUP BY "Last Location Name"
         HAVING COUNT(*) > 10
         ORDER BY avg_rtt_dl DESC;
-    """, engine)
+    """,
 
     # 5. Top 10 Handsets Used by Customers
-    top_10_handsets = pd.read_sql_query("""
+    "top_10_handsets": """
         SELECT "Handset Type", COUNT(*) AS count
         FROM xdr_data
         GROUP BY "Handset Type"
         ORDER BY count DESC
         LIMIT 10;
-    """, engine)
+    """,
 
     # 6. Top 3 Handset Manufacturers
-    top_3_manufacturers = pd.read_sql_query("""
+    "top_3_manufacturers": """
         SELECT "Handset Manufacturer", COUNT(*) AS count
         FROM xdr_data
         GROUP BY "Handset Manufacturer"
         ORDER BY count DESC
         LIMIT 3;
-    """, engine)
+    """,
 
     # 7. Top 5 Handsets per Top 3 Handset Manufacturers
-    top_5_handsets_per_manufacturer = pd.read_sql_query("""
-        SELECT "Handset Manufacturer", "Handset Type", COUNT(*) AS count
-        FROM xdr_data
-        WHERE "Handset Manufacturer" IN (
-            SELECT "Handset Manufacturer"
+    # (ranked within each manufacturer; a plain LIMIT 5 would cut across all three)
+    "top_5_handsets_per_manufacturer": """
+        WITH handset_counts AS (
+            SELECT "Handset Manufacturer", "Handset Type", COUNT(*) AS count
             FROM xdr_data
+            GROUP BY "Handset Manufacturer", "Handset Type"
+        ),
+        top_manufacturers AS (
+            SELECT "Handset Manufacturer"
+            FROM handset_counts
+            WHERE "Handset Manufacturer" IS NOT NULL
             GROUP BY "Handset Manufacturer"
-            ORDER BY COUNT(*) DESC
+            ORDER BY SUM(count) DESC
             LIMIT 3
+        ),
+        ranked_handsets AS (
+            SELECT handset_counts.*,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY handset_counts."Handset Manufacturer"
+                       ORDER BY handset_counts.count DESC
+                   ) AS handset_rank
+            FROM handset_counts
+            JOIN top_manufacturers USING ("Handset Manufacturer")
         )
-        GROUP BY "Handset Manufacturer", "Handset Type"
-        ORDER BY "Handset Manufacturer", count DESC
-        LIMIT 5;
-    """, engine)
+        SELECT "Handset Manufacturer", "Handset Type", count
+        FROM ranked_handsets
+        WHERE handset_rank <= 5
+        ORDER BY "Handset Manufacturer", count DESC;
+    """,
 
     # 8. User Behavior Overview
-    user_behavior = pd.read_sql_query("""
+    "user_behavior": """
         SELECT "MSISDN/Number",
                COUNT(*) AS xdr_sessions,
                SUM("Dur. (ms)") AS session_duration,
@@ -83,16 +101,164 @@ def execute_telecom_queries(db_url):
                SUM("Total DL (Bytes)") + SUM("Total UL (Bytes)") AS total_data_volume
         FROM xdr_data
         GROUP BY "MSISDN/Number";
-    """, engine)
+    """,
+}
+
+# Queries answered by CONSOLIDATED_SUMMARY_QUERY in the consolidated plan
+CONSOLIDATED_QUERIES = (
+    "unique_imsi_count",
+    "average_duration",
+    "top_10_handsets",
+    "top_3_manufacturers",
+    "top_5_handsets_per_manufacturer",
+)
+
+# One scan of xdr_data: handset x manufacturer counts plus a grand-total row (grouping_level = 3)
+# carrying the distinct IMSI count and the duration sum/count for the average
+CONSOLIDATED_SUMMARY_QUERY = """
+    SELECT "Handset Manufacturer",
+           "Handset Type",
+           GROUPING("Handset Manufacturer", "Handset Type") AS grouping_level,
+           COUNT(*) AS count,
+           CASE WHEN GROUPING("Handset Manufacturer") = 1 THEN COUNT(DISTINCT "IMSI") END AS unique_imsi_count,
+           SUM("Dur. (ms)") AS duration_sum,
+           COUNT("Dur. (ms)") AS duration_count
+    FROM xdr_data
+    GROUP BY GROUPING SETS (("Handset Manufacturer", "Handset Type"), ());
+"""
+
+PLANS = ("separate", "consolidated")
+
+
+def slice_handset_summary(summary):
+    """
+    Derive the handset, manufacturer, IMSI and duration summaries from the consolidated query result.
+
+    :param summary: DataFrame returned by CONSOLIDATED_SUMMARY_QUERY.
+    :return: Dict with the same keys and columns as the separate queries in CONSOLIDATED_QUERIES.
+    """
+    total = summary[summary["grouping_level"] == 3].iloc[0]
+    handset_counts = summary[summary["grouping_level"] == 0][["Handset Manufacturer", "Handset Type", "count"]]
+
+    top_10_handsets = (
+        handset_counts.groupby("Handset Type", dropna=False)["count"].sum()
+        .sort_values(ascending=False, kind="stable").head(10).reset_index()
+    )
+    manufacturer_counts = (
+        handset_counts.groupby("Handset Manufacturer", dropna=False)["count"].sum()
+        .sort_values(ascending=False, kind="stable")
+    )
+    top_3_manufacturers = manufacturer_counts.head(3).reset_index()
+
+    top_manufacturers = manufacturer_counts[manufacturer_counts.index.notna()].head(3).index
+    top_5_handsets_per_manufacturer = (
+        handset_counts[handset_counts["Handset Manufacturer"].isin(top_manufacturers)]
+        .sort_values(["Handset Manufacturer", "count"], ascending=[True, False], kind="stable")
+        .groupby("Handset Manufacturer").head(5)
+        .reset_index(drop=True)
+    )
+
+    average_duration = total["duration_sum"] / total["duration_count"] if total["duration_count"] else None
 
-    # Return results as a dictionary
     return {
-        "unique_imsi_count": unique_imsi_count,
-        "average_duration": average_duration,
-        "total_data_usage": total_data_usage,
-        "avg_rtt_by_location": avg_rtt_by_location,
+        "unique_imsi_count": pd.DataFrame({"unique_imsi_count": [total["unique_imsi_count"]]}),
+        "average_duration": pd.DataFrame({"average_duration": [average_duration]}),
         "top_10_handsets": top_10_handsets,
         "top_3_manufacturers": top_3_manufacturers,
         "top_5_handsets_per_manufacturer": top_5_handsets_per_manufacturer,
-        "user_behavior": user_behavior,
-    }
\ No newline at end of file
+    }
+
+
+def run_query(name, query, engine, cache=False):
+    """
+    Run one summary query and measure it.
+
+    :param cache: Serve the result from the query result cache while xdr_data is unchanged.
+    :return: Tuple (DataFrame result, dict with the query name, row count and seconds).
+    """
+    start = time.perf_counter()
+    if cache:
+        df = cached_query(query, lambda: pd.read_sql_query(query, engine), namespace=f"telecom:{engine.url}")
+    else:
+        df = pd.read_sql_query(query, engine)
+    return df, {"query": name, "rows": len(df), "seconds": time.perf_counter() - start}
+
+
+def run_telecom_queries(db_url=None, max_workers=4, queries=None, cache=False):
+    """
+    Run the telecom summary queries on a bounded thread pool over the pooled engine, so the
+    wall time approaches the slowest query instead of the sum of all of them.
+
+    :param db_url: Optional database URL, defaults to the one built from the DB_* variables.
+    :param max_workers: Number of queries running at the same time; 1 runs them one after another.
+    :param queries: Dict of name -> SQL query, defaults to TELECOM_QUERIES.
+    :param cache: Serve the results from the query result cache while xdr_data is unchanged.
+    :return: Tuple (dict of name -> DataFrame, DataFrame report with rows and seconds per query).
+    """
+    queries = queries or TELECOM_QUERIES
+    engine = get_engine(db_url)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(run_query, name, query, engine, cache) for name, query in queries.items()}
+        outcomes = {name: future.result() for name, future in futures.items()}
+
+    results = {name: df for name, (df, _) in outcomes.items()}
+    report = pd.DataFrame([timing for _, timing in outcomes.values()])
+    return results, report
+
+
+def run_consolidated_telecom_queries(db_url=None, max_workers=1, queries=None, cache=False):
+    """
+    Run the telecom summary queries with the consolidated plan: the handset, manufacturer, IMSI
+    and duration summaries come from one scan of xdr_data and are sliced in pandas, the
+    remaining queries run as usual.
+
+    :param db_url: Optional database URL, defaults to the one built from the DB_* variables.
+    :param max_workers: Number of queries running at the same time.
+    :param queries: Dict of name -> SQL query, defaults to TELECOM_QUERIES.
+    :param cache: Serve the results from the query result cache while xdr_data is unchanged.
+    :return: Tuple (dict of name -> DataFrame in TELECOM_QUERIES order, DataFrame report).
+    """
+    queries = queries or TELECOM_QUERIES
+    plan = {"consolidated_summary": CONSOLIDATED_SUMMARY_QUERY}
+    plan.update({name: query for name, query in queries.items() if name not in CONSOLIDATED_QUERIES})
+
+    outcomes, report = run_telecom_queries(db_url, max_workers=max_workers, queries=plan, cache=cache)
+    outcomes.update(slice_handset_summary(outcomes.pop("consolidated_summary")))
+
+    results = {name: outcomes[name] for name in TELECOM_QUERIES}
+    return results, report
+
+
+def execute_telecom_queries(db_url=None, concurrent=False, max_workers=4, plan="separate",
+                            use_subscriber_summary=False, cache=False, with_report=False):
+    """
+    Run the telecom summary queries and return their results as a dictionary.
+
+    :param db_url: Optional database URL, defaults to the one built from the DB_* variables.
+    :param concurrent: Dispatch the queries on a thread pool instead of one after another.
+    :param max_workers: Size of the thread pool when concurrent is True.
+    :param plan: "separate" runs one query per summary, "consolidated" shares one scan of xdr_data
+        between the handset, manufacturer, IMSI and duration summaries.
+    :param use_subscriber_summary: Read user_behavior from the maintained subscriber_summary table
+        instead of aggregating xdr_data (subscribers without an MSISDN are not included).
+    :param cache: Serve each query from the query result cache while xdr_data is unchanged.
+    :param with_report: Also return the report of the rows and seconds of each query run.
+    :return: Dict of query name -> DataFrame, or a tuple (dict, DataFrame report) with with_report.
+    """
+    if plan not in PLANS:
+        raise ValueError(f"Unknown query plan: {plan}")
+
+    queries = dict(TELECOM_QUERIES)
+    if use_subscriber_summary:
+        queries["user_behavior"] = projection_query("user_behavior")
+
+    max_workers = max_workers if concurrent else 1
+    if plan == "consolidated":
+        results, report = run_consolidated_telecom_queries(db_url, max_workers=max_workers, queries=queries,
+                                                           cache=cache)
+    else:
+        results, report = run_telecom_queries(db_url, max_workers=max_workers, queries=queries, cache=cache)
+    if with_report:
+        return results, report
+    return results
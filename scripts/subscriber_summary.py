@@ -0,0 +1,324 @@
+# scripts/subscriber_summary.py
+
+from db_connection import get_connection
+from load_data import load_data_from_postgres
+from query_cache import version_tracking_sql
+from xdr_schema import XDR_TABLE, APPLICATION_COLUMNS, quote_identifier
+
+SUMMARY_TABLE = "subscriber_summary"
+SUMMARY_FUNCTION = "subscriber_summary_apply"
+SUMMARY_TRIGGER = "subscriber_summary_insert"
+# Parses the text Start column, returning NULL instead of raising on values that are
+# not timestamps, so a malformed row cannot abort the INSERT or COPY firing the trigger
+START_FUNCTION = "subscriber_summary_start"
+HANDSET_START = f'{START_FUNCTION}("Start"::text)'
+# Order of the sessions of a subscriber when picking its handset
+HANDSET_ORDER = f'{HANDSET_START} NULLS LAST, "Handset Type"'
+
+
+def summary_column_name(column):
+    """
+    Turn an xdr_data column such as 'Social Media DL (Bytes)' into a summary column name
+    ('social_media_dl').
+    """
+    return column.replace(" (Bytes)", "").replace(" ", "_").lower()
+
+
+# Summary column -> (SQL aggregate over xdr rows, SQL type). Every metric is additive,
+# so a batch of new rows is folded in by adding its aggregates to the stored ones.
+SUMMARY_METRICS = {
+    "xdr_sessions": ("COUNT(*)", "bigint"),
+    "bearer_sessions": ('COUNT("Bearer Id")', "bigint"),
+    "session_duration": ('COALESCE(SUM("Dur. (ms)"), 0)', "double precision"),
+    "total_dl": ('COALESCE(SUM("Total DL (Bytes)"), 0)', "double precision"),
+    "total_ul": ('COALESCE(SUM("Total UL (Bytes)"), 0)', "double precision"),
+}
+SUMMARY_METRICS.update(
+    {
+        summary_column_name(column): (
+            f"COALESCE(SUM({quote_identifier(column)}), 0)",
+            "double precision",
+        )
+        for column in APPLICATION_COLUMNS
+    }
+)
+for prefix, column in [
+    ("rtt_dl", "Avg RTT DL (ms)"),
+    ("rtt_ul", "Avg RTT UL (ms)"),
+    ("tp_dl", "Avg Bearer TP DL (kbps)"),
+    ("tp_ul", "Avg Bearer TP UL (kbps)"),
+    ("tcp_retrans_dl", "TCP DL Retrans. Vol (Bytes)"),
+    ("tcp_retrans_ul", "TCP UL Retrans. Vol (Bytes)"),
+]:
+    SUMMARY_METRICS[f"{prefix}_sum"] = (
+        f"COALESCE(SUM({quote_identifier(column)}), 0)",
+        "double precision",
+    )
+    SUMMARY_METRICS[f"{prefix}_count"] = (
+        f"COUNT({quote_identifier(column)})",
+        "bigint",
+    )
+
+# Per-user tables of the analysis modules, expressed over the summary columns
+SUMMARY_PROJECTIONS = {
+    "user_overview": {
+        "number_of_xDR_sessions": "bearer_sessions",
+        "total_session_duration": "session_duration",
+        "total_download_data": "total_dl",
+        "total_upload_data": "total_ul",
+        "total_data_volume": "total_dl + total_ul",
+    },
+    "engagement": {
+        "sessions_frequency": "bearer_sessions",
+        "total_session_duration": "session_duration",
+        "total_download_data": "total_dl",
+        "total_upload_data": "total_ul",
+        "total_data_volume": "total_dl + total_ul",
+    },
+    "experience": {
+        "avg_tcp_retransmission": (
+            "tcp_retrans_dl_sum / NULLIF(tcp_retrans_dl_count, 0)"
+        ),
+        "avg_rtt": "rtt_dl_sum / NULLIF(rtt_dl_count, 0)",
+        "handset_type": "handset_type",
+        "avg_throughput": "tp_dl_sum / NULLIF(tp_dl_count, 0)",
+    },
+    "satisfaction": {
+        "sessions_frequency": "bearer_sessions",
+        "total_session_duration": "session_duration",
+        "total_download_data": "total_dl",
+        "total_upload_data": "total_ul",
+        "avg_tcp_retransmission": (
+            "tcp_retrans_dl_sum / NULLIF(tcp_retrans_dl_count, 0)"
+        ),
+        "avg_rtt": "rtt_dl_sum / NULLIF(rtt_dl_count, 0)",
+        "handset_type": "handset_type",
+        "avg_throughput": "tp_dl_sum / NULLIF(tp_dl_count, 0)",
+        "total_data_volume": "total_dl + total_ul",
+    },
+    "user_behavior": {
+        "xdr_sessions": "xdr_sessions",
+        "session_duration": "session_duration",
+        "total_dl": "total_dl",
+        "total_ul": "total_ul",
+        "total_data_volume": "total_dl + total_ul",
+    },
+}
+
+
+def create_table_sql():
+    """
+    Build the CREATE TABLE statement of the summary table.
+    """
+    metric_definitions = ",\n            ".join(
+        f"{name} {sql_type} NOT NULL DEFAULT 0"
+        for name, (_, sql_type) in SUMMARY_METRICS.items()
+    )
+    return f"""
+        CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            "MSISDN/Number" double precision PRIMARY KEY,
+            handset_type text,
+            handset_start timestamp,
+            {metric_definitions},
+            updated_at timestamptz NOT NULL DEFAULT now()
+        )
+    """
+
+
+def start_function_sql():
+    """
+    Build the function parsing session start times for the handset order, see
+    START_FUNCTION.
+    """
+    return f"""
+        CREATE OR REPLACE FUNCTION {START_FUNCTION}(value text) RETURNS timestamp
+        LANGUAGE plpgsql STABLE AS $$
+        BEGIN
+            RETURN value::timestamp;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$
+    """
+
+
+def upsert_sql(source):
+    """
+    Build the statement folding the rows of a table or subquery into the summary table.
+
+    Rows without an MSISDN are skipped, like the pandas groupby of the analysis modules.
+    The handset of the subscriber's earliest session with one is kept, together with
+    that session's start; sessions starting at the same time are ordered by handset, as
+    transition tables and subqueries have no ctid, and sessions whose start cannot be
+    parsed come last. An existing handset is only replaced by one from an earlier
+    session, so the result does not depend on the order in which batches arrive.
+
+    :param source: Table name, transition table or parenthesized subquery with the
+        xdr_data columns.
+    """
+    names = ", ".join(SUMMARY_METRICS)
+    aggregates = ",\n               ".join(
+        expression for expression, _ in SUMMARY_METRICS.values()
+    )
+    updates = ",\n            ".join(
+        f"{name} = {SUMMARY_TABLE}.{name} + EXCLUDED.{name}" for name in SUMMARY_METRICS
+    )
+    # The batch's handset wins if it comes from an earlier session than the stored one
+    earlier = f"""EXCLUDED.handset_type IS NOT NULL AND (
+                {SUMMARY_TABLE}.handset_type IS NULL
+                OR ({SUMMARY_TABLE}.handset_start IS NULL
+                    AND EXCLUDED.handset_start IS NOT NULL)
+                OR (EXCLUDED.handset_start, EXCLUDED.handset_type)
+                    < ({SUMMARY_TABLE}.handset_start,
+                       {SUMMARY_TABLE}.handset_type))"""
+    return f"""
+        INSERT INTO {SUMMARY_TABLE}
+            ("MSISDN/Number", handset_type, handset_start, {names})
+        SELECT "MSISDN/Number",
+               (array_agg("Handset Type" ORDER BY {HANDSET_ORDER})
+                    FILTER (WHERE "Handset Type" IS NOT NULL))[1],
+               (array_agg({HANDSET_START} ORDER BY {HANDSET_ORDER})
+                    FILTER (WHERE "Handset Type" IS NOT NULL))[1],
+               {aggregates}
+        FROM {source} AS new_rows
+        WHERE "MSISDN/Number" IS NOT NULL
+        GROUP BY "MSISDN/Number"
+        ON CONFLICT ("MSISDN/Number") DO UPDATE SET
+            handset_type = CASE WHEN {earlier}
+                THEN EXCLUDED.handset_type ELSE {SUMMARY_TABLE}.handset_type END,
+            handset_start = CASE WHEN {earlier}
+                THEN EXCLUDED.handset_start ELSE {SUMMARY_TABLE}.handset_start END,
+            {updates},
+            updated_at = now()
+    """
+
+
+def trigger_sql():
+    """
+    Build the statement-level trigger that keeps the summary up to date as rows are
+    inserted (or COPY'd) into xdr_data.
+    """
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {SUMMARY_FUNCTION}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            {upsert_sql("inserted_rows")};
+            RETURN NULL;
+        END
+        $$
+        """,
+        f"DROP TRIGGER IF EXISTS {SUMMARY_TRIGGER} ON {XDR_TABLE}",
+        f"""
+        CREATE TRIGGER {SUMMARY_TRIGGER} AFTER INSERT ON {XDR_TABLE}
+        REFERENCING NEW TABLE AS inserted_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {SUMMARY_FUNCTION}()
+        """,
+    ]
+
+
+def execute_statements(statements):
+    """
+    Run SQL statements in one transaction on a pooled connection.
+    """
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        connection.commit()
+
+
+def create_subscriber_summary(refresh=True):
+    """
+    Create the summary table and the trigger maintaining it, then (optionally) build it
+    from xdr_data.
+
+    The versions of both tables are tracked so cached results read from them are
+    invalidated by inserts and refreshes.
+    """
+    execute_statements(
+        [
+            create_table_sql(),
+            f"ALTER TABLE {SUMMARY_TABLE} "
+            "ADD COLUMN IF NOT EXISTS handset_start timestamp",
+            start_function_sql(),
+        ]
+        + trigger_sql()
+        + version_tracking_sql(XDR_TABLE)
+        + version_tracking_sql(SUMMARY_TABLE)
+    )
+    if refresh:
+        refresh_subscriber_summary()
+
+
+def refresh_subscriber_summary(source=None):
+    """
+    Refresh the summary table.
+
+    Without a source the table is rebuilt from the whole of xdr_data, which also
+    accounts for updated or deleted sessions. With a source (e.g. a staging table of
+    sessions loaded with the trigger disabled) only those rows are folded in.
+
+    :param source: Optional table name or parenthesized subquery holding new xdr_data
+        rows.
+    """
+    if source is not None:
+        execute_statements([upsert_sql(source)])
+        return
+
+    # Block concurrent inserts so no batch is counted twice or missed during the rebuild
+    execute_statements(
+        [
+            f"LOCK TABLE {XDR_TABLE} IN SHARE MODE",
+            f"TRUNCATE {SUMMARY_TABLE}",
+            upsert_sql(XDR_TABLE),
+        ]
+    )
+
+
+def drop_subscriber_summary():
+    """
+    Remove the trigger, its function and the summary table.
+    """
+    execute_statements(
+        [
+            f"DROP TRIGGER IF EXISTS {SUMMARY_TRIGGER} ON {XDR_TABLE}",
+            f"DROP FUNCTION IF EXISTS {SUMMARY_FUNCTION}()",
+            f"DROP FUNCTION IF EXISTS {START_FUNCTION}(text)",
+            f"DROP TABLE IF EXISTS {SUMMARY_TABLE}",
+        ]
+    )
+
+
+def projection_query(kind):
+    """
+    Build the query reading one per-user table (see SUMMARY_PROJECTIONS) from the
+    summary.
+    """
+    if kind not in SUMMARY_PROJECTIONS:
+        raise ValueError(f"Unknown summary projection: {kind}")
+    select_list = ",\n               ".join(
+        f"{expression} AS {quote_identifier(name)}"
+        for name, expression in SUMMARY_PROJECTIONS[kind].items()
+    )
+    return f"""
+        SELECT "MSISDN/Number",
+               {select_list}
+        FROM {SUMMARY_TABLE}
+        ORDER BY "MSISDN/Number"
+    """
+
+
+def load_user_metrics(kind, method="read_sql", cache=False):
+    """
+    Read a per-user table from the summary instead of aggregating raw sessions.
+
+    :param kind: "user_overview", "engagement", "experience", "satisfaction" or
+        "user_behavior"; the columns match aggregate_user_data, aggregate_metrics, the
+        two aggregate_per_customer functions and the user_behavior query respectively.
+    :param method: Extraction method, see load_data_from_postgres.
+    :param cache: Serve the table from the query result cache while the summary is
+        unchanged.
+    :return: DataFrame with one row per MSISDN.
+    """
+    return load_data_from_postgres(projection_query(kind), method=method, cache=cache)
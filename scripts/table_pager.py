@@ -0,0 +1,338 @@
+# scripts/table_pager.py
+
+import operator
+import os
+import numpy as np
+import pandas as pd
+from load_data import load_data_from_postgres
+from xdr_schema import XDR_TABLE, resolve_columns, quote_identifier
+
+PAGE_SIZE = 50
+
+# Tiebreaker of the page order and second half of the keyset cursors. It must be unique
+# and non-null and must not change when rows are updated, such as the primary key of
+# the table; Bearer Id identifies a session of xdr_data. The physical row id (ctid)
+# would not do, as UPDATE, VACUUM FULL and CLUSTER move rows. An index on it keeps
+# unsorted pages from sorting the table.
+ROW_KEY = os.getenv("XDR_ROW_KEY", "Bearer Id")
+
+# Filter operators shared by the PostgreSQL and the in-memory pagers
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "contains": None,
+}
+
+
+# Comparisons that only apply to numbers and timestamps; text columns take =, != and
+# contains
+ORDERING_OPERATORS = ("<", "<=", ">", ">=")
+
+# Leading columns of the plain btree indexes of a table, the columns a page can be
+# sorted by without sorting every matching row
+INDEXED_COLUMNS_QUERY = """
+    SELECT attribute.attname AS column
+    FROM pg_index AS index
+    JOIN pg_class AS index_class ON index_class.oid = index.indexrelid
+    JOIN pg_am AS access_method ON access_method.oid = index_class.relam
+    JOIN pg_attribute AS attribute
+      ON attribute.attrelid = index.indrelid AND attribute.attnum = index.indkey[0]
+    WHERE index.indrelid = %s::regclass
+      AND access_method.amname = 'btree'
+      AND index.indpred IS NULL
+    ORDER BY index_class.relname
+"""
+
+
+def check_filters(filters):
+    """
+    Validate a list of (column, operator, value) filters.
+    """
+    for _, op, _ in filters or []:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator: {op}")
+
+
+def parse_filter_value(dtype, op, value):
+    """
+    Convert the text typed as a filter value to a value comparable with a column.
+
+    :param dtype: Dtype of the column.
+    :param op: Filter operator, see FILTER_OPERATORS.
+    :param value: Text of the value.
+    :return: Float for numeric columns, Timestamp for datetime columns, otherwise the
+        text.
+    :raises ValueError: If the value does not parse for the column or the operator does
+        not apply to it, e.g. "<" on a text or categorical column.
+    """
+    check_filters([(None, op, value)])
+    if op == "contains":
+        return str(value)
+    if pd.api.types.is_numeric_dtype(dtype):
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is not a number") from None
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        try:
+            return pd.Timestamp(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is not a date") from None
+    if op in ORDERING_OPERATORS:
+        raise ValueError(
+            f"{op} only applies to numbers and dates, use =, != or contains"
+        )
+    return str(value)
+
+
+def build_filter_sql(filters):
+    """
+    Compile (column, operator, value) filters into SQL conditions with %s placeholders.
+
+    :return: Tuple (list of conditions, list of parameters).
+    """
+    check_filters(filters)
+    conditions, params = [], []
+    for column, op, value in filters or []:
+        if op == "contains":
+            conditions.append(f"{quote_identifier(column)}::text ILIKE %s")
+            params.append(f"%{value}%")
+        elif isinstance(value, pd.Timestamp):
+            # Session times can be stored as text; compare them as timestamps
+            conditions.append(f"{quote_identifier(column)}::timestamp {op} %s")
+            params.append(value.to_pydatetime())
+        else:
+            conditions.append(f"{quote_identifier(column)} {op} %s")
+            params.append(value)
+    return conditions, params
+
+
+def build_page_query(
+    columns=None,
+    filters=None,
+    sort_by=None,
+    descending=False,
+    page_size=PAGE_SIZE,
+    offset=0,
+    after=None,
+    table=XDR_TABLE,
+    section=None,
+    row_key=None,
+):
+    """
+    Build the query of one page of a table.
+
+    Rows are ordered by sort_by and then by their row key (see ROW_KEY), both in the
+    sort direction, with the rows without a sort value last; without sort_by they are in
+    row key order. Given the cursor of the previous page (after), the page starts right
+    after it (keyset pagination): rows with a sort value ("values" section) are read
+    with a row comparison that an index on sort_by serves from the cursor on, and the
+    rows without one ("nulls" section) by row key. Without a cursor, offset rows of the
+    whole order are skipped (a direct page jump, whose cost grows with the offset). One
+    row more than the page size is fetched to know whether a next page exists.
+
+    Only sort by a column with a btree index (see indexed_columns): otherwise PostgreSQL
+    sorts every matching row on each page.
+
+    :param columns: None for every column, a column set name or a list of columns.
+    :param filters: List of (column, operator, value) filters, see FILTER_OPERATORS.
+    :param sort_by: Optional column to sort by.
+    :param descending: Sort in descending order.
+    :param page_size: Number of rows per page.
+    :param offset: Number of rows to skip when no cursor is given.
+    :param after: Cursor (sort value, row key) of the last row of the previous page.
+    :param table: Table to page through.
+    :param section: "values" or "nulls" to read one section of a sorted order, defaults
+        to the section of the cursor, or the whole order without a cursor.
+    :param row_key: Unique, non-null column breaking ties, defaults to ROW_KEY.
+    :return: Tuple (SQL query, list of parameters).
+    """
+    key = quote_identifier(row_key or ROW_KEY)
+    select_list = ", ".join(
+        quote_identifier(column) for column in resolve_columns(columns)
+    )
+    conditions, params = build_filter_sql(filters)
+
+    direction = "DESC" if descending else "ASC"
+    comparison = "<" if descending else ">"
+    if sort_by is None:
+        order_by = key
+        if after is not None:
+            conditions.append(f"{key} > %s")
+            params.append(after[1])
+    else:
+        column = quote_identifier(sort_by)
+        if section is None and after is not None:
+            section = "values" if after[0] is not None else "nulls"
+        if section == "values":
+            order_by = f"{column} {direction}, {key} {direction}"
+            conditions.append(f"{column} IS NOT NULL")
+            if after is not None:
+                conditions.append(f"({column}, {key}) {comparison} (%s, %s)")
+                params += [after[0], after[1]]
+        elif section == "nulls":
+            order_by = f"{key} {direction}"
+            conditions.append(f"{column} IS NULL")
+            if after is not None and after[0] is None:
+                conditions.append(f"{key} {comparison} %s")
+                params.append(after[1])
+        elif section is None:
+            order_by = f"{column} {direction} NULLS LAST, {key} {direction}"
+        else:
+            raise ValueError(f"Unknown page section: {section}")
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f"SELECT {select_list}, {key} AS _row_key FROM {table}{where} "
+        f"ORDER BY {order_by} LIMIT {int(page_size) + 1}"
+    )
+    if after is None and offset:
+        query += f" OFFSET {int(offset)}"
+    return query, params
+
+
+def fetch_sql_page(
+    columns=None,
+    filters=None,
+    sort_by=None,
+    descending=False,
+    page_size=PAGE_SIZE,
+    offset=0,
+    after=None,
+    table=XDR_TABLE,
+    row_key=None,
+):
+    """
+    Fetch one page of a table from PostgreSQL, see build_page_query.
+
+    A keyset page of a sorted order that reaches the end of the rows with a sort value
+    is completed with the first rows without one.
+
+    :return: Tuple (DataFrame of at most page_size rows, cursor of its last row or None
+        if there is no next page), or (None, None) if the query failed.
+    """
+
+    def load(section, section_after, limit, section_offset=0):
+        query, params = build_page_query(
+            columns,
+            filters,
+            sort_by,
+            descending,
+            limit,
+            section_offset,
+            section_after,
+            table,
+            section,
+            row_key,
+        )
+        return load_data_from_postgres(query, params=params or None)
+
+    if sort_by is None or (after is None and offset):
+        df = load(None, after, page_size, offset)
+    else:
+        section = "values" if after is None or after[0] is not None else "nulls"
+        df = load(section, after, page_size)
+        if df is not None and section == "values" and len(df) <= page_size:
+            nulls = load("nulls", None, page_size - len(df))
+            df = None if nulls is None else pd.concat([df, nulls], ignore_index=True)
+    if df is None:
+        return None, None
+
+    has_next = len(df) > page_size
+    df = df.head(page_size)
+    cursor = None
+    if has_next:
+        last = df.iloc[-1]
+        value = None if sort_by is None or pd.isna(last[sort_by]) else last[sort_by]
+        row = last["_row_key"]
+        cursor = (
+            value.item() if hasattr(value, "item") else value,
+            row.item() if hasattr(row, "item") else row,
+        )
+    return df.drop(columns="_row_key"), cursor
+
+
+def count_sql_rows(filters=None, table=XDR_TABLE):
+    """
+    Count the rows matching the filters. Only call it when the total is displayed; the
+    result goes through the query result cache.
+    """
+    conditions, params = build_filter_sql(filters)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    df = load_data_from_postgres(
+        f"SELECT COUNT(*) AS count FROM {table}{where}",
+        params=params or None,
+        cache=True,
+    )
+    return None if df is None else int(df["count"].iloc[0])
+
+
+def indexed_columns(table=XDR_TABLE):
+    """
+    Return the columns a table can be paged by in sorted order without a full sort: the
+    leading columns of its plain btree indexes.
+
+    :return: List of columns, or None if the catalog could not be read.
+    """
+    df = load_data_from_postgres(INDEXED_COLUMNS_QUERY, params=[table])
+    return None if df is None else list(dict.fromkeys(df["column"]))
+
+
+def filter_mask(df, filters):
+    """
+    Evaluate (column, operator, value) filters on a DataFrame. Missing values never
+    match.
+    """
+    check_filters(filters)
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters or []:
+        series = df[column]
+        if op == "contains":
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Match the categories once instead of every row
+                matching = [
+                    c
+                    for c in series.cat.categories
+                    if str(value).lower() in str(c).lower()
+                ]
+                condition = series.isin(matching)
+            else:
+                condition = series.astype("string").str.contains(
+                    str(value), case=False, regex=False
+                )
+        else:
+            condition = FILTER_OPERATORS[op](series, value)
+        mask &= np.asarray(pd.Series(condition).fillna(False), dtype=bool)
+    return mask
+
+
+def frame_order(df, filters=None, sort_by=None, descending=False):
+    """
+    Compute the row positions of a DataFrame matching the filters, in display order
+    (NULLs last).
+
+    The positions are computed once per sort and filter choice and reused for every
+    page, so turning a page only slices them.
+
+    :return: Array of row positions; its length is the number of matching rows.
+    """
+    positions = np.flatnonzero(filter_mask(df, filters))
+    if sort_by is not None and len(positions):
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        ranked = values.sort_values(
+            ascending=not descending, na_position="last", kind="stable"
+        ).index
+        positions = positions[ranked.to_numpy()]
+    dtype = np.int32 if len(df) < 2**31 else np.int64
+    return positions.astype(dtype)
+
+
+def fetch_frame_page(df, order, page, page_size=PAGE_SIZE):
+    """
+    Return one page of a DataFrame given its display order, see frame_order.
+    """
+    return df.iloc[order[page * page_size : (page + 1) * page_size]]
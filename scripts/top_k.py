@@ -0,0 +1,65 @@
+# scripts/top_k.py
+
+import numpy as np
+import pandas as pd
+
+
+def top_k_positions(matrix, k):
+    """
+    Select the rows of the k largest values of every column of a matrix by partial
+    selection.
+
+    Ties are broken by row order and NaNs rank last, like DataFrame.nlargest.
+
+    :param matrix: 2D array (rows x columns).
+    :param k: Number of rows per column.
+    :return: List with, per column, the array of selected row positions by descending
+        value.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    matrix = np.where(np.isnan(matrix), -np.inf, matrix)
+    k = min(k, matrix.shape[0])
+    if k == 0:
+        return [np.empty(0, dtype=np.intp) for _ in range(matrix.shape[1])]
+
+    # One partial selection for every column; the k-th largest value bounds each
+    # column's top k
+    candidates = np.argpartition(-matrix, k - 1, axis=0)[:k]
+    kth = matrix[candidates, np.arange(matrix.shape[1])].min(axis=0)
+    above = (matrix > kth).sum(axis=0)
+    at = (matrix == kth).sum(axis=0)
+
+    positions = []
+    for j in range(matrix.shape[1]):
+        column = matrix[:, j]
+        chosen = candidates[:, j]
+        if above[j] + at[j] > k:
+            # Several rows tie with the k-th value: keep the first ones
+            ties = np.flatnonzero(column == kth[j])[: k - above[j]]
+            chosen = np.concatenate([np.flatnonzero(column > kth[j]), ties])
+        chosen = chosen[np.lexsort((chosen, -column[chosen]))]
+        positions.append(chosen)
+    return positions
+
+
+def top_k_per_column(table, columns, k=10, key="MSISDN/Number"):
+    """
+    Find the top k rows of a per-user table for every column.
+
+    :param table: DataFrame with one row per user.
+    :param columns: Columns to rank users by.
+    :param k: Number of users per column.
+    :param key: User identifier column.
+    :return: Tuple (dict of column -> DataFrame with the key and the column for its top
+        k users, equal to table[[key, column]].nlargest(k, column); Series of column
+        totals by descending total).
+    """
+    matrix = table[columns].to_numpy(dtype=np.float64)
+    top = {
+        column: table[[key, column]].iloc[rows]
+        for column, rows in zip(columns, top_k_positions(matrix, k))
+    }
+    totals = pd.Series(np.nansum(matrix, axis=0), index=columns).sort_values(
+        ascending=False, kind="stable"
+    )
+    return top, totals
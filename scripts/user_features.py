@@ -0,0 +1,163 @@
+# scripts/user_features.py
+
+import itertools
+import pandas as pd
+from chunked_aggregation import is_chunked, aggregate_in_chunks
+from id_encoding import aggregate_by_codes
+from out_of_core import aggregate_out_of_core
+from parallel_aggregation import aggregate_in_parallel
+from sql_pushdown import check_backend, aggregate_in_sql
+from xdr_schema import APPLICATION_COLUMNS, XDR_SCHEMA, XDR_TABLE
+
+USER_KEY = "MSISDN/Number"
+
+# Every per-user metric of the analysis modules: feature name -> (xdr_data column,
+# function)
+USER_FEATURES = {
+    "sessions": ("Bearer Id", "count"),
+    "total_session_duration": ("Dur. (ms)", "sum"),
+    "total_download_data": ("Total DL (Bytes)", "sum"),
+    "total_upload_data": ("Total UL (Bytes)", "sum"),
+    "avg_tcp_retransmission": ("TCP DL Retrans. Vol (Bytes)", "mean"),
+    "avg_rtt": ("Avg RTT DL (ms)", "mean"),
+    "avg_throughput": ("Avg Bearer TP DL (kbps)", "mean"),
+    "handset_type": ("Handset Type", "first"),
+}
+USER_FEATURES.update({column: (column, "sum") for column in APPLICATION_COLUMNS})
+
+# (column, function) -> feature name
+FEATURE_SOURCES = {source: name for name, source in USER_FEATURES.items()}
+
+# Variance feature -> mean feature it belongs to, see user_state.features_from_state
+VARIANCE_FEATURES = {
+    name.replace("avg_", "var_", 1): name
+    for name, (_, function) in USER_FEATURES.items()
+    if function == "mean"
+}
+
+
+def is_user_features(df):
+    """
+    Check whether the data is a feature table, as built by build_user_features, from its
+    columns: one row per MSISDN and only feature columns with the dtypes of their
+    functions, at least one of which is not also an xdr_data column.
+
+    A table of application totals alone cannot be told from sessions; it is then grouped
+    again, which leaves its per-user sums unchanged.
+    """
+    if not isinstance(df, pd.DataFrame) or USER_KEY not in df.columns:
+        return False
+    columns = [column for column in df.columns if column != USER_KEY]
+    if not columns or all(column in XDR_SCHEMA for column in columns):
+        return False
+    for column in columns:
+        name = VARIANCE_FEATURES.get(column, column)
+        if name not in USER_FEATURES:
+            return False
+        if USER_FEATURES[name][1] != "first" and not pd.api.types.is_numeric_dtype(
+            df[column].dtype
+        ):
+            return False
+    return bool(df[USER_KEY].notna().all() and df[USER_KEY].is_unique)
+
+
+def feature_names(spec):
+    """
+    Map a named aggregation spec of the analysis modules onto feature names.
+
+    :param spec: Dict of output name -> (column, function).
+    :return: Dict of output name -> feature name.
+    """
+    unknown = [
+        name for name, source in spec.items() if tuple(source) not in FEATURE_SOURCES
+    ]
+    if unknown:
+        raise ValueError(f"No user feature for: {unknown}")
+    return {name: FEATURE_SOURCES[tuple(source)] for name, source in spec.items()}
+
+
+def build_user_features(df, features=None):
+    """
+    Compute the per-user features in a single grouped pass over the sessions.
+
+    A DataFrame is aggregated with NumPy reductions over dense MSISDN codes (see
+    id_encoding.aggregate_by_codes); chunks are aggregated one at a time and merged.
+
+    :param df: Session DataFrame or stream of DataFrame chunks.
+    :param features: Feature names to compute (see USER_FEATURES), defaults to every
+        feature whose column is present in the data.
+    :return: DataFrame with one row per MSISDN and one column per feature.
+    """
+    if is_chunked(df):
+        chunks = iter(df)
+        first = next(chunks, None)
+        columns = [] if first is None else first.columns
+        df = itertools.chain([] if first is None else [first], chunks)
+    else:
+        columns = df.columns
+
+    if features is None:
+        features = [
+            name for name, (column, _) in USER_FEATURES.items() if column in columns
+        ]
+    spec = {name: USER_FEATURES[name] for name in features}
+
+    if is_chunked(df):
+        user_features = aggregate_in_chunks(df, USER_KEY, spec).reset_index()
+    else:
+        user_features = aggregate_by_codes(df, USER_KEY, spec)
+    return user_features
+
+
+def project_user_features(df, spec):
+    """
+    Return the per-user table of a named aggregation spec, as
+    df.groupby('MSISDN/Number').agg(**spec) followed by reset_index() would.
+
+    :param df: Feature table from build_user_features, or sessions (DataFrame or chunks)
+        which are then aggregated in one pass for just the features of the spec.
+    :param spec: Dict of output name -> (column, function), each matching a
+        USER_FEATURES entry.
+    :return: DataFrame with the MSISDN column and one column per spec entry.
+    """
+    names = feature_names(spec)
+    if not is_user_features(df):
+        df = build_user_features(df, list(dict.fromkeys(names.values())))
+
+    missing = [feature for feature in names.values() if feature not in df.columns]
+    if missing:
+        raise ValueError(f"Missing user features: {missing}")
+    projection = df[[USER_KEY] + list(names.values())]
+    projection.columns = [USER_KEY] + list(names)
+    return projection
+
+
+def aggregate_per_user(df, spec, backend="pandas", source=XDR_TABLE):
+    """
+    Aggregate a named aggregation spec per user with one of the backends of
+    sql_pushdown.BACKENDS:
+
+    - 'pandas': project_user_features, which accepts a DataFrame, a stream of DataFrame
+      chunks or a feature table from build_user_features (projected without grouping
+      the sessions again).
+    - 'sql': the aggregation runs inside PostgreSQL over source (xdr_data by default)
+      and df is not used, see sql_pushdown.aggregate_in_sql.
+    - 'out_of_core': the sessions are hash-partitioned to disk under a memory budget,
+      see out_of_core.aggregate_out_of_core.
+    - 'parallel': the sessions are sharded over worker processes, see
+      parallel_aggregation.aggregate_in_parallel.
+
+    :param df: Sessions (DataFrame or chunks) or feature table; unused for 'sql'.
+    :param spec: Dict of output name -> (column, function).
+    :param backend: One of sql_pushdown.BACKENDS.
+    :param source: Table or subquery aggregated by the 'sql' backend.
+    :return: DataFrame with the MSISDN column and one column per spec entry.
+    """
+    check_backend(backend)
+    if backend == "sql":
+        return aggregate_in_sql(spec, source=source)
+    if backend == "out_of_core":
+        return aggregate_out_of_core(df, spec)
+    if backend == "parallel":
+        return aggregate_in_parallel(df, spec)
+    return project_user_features(df, spec)
@@ -0,0 +1,237 @@
+# scripts/user_state.py
+
+import json
+import os
+import time
+import pandas as pd
+from user_features import USER_KEY, USER_FEATURES, feature_names
+from users_overview import aggregate_user_data, USER_METRICS
+from new_engagement_analysis import aggregate_metrics, ENGAGEMENT_METRICS
+import expriance_analytics
+import satisfaction_analysis
+from lazy_imports import lazy_module
+
+pa = lazy_module("pyarrow")
+
+# Location of the persisted per-user state
+USER_STATE_PATH = os.getenv(
+    "USER_STATE_PATH", os.path.join("data", "user_state", "user_state.arrow")
+)
+STATE_METADATA_KEY = b"user_state"
+
+# Per-user tables of the analysis modules: kind -> (named aggregation spec, function
+# projecting it)
+USER_TABLES = {
+    "user_overview": (USER_METRICS, aggregate_user_data),
+    "engagement": (ENGAGEMENT_METRICS, aggregate_metrics),
+    "experience": (
+        expriance_analytics.EXPERIENCE_METRICS,
+        expriance_analytics.aggregate_per_customer,
+    ),
+    "satisfaction": (
+        satisfaction_analysis.CUSTOMER_METRICS,
+        satisfaction_analysis.aggregate_per_customer,
+    ),
+}
+
+
+def state_columns(name):
+    """
+    Return the state columns of a feature: sums, counts and firsts are kept as is, means
+    as a sum, a count and a sum of squared deviations (m2) so their variance can be
+    merged too.
+    """
+    if USER_FEATURES[name][1] == "mean":
+        return [f"{name}__sum", f"{name}__count", f"{name}__m2"]
+    return [name]
+
+
+def state_features(state):
+    """
+    Return the names of the features held by a state.
+    """
+    return [name for name in USER_FEATURES if state_columns(name)[0] in state.columns]
+
+
+def batch_state(df, features=None):
+    """
+    Compute the mergeable per-user state of a batch of sessions in one grouped pass.
+
+    :param df: Session DataFrame.
+    :param features: Feature names to track (see user_features.USER_FEATURES), defaults
+        to every feature whose column is present in the batch.
+    :return: DataFrame indexed by MSISDN with the state columns of every feature.
+    """
+    if features is None:
+        features = [
+            name for name, (column, _) in USER_FEATURES.items() if column in df.columns
+        ]
+    missing = [
+        USER_FEATURES[name][0]
+        for name in features
+        if USER_FEATURES[name][0] not in df.columns
+    ]
+    if missing:
+        raise ValueError(f"Missing xdr_data columns: {missing}")
+
+    spec = {}
+    for name in features:
+        column, func = USER_FEATURES[name]
+        if func == "mean":
+            spec[f"{name}__sum"] = (column, "sum")
+            spec[f"{name}__count"] = (column, "count")
+            spec[f"{name}__var"] = (column, "var")
+        else:
+            spec[name] = (column, func)
+    state = df.groupby(USER_KEY).agg(**spec)
+
+    for name in features:
+        if USER_FEATURES[name][1] == "mean":
+            count = state[f"{name}__count"]
+            state[f"{name}__m2"] = (state.pop(f"{name}__var") * (count - 1)).fillna(0.0)
+    return state[[column for name in features for column in state_columns(name)]]
+
+
+def merge_states(state, other):
+    """
+    Merge two per-user states. Sums and counts are added, variances are combined with
+    the parallel algorithm of Chan et al. and the first handset of state wins over the
+    one of other.
+    """
+    features = state_features(state)
+    missing = [name for name in features if state_columns(name)[0] not in other.columns]
+    if missing:
+        raise ValueError(f"Missing user features: {missing}")
+
+    index = state.index.union(other.index)
+    merged = pd.DataFrame(index=index)
+    for name in features:
+        func = USER_FEATURES[name][1]
+        if func == "first":
+            merged[name] = (
+                state[name].reindex(index).combine_first(other[name].reindex(index))
+            )
+        elif func == "mean":
+            a = {
+                part: state[f"{name}__{part}"].reindex(index, fill_value=0)
+                for part in ("sum", "count", "m2")
+            }
+            b = {
+                part: other[f"{name}__{part}"].reindex(index, fill_value=0)
+                for part in ("sum", "count", "m2")
+            }
+            count = a["count"] + b["count"]
+            delta = b["sum"] / b["count"].where(b["count"] > 0) - a["sum"] / a[
+                "count"
+            ].where(a["count"] > 0)
+            correction = (
+                delta**2 * a["count"] * b["count"] / count.where(count > 0)
+            ).fillna(0.0)
+            merged[f"{name}__sum"] = a["sum"] + b["sum"]
+            merged[f"{name}__count"] = count
+            merged[f"{name}__m2"] = a["m2"] + b["m2"] + correction
+        else:
+            merged[name] = state[name].reindex(index, fill_value=0) + other[
+                name
+            ].reindex(index, fill_value=0)
+    merged.index.name = USER_KEY
+    return merged
+
+
+def features_from_state(state):
+    """
+    Turn a per-user state into a feature table accepted by the analysis functions (see
+    user_features.build_user_features). Each mean feature also gets its population
+    variance, e.g. var_rtt next to avg_rtt.
+    """
+    features = pd.DataFrame(index=state.index)
+    variances = {}
+    for name in state_features(state):
+        if USER_FEATURES[name][1] == "mean":
+            count = state[f"{name}__count"].where(state[f"{name}__count"] > 0)
+            features[name] = state[f"{name}__sum"] / count
+            variances[name.replace("avg_", "var_", 1)] = state[f"{name}__m2"] / count
+        else:
+            features[name] = state[name]
+    for name, variance in variances.items():
+        features[name] = variance
+    return features.reset_index()
+
+
+def user_tables(features):
+    """
+    Project a feature table onto every per-user table of USER_TABLES whose features it
+    holds.
+
+    :return: Dict of kind -> DataFrame, plus "features" -> the feature table.
+    """
+    tables = {"features": features}
+    for kind, (spec, project) in USER_TABLES.items():
+        if all(feature in features.columns for feature in feature_names(spec).values()):
+            tables[kind] = project(features)
+    return tables
+
+
+def load_user_state(path=None):
+    """
+    Read the persisted per-user state.
+
+    :return: Tuple (state DataFrame indexed by MSISDN or None if there is none, metadata
+        dict).
+    """
+    path = path or USER_STATE_PATH
+    if not os.path.exists(path):
+        return None, {"rows": 0, "batches": []}
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    info = json.loads(table.schema.metadata[STATE_METADATA_KEY])
+    return table.to_pandas().set_index(USER_KEY), info
+
+
+def save_user_state(state, info, path=None):
+    """
+    Persist a per-user state with its metadata in a single Arrow IPC file, replaced
+    atomically.
+    """
+    path = path or USER_STATE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(state.reset_index(), preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, STATE_METADATA_KEY: json.dumps(info)}
+    )
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def update_user_state(new_batch_df, path=None, batch_id=None):
+    """
+    Fold a batch of new sessions into the persisted per-user state and return the
+    updated tables.
+
+    Only the new rows are grouped; the state holds one row per subscriber, so the cost
+    of an update does not grow with the history. The state is written by a single
+    process at a time.
+
+    :param new_batch_df: Session DataFrame with the new rows; its columns must cover the
+        features of the state.
+    :param path: State file, defaults to USER_STATE_PATH.
+    :param batch_id: Optional batch identifier (e.g. the day loaded). A batch already
+        folded in is skipped, so a load can be retried safely.
+    :return: Dict of kind -> per-user table, see user_tables.
+    """
+    state, info = load_user_state(path)
+    if batch_id is not None and batch_id in info["batches"]:
+        return user_tables(features_from_state(state))
+
+    batch = batch_state(new_batch_df, None if state is None else state_features(state))
+    state = batch if state is None else merge_states(state, batch)
+    info = {
+        "rows": info["rows"] + len(new_batch_df),
+        "batches": info["batches"] + ([batch_id] if batch_id is not None else []),
+        "updated": time.time(),
+    }
+    save_user_state(state, info, path)
+    return user_tables(features_from_state(state))
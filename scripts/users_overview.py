@@ -1,8 +1,17 @@
 import pandas as pd
 from load_data import load_data_from_postgres
 from overview_analysis import clean_data
+from user_features import aggregate_per_user
+from xdr_schema import XDR_TABLE
 import os
 
+USER_METRICS = {
+    'number_of_xDR_sessions': ('Bearer Id', 'count'),
+    'total_session_duration': ('Dur. (ms)', 'sum'),
+    'total_download_data': ('Total DL (Bytes)', 'sum'),
+    'total_upload_data': ('Total UL (Bytes)', 'sum')
+}
+
 def load_and_prepare_data(query):
     """
     Load data from PostgreSQL and prepare it by filling missing values.
@@ -11,20 +20,18 @@ def load_and_prepare_data(query):
     df = clean_data(df)
     return df
 
-def aggregate_user_data(df):
+def aggregate_user_data(df=None, backend='pandas', source=XDR_TABLE):
     """
     Aggregate per user the following information:
     - number of xDR sessions
     - Session duration
     - the total download (DL) and upload (UL) data
     - the total data volume (in Bytes) during this session for each application
+
+    Accepts sessions (a DataFrame or a stream of DataFrame chunks) or a feature table from
+    user_features.build_user_features; see user_features.aggregate_per_user for the backends.
     """
-    user_aggregated_data = df.groupby('MSISDN/Number').agg(
-        number_of_xDR_sessions=('Bearer Id', 'count'),
-        total_session_duration=('Dur. (ms)', 'sum'),
-        total_download_data=('Total DL (Bytes)', 'sum'),
-        total_upload_data=('Total UL (Bytes)', 'sum')
-    ).reset_index()
+    user_aggregated_data = aggregate_per_user(df, USER_METRICS, backend, source)
     
     user_aggregated_data['total_data_volume'] = user_aggregated_data['total_download_data'] + user_aggregated_data['total_upload_data']
     
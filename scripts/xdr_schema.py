@@ -0,0 +1,208 @@
+# scripts/xdr_schema.py
+
+import pandas as pd
+
+XDR_TABLE = "xdr_data"
+
+# Column -> dtype for every column of xdr_data, in table order. Identifiers are integers
+# with gaps, so they use nullable integer types; Bearer Id values go beyond the int64
+# range and need the unsigned variant. Byte and duration counters reach billions and are
+# summed per user, beyond the 24-bit mantissa of float32, so they stay float64. RTT,
+# throughput, percentages, millisecond offsets and per-second counts are small enough
+# for float32. Repeated strings are stored as categoricals.
+XDR_SCHEMA = {
+    "Bearer Id": "UInt64",
+    "Start": "datetime64[ns]",
+    "Start ms": "float32",
+    "End": "datetime64[ns]",
+    "End ms": "float32",
+    "Dur. (ms)": "float64",
+    "IMSI": "Int64",
+    "MSISDN/Number": "Int64",
+    "IMEI": "Int64",
+    "Last Location Name": "category",
+    "Avg RTT DL (ms)": "float32",
+    "Avg RTT UL (ms)": "float32",
+    "Avg Bearer TP DL (kbps)": "float32",
+    "Avg Bearer TP UL (kbps)": "float32",
+    "TCP DL Retrans. Vol (Bytes)": "float64",
+    "TCP UL Retrans. Vol (Bytes)": "float64",
+    "DL TP < 50 Kbps (%)": "float32",
+    "50 Kbps < DL TP < 250 Kbps (%)": "float32",
+    "250 Kbps < DL TP < 1 Mbps (%)": "float32",
+    "DL TP > 1 Mbps (%)": "float32",
+    "UL TP < 10 Kbps (%)": "float32",
+    "10 Kbps < UL TP < 50 Kbps (%)": "float32",
+    "50 Kbps < UL TP < 300 Kbps (%)": "float32",
+    "UL TP > 300 Kbps (%)": "float32",
+    "HTTP DL (Bytes)": "float64",
+    "HTTP UL (Bytes)": "float64",
+    "Activity Duration DL (ms)": "float64",
+    "Activity Duration UL (ms)": "float64",
+    "Dur. (ms).1": "float64",
+    "Handset Manufacturer": "category",
+    "Handset Type": "category",
+    "Nb of sec with 125000B < Vol DL": "float32",
+    "Nb of sec with 1250B < Vol UL < 6250B": "float32",
+    "Nb of sec with 31250B < Vol DL < 125000B": "float32",
+    "Nb of sec with 37500B < Vol UL": "float32",
+    "Nb of sec with 6250B < Vol DL < 31250B": "float32",
+    "Nb of sec with 6250B < Vol UL < 37500B": "float32",
+    "Nb of sec with Vol DL < 6250B": "float32",
+    "Nb of sec with Vol UL < 1250B": "float32",
+    "Social Media DL (Bytes)": "float64",
+    "Social Media UL (Bytes)": "float64",
+    "Google DL (Bytes)": "float64",
+    "Google UL (Bytes)": "float64",
+    "Email DL (Bytes)": "float64",
+    "Email UL (Bytes)": "float64",
+    "Youtube DL (Bytes)": "float64",
+    "Youtube UL (Bytes)": "float64",
+    "Netflix DL (Bytes)": "float64",
+    "Netflix UL (Bytes)": "float64",
+    "Gaming DL (Bytes)": "float64",
+    "Gaming UL (Bytes)": "float64",
+    "Other DL (Bytes)": "float64",
+    "Other UL (Bytes)": "float64",
+    "Total UL (Bytes)": "float64",
+    "Total DL (Bytes)": "float64",
+}
+
+ID_COLUMNS = [
+    column for column, dtype in XDR_SCHEMA.items() if dtype in ("Int64", "UInt64")
+]
+
+CATEGORICAL_COLUMNS = [
+    column for column, dtype in XDR_SCHEMA.items() if dtype == "category"
+]
+
+APPLICATION_COLUMNS = [
+    column
+    for column in XDR_SCHEMA
+    if column.split(" ")[0]
+    in ("Social", "Google", "Email", "Youtube", "Netflix", "Gaming", "Other")
+]
+
+# Columns needed by each analysis, so loaders only fetch what is used. Start orders the
+# sessions whose first handset is kept, see id_encoding.SESSION_START.
+COLUMN_SETS = {
+    "user_overview": [
+        "MSISDN/Number",
+        "Bearer Id",
+        "Dur. (ms)",
+        "Total DL (Bytes)",
+        "Total UL (Bytes)",
+    ],
+    "engagement": [
+        "MSISDN/Number",
+        "Bearer Id",
+        "Dur. (ms)",
+        "Total DL (Bytes)",
+        "Total UL (Bytes)",
+    ]
+    + [column for column in APPLICATION_COLUMNS if " DL " in column],
+    "experience": [
+        "MSISDN/Number",
+        "TCP DL Retrans. Vol (Bytes)",
+        "Avg RTT DL (ms)",
+        "Handset Type",
+        "Avg Bearer TP DL (kbps)",
+        "Start",
+    ],
+    "satisfaction": [
+        "MSISDN/Number",
+        "Bearer Id",
+        "Dur. (ms)",
+        "Total DL (Bytes)",
+        "Total UL (Bytes)",
+        "TCP DL Retrans. Vol (Bytes)",
+        "Avg RTT DL (ms)",
+        "Handset Type",
+        "Avg Bearer TP DL (kbps)",
+        "Start",
+    ],
+    "handsets": ["Handset Manufacturer", "Handset Type"],
+}
+COLUMN_SETS["dashboard"] = list(
+    dict.fromkeys(
+        COLUMN_SETS["engagement"]
+        + COLUMN_SETS["experience"]
+        + COLUMN_SETS["satisfaction"]
+    )
+)
+
+
+def resolve_columns(columns=None):
+    """
+    Resolve a column set name or a list of columns into a list of xdr_data columns.
+
+    :param columns: None for every column, the name of a COLUMN_SETS entry or a list of
+        column names.
+    :return: List of column names in the requested order.
+    """
+    if columns is None:
+        return list(XDR_SCHEMA)
+    if isinstance(columns, str):
+        if columns not in COLUMN_SETS:
+            raise ValueError(f"Unknown column set: {columns}")
+        return list(COLUMN_SETS[columns])
+
+    unknown = [column for column in columns if column not in XDR_SCHEMA]
+    if unknown:
+        raise ValueError(f"Unknown xdr_data columns: {unknown}")
+    return list(columns)
+
+
+def quote_identifier(name):
+    """
+    Quote a column or table name for PostgreSQL.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def build_select_query(columns=None, table=XDR_TABLE, where=None):
+    """
+    Build a SELECT statement that only fetches the requested xdr_data columns.
+
+    :param columns: Columns to fetch, see resolve_columns.
+    :param table: Table to select from.
+    :param where: Optional SQL condition appended as a WHERE clause.
+    :return: SQL query string.
+    """
+    select_list = ", ".join(
+        quote_identifier(column) for column in resolve_columns(columns)
+    )
+    query = f"SELECT {select_list} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    return query
+
+
+def cast_column(series, dtype):
+    """
+    Cast one column to its schema dtype.
+
+    Values that cannot be represented (e.g. fractional identifiers) leave the column
+    untouched.
+    """
+    try:
+        if dtype.startswith("datetime"):
+            return pd.to_datetime(series, errors="coerce")
+        if dtype in ("Int64", "UInt64", "float32", "float64"):
+            return pd.to_numeric(series, errors="coerce").astype(dtype)
+        return series.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        return series
+
+
+def apply_schema(df):
+    """
+    Cast the xdr_data columns of a DataFrame to their compact schema dtypes.
+
+    Columns that are not part of the schema are left as they are.
+    """
+    for column in df.columns:
+        dtype = XDR_SCHEMA.get(column)
+        if dtype is not None and str(df[column].dtype) != dtype:
+            df[column] = cast_column(df[column], dtype)
+    return df
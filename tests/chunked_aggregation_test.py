@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.chunked_aggregation import is_chunked, aggregate_in_chunks
+from scripts.new_engagement_analysis import aggregate_metrics
+from scripts.expriance_analytics import aggregate_per_customer
+
+
+class TestChunkedAggregation(unittest.TestCase):
+
+    def setUp(self):
+        # Sample data for testing
+        data = {
+            "MSISDN/Number": [1, 2, 1, 3, 2, 1, 3, 2],
+            "Bearer Id": [1, 2, 3, 4, 5, 6, 7, 8],
+            "Dur. (ms)": [100, 200, 300, 400, 500, 600, 700, 800],
+            "Total DL (Bytes)": [1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000],
+            "Total UL (Bytes)": [100, 200, 300, 400, 500, 600, 700, 800],
+            "TCP DL Retrans. Vol (Bytes)": [10, np.nan, 30, 40, 50, np.nan, 70, 80],
+            "Avg RTT DL (ms)": [5, 6, 7, 8, 9, 10, 11, 12],
+            "Handset Type": [
+                None,
+                "Handset2",
+                "Handset1",
+                "Handset3",
+                "Handset4",
+                "Handset5",
+                "Handset6",
+                "Handset7",
+            ],
+            "Avg Bearer TP DL (kbps)": [50, 60, 70, 80, 90, 100, 110, 120],
+        }
+        self.df = pd.DataFrame(data)
+
+    def chunks(self, size=3):
+        return (self.df.iloc[i : i + size] for i in range(0, len(self.df), size))
+
+    def test_is_chunked(self):
+        self.assertFalse(is_chunked(self.df))
+        self.assertTrue(is_chunked(self.chunks()))
+        self.assertTrue(is_chunked(list(self.chunks())))
+        self.assertFalse(is_chunked(None))
+        self.assertFalse(is_chunked("xdr_data"))
+
+    def test_aggregate_in_chunks_matches_groupby(self):
+        spec = {
+            "total_dl": ("Total DL (Bytes)", "sum"),
+            "sessions": ("Bearer Id", "count"),
+        }
+        expected = self.df.groupby("MSISDN/Number").agg(**spec)
+        result = aggregate_in_chunks(self.chunks(), "MSISDN/Number", spec)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_partials_merged_while_streaming(self):
+        spec = {
+            "total_dl": ("Total DL (Bytes)", "sum"),
+            "avg_retrans": ("TCP DL Retrans. Vol (Bytes)", "mean"),
+            "handset": ("Handset Type", "first"),
+        }
+        expected = self.df.groupby("MSISDN/Number").agg(**spec)
+        for merge_every in (1, 2):
+            result = aggregate_in_chunks(
+                self.chunks(size=2), "MSISDN/Number", spec, merge_every=merge_every
+            )
+            pd.testing.assert_frame_equal(result, expected)
+
+        # With start times the earliest session's handset wins, whatever the chunk order
+        self.df["Start"] = pd.Timestamp("2019-04-04") - pd.to_timedelta(
+            self.df.index, unit="h"
+        )
+        result = aggregate_in_chunks(
+            self.chunks(size=2), "MSISDN/Number", spec, merge_every=1
+        )
+        self.assertEqual(list(result["handset"]), ["Handset5", "Handset7", "Handset6"])
+
+    def test_aggregate_metrics_chunked(self):
+        expected = aggregate_metrics(self.df)
+        result = aggregate_metrics(self.chunks())
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_aggregate_per_customer_chunked(self):
+        expected = aggregate_per_customer(self.df)
+        result = aggregate_per_customer(self.chunks())
+        pd.testing.assert_frame_equal(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
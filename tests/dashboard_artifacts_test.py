@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.dashboard_artifacts import (
+    PAGE_BUILDERS,
+    histogram_table,
+    build_dashboard_artifacts,
+    latest_version,
+    load_artifact_bundle,
+)
+
+
+class TestDashboardArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.artifact_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        n_rows = 60
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": rng.integers(0, 20, n_rows).astype("float64")
+                + 33600000000,
+                "Bearer Id": rng.integers(1, 10**12, n_rows).astype("float64"),
+                "Dur. (ms)": rng.uniform(1e4, 1e6, n_rows),
+                "Total DL (Bytes)": rng.uniform(1e6, 1e9, n_rows),
+                "Total UL (Bytes)": rng.uniform(1e5, 1e8, n_rows),
+                "TCP DL Retrans. Vol (Bytes)": rng.uniform(0, 1e6, n_rows),
+                "Avg RTT DL (ms)": rng.uniform(10, 200, n_rows),
+                "Avg Bearer TP DL (kbps)": rng.uniform(1, 1e5, n_rows),
+                "Handset Type": rng.choice(
+                    ["Apple iPhone 6S", "Huawei B528S-23A", "Samsung Galaxy S8"], n_rows
+                ),
+            }
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.artifact_dir)
+
+    def test_histogram_table(self):
+        histogram = histogram_table(pd.Series([0.0, 1.0, 1.0, np.nan, 4.0]), bins=4)
+        self.assertEqual(list(histogram["count"]), [1, 2, 0, 1])
+        self.assertEqual(list(histogram["bin_left"]), [0.0, 1.0, 2.0, 3.0])
+
+    def test_build_and_load_bundle(self):
+        version = build_dashboard_artifacts(
+            self.df, output_dir=self.artifact_dir, version="v1"
+        )
+
+        self.assertEqual(latest_version(self.artifact_dir), "v1")
+        bundle = load_artifact_bundle(self.artifact_dir)
+
+        expected = {}
+        for builder in PAGE_BUILDERS.values():
+            expected.update(builder(self.df))
+        self.assertEqual(set(bundle) - {"manifest"}, set(expected))
+        for name, table in expected.items():
+            pd.testing.assert_frame_equal(
+                bundle[name], table.reset_index(drop=True), check_dtype=False
+            )
+
+        self.assertEqual(
+            len(bundle["engagement_metrics"]), self.df["MSISDN/Number"].nunique()
+        )
+        self.assertEqual(len(bundle["experience_centroids"]), 3)
+        self.assertEqual(
+            bundle["satisfaction_histogram"]["count"].sum(),
+            self.df["MSISDN/Number"].nunique(),
+        )
+        self.assertEqual(bundle["manifest"]["version"], version)
+
+    def test_old_bundles_pruned(self):
+        for version in ("v1", "v2", "v3"):
+            build_dashboard_artifacts(
+                self.df, output_dir=self.artifact_dir, keep=2, version=version
+            )
+
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(self.artifact_dir) if name.startswith("v")
+            ),
+            ["v2", "v3"],
+        )
+        self.assertEqual(
+            load_artifact_bundle(self.artifact_dir)["manifest"]["version"], "v3"
+        )
+
+    def test_versions_unique(self):
+        first = build_dashboard_artifacts(self.df, output_dir=self.artifact_dir)
+        second = build_dashboard_artifacts(self.df, output_dir=self.artifact_dir)
+        self.assertNotEqual(first, second)
+        self.assertEqual(latest_version(self.artifact_dir), second)
+        with self.assertRaises(FileExistsError):
+            build_dashboard_artifacts(
+                self.df, output_dir=self.artifact_dir, version=second
+            )
+
+    def test_missing_bundle(self):
+        with self.assertRaises(FileNotFoundError):
+            load_artifact_bundle(self.artifact_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from scripts.density_plot import density_grids, plot_points  # noqa: E402
+
+
+class TestDensityPlot(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(
+            {
+                "avg_rtt": rng.gamma(2.0, 30.0, 5000),
+                "avg_throughput": rng.gamma(2.0, 5000.0, 5000),
+                "cluster": rng.integers(0, 3, 5000),
+            }
+        )
+        self.df.loc[:9, "avg_rtt"] = np.nan
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_density_grids_per_group(self):
+        counts, x_edges, y_edges, labels = density_grids(
+            self.df["avg_rtt"], self.df["avg_throughput"], self.df["cluster"], bins=50
+        )
+
+        self.assertEqual(counts.shape, (50, 50, 3))
+        self.assertEqual(list(labels), [0, 1, 2])
+        self.assertEqual(len(x_edges), 51)
+        # Every point with both coordinates lands in the grid of its cluster
+        valid = self.df.dropna()
+        for i, label in enumerate(labels):
+            self.assertEqual(counts[:, :, i].sum(), (valid["cluster"] == label).sum())
+
+    def test_density_grids_match_histogram2d(self):
+        valid = self.df.dropna()
+        counts, x_edges, y_edges, _ = density_grids(
+            valid["avg_rtt"], valid["avg_throughput"], bins=20
+        )
+        expected, _, _ = np.histogram2d(
+            valid["avg_rtt"], valid["avg_throughput"], bins=[x_edges, y_edges]
+        )
+        np.testing.assert_array_equal(counts[:, :, 0], expected)
+
+    def test_plot_points_switches_mode(self):
+        fig, ax = plt.subplots()
+        self.assertEqual(
+            plot_points(
+                ax,
+                self.df["avg_rtt"],
+                self.df["avg_throughput"],
+                hue=self.df["cluster"],
+                threshold=10000,
+            ),
+            "scatter",
+        )
+
+        fig, ax = plt.subplots()
+        mode = plot_points(
+            ax,
+            self.df["avg_rtt"],
+            self.df["avg_throughput"],
+            hue=self.df["cluster"],
+            threshold=1000,
+        )
+        self.assertEqual(mode, "density")
+        # One image instead of one marker per point
+        self.assertEqual(len(ax.images), 1)
+        self.assertEqual(len(ax.collections), 0)
+        self.assertEqual(ax.get_xlabel(), "avg_rtt")
+
+        fig, ax = plt.subplots()
+        self.assertEqual(
+            plot_points(
+                ax, self.df["avg_rtt"], self.df["avg_throughput"], threshold=1000
+            ),
+            "density",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
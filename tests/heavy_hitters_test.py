@@ -0,0 +1,156 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.heavy_hitters import (
+    chunk_weights,
+    summarize,
+    merge_summaries,
+    error_bound,
+    top_heavy_hitters,
+    build_leaderboards,
+    stream_value_counts,
+    count_min_sketch,
+    update_count_min,
+    merge_count_min,
+    query_count_min,
+)
+from scripts.overview_analysis import (
+    identify_top_10_handsets,
+    identify_top_3_manufacturers,
+)
+from scripts.new_engagement_analysis import (
+    aggregate_metrics,
+    top_10_customers,
+    stream_top_customers,
+)
+
+
+class TestHeavyHitters(unittest.TestCase):
+
+    def setUp(self):
+        # Skewed sample sessions: a few subscribers and handsets dominate
+        rng = np.random.default_rng(5)
+        n = 20000
+        subscribers = rng.zipf(1.3, n) % 800
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": subscribers.astype(float),
+                "Bearer Id": np.arange(n, dtype=float),
+                "Dur. (ms)": rng.integers(1, 1000, n).astype(float),
+                "Total DL (Bytes)": rng.random(n) * 1e6,
+                "Total UL (Bytes)": rng.random(n) * 1e5,
+                "Handset Type": [f"H{i}" for i in rng.zipf(1.5, n) % 300],
+                "Handset Manufacturer": [f"M{i}" for i in rng.zipf(2.0, n) % 20],
+            }
+        )
+        self.df.loc[::97, "MSISDN/Number"] = np.nan
+
+    def chunks(self, size=3000):
+        return (self.df.iloc[i : i + size] for i in range(0, len(self.df), size))
+
+    def test_exact_when_capacity_covers_keys(self):
+        pd.testing.assert_series_equal(
+            identify_top_10_handsets(self.chunks()),
+            identify_top_10_handsets(self.df),
+            check_dtype=False,
+        )
+        pd.testing.assert_series_equal(
+            identify_top_3_manufacturers(self.chunks()),
+            identify_top_3_manufacturers(self.df),
+            check_dtype=False,
+        )
+
+    def test_bounds_hold_with_small_capacity(self):
+        exact = self.df.groupby("MSISDN/Number")["Dur. (ms)"].sum()
+        summary = build_leaderboards(
+            self.chunks(),
+            {"duration": ("MSISDN/Number", "Dur. (ms)", "sum")},
+            capacity=50,
+        )["duration"]
+        self.assertLessEqual(len(summary["counters"]), 50)
+        bound = error_bound(summary)
+        self.assertLessEqual(bound, summary["total"] / 51)
+
+        top = top_heavy_hitters(summary, 5)
+        for key, row in top.iterrows():
+            self.assertLessEqual(row["lower"], exact[key] + 1e-6)
+            self.assertGreaterEqual(row["upper"], exact[key] - 1e-6)
+        untracked = exact.drop(summary["counters"].index)
+        self.assertLessEqual(untracked.max(), bound + 1e-6)
+        true_top = set(exact.nlargest(5).index)
+        self.assertTrue(set(top.index[top["guaranteed"]]) <= true_top)
+
+    def test_merge_shards(self):
+        shards = [
+            summarize(chunk_weights(chunk, "Handset Type", "Handset Type"), capacity=20)
+            for chunk in self.chunks()
+        ]
+        merged = merge_summaries(*shards)
+        self.assertEqual(merged["total"], len(self.df))
+        exact = self.df["Handset Type"].value_counts()
+        bound = error_bound(merged)
+        for key, counter in merged["counters"].items():
+            self.assertLessEqual(counter, exact[key])
+            self.assertLessEqual(exact[key] - counter, bound + 1e-9)
+
+    def test_stream_value_counts(self):
+        counts = stream_value_counts(self.chunks(), "Handset Manufacturer", 5)
+        self.assertEqual(counts.name, "count")
+        self.assertEqual(counts.index.name, "Handset Manufacturer")
+        self.assertEqual(len(counts), 5)
+
+    def test_top_10_customers_from_chunks(self):
+        # A stream gives the same full per-user rows as the aggregated table
+        expected = top_10_customers(aggregate_metrics(self.df))
+        for table, expected_table in zip(top_10_customers(self.chunks()), expected):
+            pd.testing.assert_frame_equal(
+                table.reset_index(drop=True), expected_table.reset_index(drop=True)
+            )
+
+    def test_stream_top_customers(self):
+        expected = top_10_customers(aggregate_metrics(self.df))
+        result = stream_top_customers(self.chunks())
+        for metric, table, expected_table in zip(
+            ["sessions_frequency", "total_session_duration", "total_data_volume"],
+            result,
+            expected,
+        ):
+            self.assertEqual(list(table.columns), ["MSISDN/Number", metric])
+            np.testing.assert_allclose(table[metric], expected_table[metric].to_numpy())
+
+    def test_count_min(self):
+        weights = chunk_weights(
+            self.df, "MSISDN/Number", ["Total DL (Bytes)", "Total UL (Bytes)"], "sum"
+        )
+        sketches = [count_min_sketch(epsilon=0.01, delta=0.01) for _ in range(2)]
+        update_count_min(sketches[0], weights.iloc[::2])
+        update_count_min(sketches[1], weights.iloc[1::2])
+        merged = merge_count_min(*sketches)
+
+        single = update_count_min(count_min_sketch(epsilon=0.01, delta=0.01), weights)
+        np.testing.assert_allclose(merged["table"], single["table"])
+
+        estimates = query_count_min(merged, weights.index)
+        self.assertTrue((estimates.to_numpy() >= weights.to_numpy() - 1e-6).all())
+        # Each estimate exceeds the true weight by more than epsilon * total with
+        # probability delta at most
+        errors = estimates.to_numpy() - weights.to_numpy()
+        self.assertLessEqual(
+            np.mean(errors > merged["epsilon"] * merged["total"]), merged["delta"]
+        )
+        with self.assertRaises(ValueError):
+            merge_count_min(merged, count_min_sketch(epsilon=0.1))
+
+    def test_count_min_numeric_keys(self):
+        # The same MSISDNs read as float64 or Int64 hit the same cells
+        weights = chunk_weights(self.df, "MSISDN/Number", "Dur. (ms)", "sum")
+        sketch = update_count_min(count_min_sketch(epsilon=0.01, delta=0.01), weights)
+        as_int = pd.Index(weights.index.to_numpy(), dtype="Int64")
+        np.testing.assert_array_equal(
+            query_count_min(sketch, as_int).to_numpy(),
+            query_count_min(sketch, weights.index).to_numpy(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.hyperloglog import (
+    hll_sketch,
+    update_hll,
+    merge_hll,
+    hll_estimate,
+    hll_error,
+    hll_to_bytes,
+    hll_from_bytes,
+    distinct_counts,
+    grouped_hll,
+    save_sketches,
+    load_sketches,
+)
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def setUp(self):
+        # Sample sessions: 60k subscribers over 200k sessions
+        rng = np.random.default_rng(6)
+        n = 200000
+        imsi = (208200000000000 + rng.integers(0, 60000, n)).astype(float)
+        imsi[rng.random(n) < 0.01] = np.nan
+        self.df = pd.DataFrame(
+            {
+                "IMSI": imsi,
+                "Handset Type": pd.Categorical(
+                    rng.choice(["A", "B", "C", None], n, p=[0.5, 0.3, 0.15, 0.05])
+                ),
+                "Start": pd.Timestamp("2019-04-04")
+                + pd.to_timedelta(rng.integers(0, 3 * 86400, n), unit="s"),
+            }
+        )
+
+    def chunks(self, size=30000):
+        return (self.df.iloc[i : i + size] for i in range(0, len(self.df), size))
+
+    def test_estimate_within_error(self):
+        sketch = update_hll(hll_sketch(), self.df["IMSI"])
+        exact = self.df["IMSI"].nunique()
+        self.assertLess(abs(hll_estimate(sketch) - exact) / exact, 4 * hll_error())
+
+    def test_small_cardinalities(self):
+        sketch = update_hll(hll_sketch(), [1, 2, 3, 3, None])
+        self.assertAlmostEqual(hll_estimate(sketch), 3, delta=0.1)
+        self.assertEqual(hll_estimate(hll_sketch()), 0)
+
+    def test_same_ids_in_different_dtypes(self):
+        ids = [33664000001, 33664000002]
+        a = update_hll(hll_sketch(), pd.array(ids, dtype="Int64"))
+        b = update_hll(hll_sketch(), np.array(ids, dtype=float))
+        np.testing.assert_array_equal(a["registers"], b["registers"])
+
+    def test_merge_partitions_and_serialize(self):
+        partitions = [
+            update_hll(hll_sketch(), chunk["IMSI"]) for chunk in self.chunks()
+        ]
+        merged = merge_hll(
+            *[hll_from_bytes(hll_to_bytes(sketch)) for sketch in partitions]
+        )
+        whole = update_hll(hll_sketch(), self.df["IMSI"])
+        np.testing.assert_array_equal(merged["registers"], whole["registers"])
+        with self.assertRaises(ValueError):
+            merge_hll(merged, hll_sketch(12))
+
+    def test_distinct_counts_per_group_with_exact(self):
+        counts = distinct_counts(self.chunks(), "IMSI", by="handset", exact=True)
+        self.assertEqual(set(counts.index), {"A", "B", "C"})
+        expected = self.df.groupby("Handset Type", observed=True)["IMSI"].nunique()
+        self.assertEqual(counts["exact"].to_dict(), expected.to_dict())
+        self.assertTrue((counts["relative_error"].abs() < 4 * hll_error(12)).all())
+
+        daily = distinct_counts(self.chunks(), "IMSI", by="day", exact=True)
+        self.assertEqual(len(daily), 3)
+        total = distinct_counts(self.chunks(), "IMSI", exact=True)
+        self.assertEqual(total["exact"].iloc[0], self.df["IMSI"].nunique())
+
+    def test_save_and_load_sketches(self):
+        sketches = grouped_hll(self.chunks(), "IMSI", by="handset")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "imsi_per_handset.arrow")
+            save_sketches(sketches, path)
+            loaded = load_sketches(path)
+        self.assertEqual(set(loaded), {"A", "B", "C"})
+        for label, sketch in sketches.items():
+            np.testing.assert_array_equal(
+                loaded[label]["registers"], sketch["registers"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
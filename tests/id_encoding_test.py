@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.id_encoding import (
+    encode_ids,
+    decode_ids,
+    encode_id_columns,
+    aggregate_by_codes,
+    hash_keys,
+    MISSING_CODE,
+)
+
+
+class TestIdEncoding(unittest.TestCase):
+
+    def setUp(self):
+        # Sample data for testing, with the dtypes of xdr_schema
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": pd.array(
+                    [33664, 33601, None, 33664, 33601, 33699, 33664], dtype="Int64"
+                ),
+                "IMSI": [2.1e14, 2.2e14, 2.3e14, np.nan, 2.2e14, 2.4e14, 2.1e14],
+                "Bearer Id": pd.array([1, None, 3, 4, 5, 6, 7], dtype="UInt64"),
+                "Dur. (ms)": np.array(
+                    [100, 200, 300, 400, 500, 600, 700], dtype="float32"
+                ),
+                "Avg RTT DL (ms)": np.array(
+                    [np.nan, 20, 30, 40, 50, np.nan, 70], dtype="float32"
+                ),
+                "Sessions": [1, 2, 3, 4, 5, 6, 7],
+                "Handset Type": pd.Categorical([None, "B", "C", "A", None, None, "D"]),
+            }
+        )
+
+    def test_encode_decode_round_trip(self):
+        codes, dictionary = encode_ids(self.df["MSISDN/Number"])
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertEqual(list(codes), [1, 0, MISSING_CODE, 1, 0, 2, 1])
+        self.assertEqual(list(dictionary), [33601, 33664, 33699])
+        decoded = decode_ids(codes, dictionary)
+        self.assertEqual(list(decoded[[0, 1, 3]]), [33664, 33601, 33664])
+        self.assertTrue(pd.isna(decoded[2]))
+
+    def test_encode_id_columns(self):
+        encodings = encode_id_columns(self.df)
+        self.assertEqual(set(encodings), {"MSISDN/Number", "IMSI"})
+        codes, dictionary = encodings["IMSI"]
+        self.assertEqual(codes[3], MISSING_CODE)
+        self.assertEqual(len(dictionary), 4)
+
+    def test_aggregate_by_codes_matches_groupby(self):
+        spec = {
+            "sessions": ("Bearer Id", "count"),
+            "total_duration": ("Dur. (ms)", "sum"),
+            "avg_rtt": ("Avg RTT DL (ms)", "mean"),
+            "total_sessions": ("Sessions", "sum"),
+            "handset_type": ("Handset Type", "first"),
+        }
+        for key in ("MSISDN/Number", "IMSI"):
+            expected = self.df.groupby(key).agg(**spec).reset_index()
+            pd.testing.assert_frame_equal(
+                aggregate_by_codes(self.df, key, spec), expected
+            )
+
+    def test_reuses_encoding(self):
+        encoding = encode_ids(self.df["MSISDN/Number"])
+        spec = {"total_duration": ("Dur. (ms)", "sum")}
+        pd.testing.assert_frame_equal(
+            aggregate_by_codes(self.df, "MSISDN/Number", spec, encoding=encoding),
+            self.df.groupby("MSISDN/Number").agg(**spec).reset_index(),
+        )
+
+    def test_large_integer_sums_are_exact(self):
+        df = pd.DataFrame({"key": [1, 1, 2], "value": [2**62, 3, -5]})
+        result = aggregate_by_codes(df, "key", {"total": ("value", "sum")})
+        self.assertEqual(result["total"].tolist(), [2**62 + 3, -5])
+
+    def test_hash_keys_ignores_numeric_dtype(self):
+        ids = [33664962239.0, 33681854413.0]
+        np.testing.assert_array_equal(
+            hash_keys(pd.Series(ids)), hash_keys(pd.Series(ids, dtype="Int64"))
+        )
+        np.testing.assert_array_equal(
+            hash_keys(pd.Index(ids)), hash_keys(pd.Series(ids))
+        )
+
+    def test_unsupported_function(self):
+        with self.assertRaises(ValueError):
+            aggregate_by_codes(
+                self.df, "MSISDN/Number", {"max_duration": ("Dur. (ms)", "max")}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from scripts.index_advisor import (
+    MANAGED_INDEXES,
+    apply_indexes,
+    plan_outline,
+    explain_query,
+    explain_queries,
+    format_report,
+    run_index_report,
+)
+
+PLAN = {
+    "Plan": {
+        "Node Type": "Limit",
+        "Shared Hit Blocks": 10,
+        "Shared Read Blocks": 90,
+        "Plans": [
+            {
+                "Node Type": "Sort",
+                "Plans": [
+                    {
+                        "Node Type": "Index Only Scan",
+                        "Index Name": "xdr_data_imsi_btree",
+                    }
+                ],
+            }
+        ],
+    },
+    "Planning Time": 0.5,
+    "Execution Time": 12.0,
+}
+
+
+class TestIndexAdvisor(unittest.TestCase):
+
+    def mock_cursor(self, mock_get_connection):
+        mock_connection = mock_get_connection.return_value.__enter__.return_value
+        return (
+            mock_connection,
+            mock_connection.cursor.return_value.__enter__.return_value,
+        )
+
+    def test_plan_outline(self):
+        self.assertEqual(
+            plan_outline(PLAN["Plan"]),
+            "Limit > Sort > Index Only Scan (xdr_data_imsi_btree)",
+        )
+        join = {
+            "Node Type": "Hash Join",
+            "Plans": [{"Node Type": "Seq Scan"}, {"Node Type": "Hash"}],
+        }
+        self.assertEqual(plan_outline(join), "Hash Join > [Seq Scan, Hash]")
+
+    @patch("scripts.index_advisor.get_connection")
+    def test_apply_indexes_skips_brin_on_text_start(self, mock_get_connection):
+        mock_connection, mock_cursor = self.mock_cursor(mock_get_connection)
+        mock_cursor.fetchall.return_value = [
+            ("Start", "text"),
+            ("IMSI", "double precision"),
+            ("MSISDN/Number", "double precision"),
+            ("Handset Manufacturer", "text"),
+            ("Handset Type", "text"),
+            ("Last Location Name", "text"),
+        ]
+
+        applied = dict(apply_indexes())
+
+        self.assertEqual(applied["xdr_data_start_brin"], "skipped: column type is text")
+        self.assertEqual(
+            sum(status == "created" for status in applied.values()),
+            len(MANAGED_INDEXES) - 1,
+        )
+        statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertFalse(any("USING brin" in statement for statement in statements))
+        self.assertTrue(
+            any(statement.startswith("CREATE STATISTICS") for statement in statements)
+        )
+        self.assertEqual(statements[-1], "ANALYZE xdr_data")
+        mock_connection.commit.assert_called_once()
+
+    def test_explain_query(self):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchone.return_value = ([PLAN],)
+
+        result = explain_query("SELECT 1;\n", mock_connection)
+
+        mock_cursor.execute.assert_called_once_with(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT 1"
+        )
+        mock_connection.rollback.assert_called_once()
+        self.assertEqual(result["execution_ms"], 12.0)
+        self.assertEqual(result["shared_read_blocks"], 90)
+        self.assertEqual(
+            result["outline"], "Limit > Sort > Index Only Scan (xdr_data_imsi_btree)"
+        )
+
+    @patch("scripts.index_advisor.explain_query")
+    @patch("scripts.index_advisor.get_connection")
+    def test_explain_queries_reports_first_and_warm_runs(
+        self, mock_get_connection, mock_explain
+    ):
+        mock_explain.side_effect = [
+            {
+                "execution_ms": ms,
+                "shared_read_blocks": blocks,
+                "outline": "Seq Scan",
+                "plan": PLAN,
+            }
+            for ms, blocks in [(50.0, 90), (12.0, 0), (10.0, 0), (11.0, 0)]
+        ]
+
+        result = explain_queries({"q": "SELECT 1"}, runs=4)["q"]
+
+        self.assertEqual(mock_explain.call_count, 4)
+        self.assertEqual(result["first_ms"], 50.0)
+        self.assertEqual(result["warm_ms"], 11.0)
+        self.assertEqual(result["shared_read_blocks"], 90)
+        self.assertEqual(result["warm_read_blocks"], 0)
+        with self.assertRaises(ValueError):
+            explain_queries({"q": "SELECT 1"}, runs=0)
+
+    def test_format_report(self):
+        before = {
+            "q": {
+                "first_ms": 60.0,
+                "warm_ms": 30.0,
+                "shared_read_blocks": 90,
+                "outline": "Seq Scan",
+            }
+        }
+        after = {
+            "q": {
+                "first_ms": 15.0,
+                "warm_ms": 10.0,
+                "shared_read_blocks": 5,
+                "outline": "Index Scan",
+            }
+        }
+
+        report = format_report(before, after, [("xdr_data_imsi_btree", "created")])
+
+        self.assertIn("- `xdr_data_imsi_btree`: created", report)
+        self.assertIn("| q | 60.0 | 15.0 | 30.0 | 10.0 | 3.00x | 90 | 5 |", report)
+
+    @patch("scripts.index_advisor.apply_indexes")
+    @patch("scripts.index_advisor.drop_indexes")
+    @patch("scripts.index_advisor.explain_queries")
+    def test_run_index_report(self, mock_explain, mock_drop, mock_apply):
+        result = {
+            "first_ms": 1.0,
+            "warm_ms": 1.0,
+            "shared_read_blocks": 0,
+            "outline": "Seq Scan",
+            "plan": PLAN,
+        }
+        mock_explain.return_value = {"q": result}
+        mock_apply.return_value = []
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            report_path = run_index_report(
+                output_dir=output_dir,
+                queries={"q": "SELECT 1"},
+                runs=2,
+                confirm_throwaway=True,
+            )
+            self.assertTrue(os.path.exists(report_path))
+            with open(os.path.join(output_dir, "index_plans.json")) as f:
+                self.assertEqual(json.load(f)["q"]["after"], PLAN)
+
+        mock_drop.assert_called_once()
+        self.assertEqual(
+            [call.args for call in mock_explain.call_args_list],
+            [({"q": "SELECT 1"}, 2)] * 2,
+        )
+
+    @patch("scripts.index_advisor.apply_indexes")
+    @patch("scripts.index_advisor.drop_indexes")
+    @patch("scripts.index_advisor.explain_queries")
+    def test_run_index_report_requires_confirmation(
+        self, mock_explain, mock_drop, mock_apply
+    ):
+        with self.assertRaises(ValueError):
+            run_index_report(
+                output_dir=tempfile.gettempdir(), queries={"q": "SELECT 1"}
+            )
+        mock_drop.assert_not_called()
+        mock_apply.assert_not_called()
+        mock_explain.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
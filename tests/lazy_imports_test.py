@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from collections import OrderedDict
+from unittest.mock import patch
+from scripts.lazy_imports import lazy_module, lazy_object
+
+SCRIPTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"
+)
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_lazy_module_loads_on_first_access(self):
+        module = lazy_module("json")
+        self.assertIsNone(module._module)
+        self.assertEqual(module.dumps([1]), json.dumps([1]))
+        self.assertIs(module._module, json)
+
+    def test_lazy_object_is_callable(self):
+        factory = lazy_object("collections", "OrderedDict")
+        self.assertIsInstance(factory(a=1), OrderedDict)
+        self.assertEqual(factory.__name__, "OrderedDict")
+
+    def test_attributes_can_be_patched(self):
+        module = lazy_module("json")
+        with patch.object(module, "dumps", return_value="patched"):
+            self.assertEqual(module.dumps([1]), "patched")
+        self.assertEqual(module.dumps([1]), "[1]")
+
+    def test_analysis_modules_do_not_import_plotting_or_sklearn(self):
+        code = (
+            "import sys; import new_engagement_analysis, expriance_analytics, "
+            "satisfaction_analysis, eda; "
+            "print(sorted(m for m in ('matplotlib.pyplot', 'seaborn', 'sklearn') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env={"PYTHONPATH": SCRIPTS_DIR},
+        )
+        self.assertEqual(result.stdout.strip(), "[]", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
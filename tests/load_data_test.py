@@ -1,7 +1,15 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
-from scripts.load_data import load_data_from_postgres
+from scripts.load_data import (
+    load_data_from_postgres,
+    stream_data_from_postgres,
+    load_xdr_data,
+    read_sql_via_copy,
+    partition_conditions,
+    load_data_in_parallel,
+    concat_partitions
+)
 
 class TestLoadData(unittest.TestCase):
 
@@ -27,5 +35,164 @@ class TestLoadData(unittest.TestCase):
         # Verify the SQL query was executed
         mock_read_sql_query.assert_called_once_with(query, mock_engine)
 
+    @patch('scripts.load_data.get_connection')
+    def test_stream_data_from_postgres(self, mock_get_connection):
+        # Mock a pooled connection whose server-side cursor returns two chunks
+        mock_connection = MagicMock()
+        mock_get_connection.return_value.__enter__.return_value = mock_connection
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchmany.side_effect = [[(1, 3), (2, 4)], [(5, 6)], []]
+        mock_cursor.description = [('col1',), ('col2',)]
+
+        query = "SELECT * FROM xdr_data"
+        chunks = list(stream_data_from_postgres(query, chunksize=2))
+
+        # Verify the chunks
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(list(chunks[0].columns), ['col1', 'col2'])
+        self.assertEqual(len(chunks[0]), 2)
+        self.assertEqual(len(chunks[1]), 1)
+
+        # Verify a named cursor was used and the connection was returned to the pool
+        mock_connection.cursor.assert_called_once()
+        self.assertTrue(mock_connection.cursor.call_args[1]['name'].startswith("xdr_stream_"))
+        mock_cursor.execute.assert_called_once_with(query)
+        mock_get_connection.return_value.__exit__.assert_called_once()
+
+        # Every stream gets its own cursor name
+        mock_cursor.fetchmany.side_effect = [[]]
+        list(stream_data_from_postgres(query, chunksize=2))
+        names = [call[1]['name'] for call in mock_connection.cursor.call_args_list]
+        self.assertNotEqual(names[0], names[1])
+
+    @patch('scripts.load_data.get_connection')
+    def test_stream_data_from_postgres_raises_mid_stream(self, mock_get_connection):
+        # A failure after the first chunk must not look like the end of the stream
+        mock_connection = MagicMock()
+        mock_get_connection.return_value.__enter__.return_value = mock_connection
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchmany.side_effect = [[(1, 3), (2, 4)], RuntimeError("connection lost")]
+        mock_cursor.description = [('col1',), ('col2',)]
+
+        stream = stream_data_from_postgres("SELECT * FROM xdr_data", chunksize=2)
+        self.assertEqual(len(next(stream)), 2)
+        with self.assertRaises(RuntimeError):
+            next(stream)
+
+    @patch('scripts.load_data.load_data_from_postgres')
+    def test_load_xdr_data(self, mock_load_data_from_postgres):
+        # Mock the raw query result
+        mock_load_data_from_postgres.return_value = pd.DataFrame({
+            'MSISDN/Number': [33664962239.0, None],
+            'Handset Type': ['Samsung Galaxy A5', 'Samsung Galaxy A5'],
+            'Avg RTT DL (ms)': [42.0, 65.0]
+        })
+
+        df = load_xdr_data(['MSISDN/Number', 'Handset Type', 'Avg RTT DL (ms)'])
+
+        # Verify only the requested columns were fetched and cast on ingest
+        mock_load_data_from_postgres.assert_called_once_with(
+            'SELECT "MSISDN/Number", "Handset Type", "Avg RTT DL (ms)" FROM xdr_data', method="read_sql"
+        )
+        self.assertEqual(str(df['MSISDN/Number'].dtype), 'Int64')
+        self.assertEqual(str(df['Handset Type'].dtype), 'category')
+        self.assertEqual(str(df['Avg RTT DL (ms)'].dtype), 'float32')
+
+    def test_read_sql_via_copy(self):
+        # Mock a cursor whose COPY writes a CSV payload
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.description = [('IMSI', 701), ('Start', 1114), ('Handset Type', 25)]
+        mock_cursor.copy_expert.side_effect = lambda sql, buffer: buffer.write(
+            b'208201448079117,2019-04-04 12:01:00,Samsung Galaxy A5\n,2019-04-09 13:04:00,NA\n'
+        )
+
+        df = read_sql_via_copy("SELECT * FROM xdr_data;", mock_connection)
+
+        # Verify the COPY statement and the parsed columns
+        mock_cursor.copy_expert.assert_called_once()
+        self.assertEqual(mock_cursor.copy_expert.call_args[0][0],
+                         "COPY (SELECT * FROM xdr_data) TO STDOUT WITH (FORMAT csv)")
+        self.assertEqual(list(df.columns), ['IMSI', 'Start', 'Handset Type'])
+        self.assertEqual(df['IMSI'].iloc[0], 208201448079117)
+        self.assertTrue(pd.isna(df['IMSI'].iloc[1]))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['Start']))
+        self.assertEqual(df['Handset Type'].iloc[1], 'NA')
+
+    @patch('scripts.load_data.read_sql_via_copy')
+    @patch('scripts.load_data.get_connection')
+    def test_load_data_from_postgres_copy(self, mock_get_connection, mock_read_sql_via_copy):
+        mock_read_sql_via_copy.return_value = pd.DataFrame({'col1': [1, 2]})
+        mock_connection = mock_get_connection.return_value.__enter__.return_value
+
+        df = load_data_from_postgres("SELECT * FROM xdr_data", method="copy")
+
+        self.assertEqual(len(df), 2)
+        mock_read_sql_via_copy.assert_called_once_with("SELECT * FROM xdr_data", mock_connection, None)
+        with self.assertRaises(ValueError):
+            load_data_from_postgres("SELECT * FROM xdr_data", method="unknown")
+
+    @patch('scripts.load_data.cached_query')
+    @patch('scripts.load_data.pd.read_sql_query')
+    @patch('scripts.load_data.get_connection')
+    def test_load_data_from_postgres_cached(self, mock_get_connection, mock_read_sql_query, mock_cached_query):
+        mock_cached_query.side_effect = lambda query, loader, params, namespace: loader()
+        mock_read_sql_query.return_value = pd.DataFrame({'col1': [1, 2]})
+        mock_connection = mock_get_connection.return_value.__enter__.return_value
+
+        df = load_data_from_postgres("SELECT * FROM xdr_data WHERE col1 > %(low)s", params={"low": 0}, cache=True)
+
+        self.assertEqual(len(df), 2)
+        mock_cached_query.assert_called_once()
+        self.assertEqual(mock_cached_query.call_args[1]['namespace'], 'postgres:read_sql')
+        # The loader handed to the cache runs the uncached load with the same parameters
+        mock_read_sql_query.assert_called_once_with(
+            "SELECT * FROM xdr_data WHERE col1 > %(low)s", mock_connection, params={"low": 0}
+        )
+
+    def test_partition_conditions_hash(self):
+        conditions = partition_conditions("SELECT * FROM xdr_data", 3)
+        self.assertEqual(len(conditions), 3)
+        self.assertIn('"MSISDN/Number" IS NULL', conditions[0])
+        self.assertTrue(conditions[2].endswith("= 2"))
+
+    @patch('scripts.load_data.load_data_from_postgres')
+    def test_partition_conditions_range(self, mock_load_data_from_postgres):
+        mock_load_data_from_postgres.return_value = pd.DataFrame({'low': [0.0], 'high': [100.0]})
+
+        conditions = partition_conditions("SELECT * FROM xdr_data", 4, 'Bearer Id', strategy='range')
+
+        self.assertEqual(conditions[1], '"Bearer Id" >= 25.0 AND "Bearer Id" < 50.0')
+        self.assertEqual(conditions[3], '"Bearer Id" >= 75.0 AND "Bearer Id" <= 100.0')
+        with self.assertRaises(ValueError):
+            partition_conditions("SELECT * FROM xdr_data", 4, strategy='unknown')
+
+    @patch('scripts.load_data.load_data_from_postgres')
+    def test_load_data_in_parallel(self, mock_load_data_from_postgres):
+        # Each partition query returns one row
+        mock_load_data_from_postgres.side_effect = lambda query, method: pd.DataFrame({'query': [query]})
+
+        df, timings = load_data_in_parallel("SELECT * FROM xdr_data;", n_partitions=4)
+
+        self.assertEqual(mock_load_data_from_postgres.call_count, 4)
+        self.assertEqual(len(df), 4)
+        self.assertTrue(all(query.startswith("SELECT * FROM (SELECT * FROM xdr_data) AS partition_source WHERE")
+                            for query in df['query']))
+        self.assertEqual(list(timings['rows']), [1, 1, 1, 1])
+        self.assertIn('seconds', timings.columns)
+
+    def test_concat_partitions(self):
+        frames = [
+            pd.DataFrame({'id': [1, 2], 'dl': [1.5, None], 'handset': ['a', 'b']}),
+            pd.DataFrame({'id': [3], 'dl': [2.5], 'handset': [None]}),
+            pd.DataFrame({'id': [4.5], 'dl': [None], 'handset': ['c']}),
+        ]
+        expected = pd.concat(frames, ignore_index=True)
+
+        df = concat_partitions(frames)
+
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(frames, [])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import scripts.out_of_core as out_of_core
+from scripts.new_engagement_analysis import aggregate_metrics, ENGAGEMENT_METRICS
+from scripts.users_overview import aggregate_user_data, USER_METRICS
+from scripts.expriance_analytics import aggregate_per_customer, EXPERIENCE_METRICS
+from scripts.satisfaction_analysis import CUSTOMER_METRICS
+from scripts.xdr_schema import APPLICATION_COLUMNS
+
+
+class TestOutOfCore(unittest.TestCase):
+
+    def setUp(self):
+        # Sample sessions streamed in chunks whose handset categories differ, as
+        # read_sql chunks do
+        rng = np.random.default_rng(11)
+        n = 6000
+        columns = {
+            "MSISDN/Number": rng.integers(0, 700, n).astype(float),
+            "Bearer Id": np.arange(n, dtype=float),
+            "Dur. (ms)": rng.integers(1, 10**6, n).astype(float),
+            "Total DL (Bytes)": rng.random(n) * 1e9,
+            "Total UL (Bytes)": rng.random(n) * 1e8,
+            "TCP DL Retrans. Vol (Bytes)": rng.random(n) * 1e6,
+            "Avg RTT DL (ms)": rng.random(n) * 100,
+            "Avg Bearer TP DL (kbps)": rng.random(n) * 1e4,
+        }
+        for column in APPLICATION_COLUMNS:
+            columns[column] = rng.random(n) * 1e7
+        self.chunks = []
+        for start in range(0, n, 1000):
+            chunk = pd.DataFrame(
+                {
+                    column: values[start : start + 1000]
+                    for column, values in columns.items()
+                },
+                index=range(start, min(start + 1000, n)),
+            )
+            chunk["Handset Type"] = pd.Categorical(
+                rng.choice([None, f"H{start}", "Apple iPhone 7"], len(chunk))
+            )
+            chunk.loc[chunk.index[::37], "MSISDN/Number"] = np.nan
+            chunk.loc[chunk.index[::13], "Avg RTT DL (ms)"] = np.nan
+            self.chunks.append(chunk)
+        self.df = pd.concat(self.chunks)
+        self.spill_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_dir)
+
+    def spilled(self, spec):
+        # A budget of one byte spills every chunk; spill_table is wrapped to count the
+        # writes
+        with mock.patch.object(
+            out_of_core, "spill_table", wraps=out_of_core.spill_table
+        ) as spill:
+            result = out_of_core.aggregate_out_of_core(
+                iter(self.chunks),
+                spec,
+                memory_bytes=1,
+                n_partitions=8,
+                spill_dir=self.spill_dir,
+            )
+        self.assertGreater(spill.call_count, len(self.chunks))
+        self.assertEqual(os.listdir(self.spill_dir), [])
+        return result
+
+    def test_spilled_aggregation_matches_in_memory(self):
+        for spec, aggregate in [
+            (ENGAGEMENT_METRICS, aggregate_metrics),
+            (USER_METRICS, aggregate_user_data),
+            (EXPERIENCE_METRICS, aggregate_per_customer),
+        ]:
+            result = self.spilled(spec)
+            if "total_download_data" in spec:
+                result["total_data_volume"] = (
+                    result["total_download_data"] + result["total_upload_data"]
+                )
+            pd.testing.assert_frame_equal(result, aggregate(self.df), check_exact=True)
+
+    def test_matches_groupby(self):
+        # pandas groupby sums with compensated summation, so the last bits can differ
+        expected = (
+            self.df.groupby("MSISDN/Number").agg(**CUSTOMER_METRICS).reset_index()
+        )
+        pd.testing.assert_frame_equal(self.spilled(CUSTOMER_METRICS), expected)
+
+    def test_spill_starting_with_missing_values(self):
+        # The first spill holds only missing handsets, so Arrow alone would type the
+        # column as null
+        self.chunks = [
+            pd.DataFrame(
+                {"MSISDN/Number": np.arange(100.0), "Handset Type": [None] * 100}
+            ),
+            pd.DataFrame(
+                {"MSISDN/Number": np.arange(100.0), "Handset Type": ["a"] * 100}
+            ),
+        ]
+        result = self.spilled({"handset_type": ("Handset Type", "first")})
+        self.assertEqual(list(result["MSISDN/Number"]), list(np.arange(100.0)))
+        self.assertEqual(list(result["handset_type"]), ["a"] * 100)
+
+    def test_backend_without_spill(self):
+        # The default budget holds the sample, so nothing is written
+        with mock.patch.object(out_of_core, "spill_table") as spill:
+            result = out_of_core.aggregate_out_of_core(
+                iter(self.chunks), ENGAGEMENT_METRICS
+            )
+        spill.assert_not_called()
+        pd.testing.assert_frame_equal(
+            result,
+            self.df.groupby("MSISDN/Number").agg(**ENGAGEMENT_METRICS).reset_index(),
+        )
+        pd.testing.assert_frame_equal(
+            aggregate_metrics(iter(self.chunks), backend="out_of_core"),
+            aggregate_metrics(self.df),
+        )
+
+    def test_empty_stream(self):
+        result = out_of_core.aggregate_out_of_core([], ENGAGEMENT_METRICS)
+        self.assertEqual(
+            list(result.columns), ["MSISDN/Number"] + list(ENGAGEMENT_METRICS)
+        )
+        self.assertTrue(result.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
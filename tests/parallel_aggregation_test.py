@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.parallel_aggregation import aggregate_in_parallel
+from scripts.new_engagement_analysis import (
+    aggregate_metrics,
+    top_10_users_per_application,
+)
+from scripts.users_overview import aggregate_user_data
+from scripts.expriance_analytics import aggregate_per_customer, EXPERIENCE_METRICS
+from scripts.satisfaction_analysis import (
+    aggregate_per_customer as aggregate_satisfaction,
+)
+from scripts.xdr_schema import APPLICATION_COLUMNS
+
+
+class TestParallelAggregation(unittest.TestCase):
+
+    def setUp(self):
+        # Sample sessions with the dtypes of xdr_schema reads: missing MSISDNs, a
+        # categorical handset
+        rng = np.random.default_rng(3)
+        n = 5000
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": rng.integers(0, 600, n).astype(float),
+                "Bearer Id": np.arange(n, dtype=float),
+                "Dur. (ms)": rng.integers(1, 10**6, n).astype(float),
+                "Total DL (Bytes)": rng.random(n) * 1e9,
+                "Total UL (Bytes)": rng.random(n) * 1e8,
+                "TCP DL Retrans. Vol (Bytes)": rng.random(n) * 1e6,
+                "Avg RTT DL (ms)": rng.random(n) * 100,
+                "Avg Bearer TP DL (kbps)": rng.random(n) * 1e4,
+                "Handset Type": pd.Categorical(
+                    rng.choice(["Apple iPhone 7", "Samsung Galaxy S8", None], n)
+                ),
+            }
+        )
+        for column in APPLICATION_COLUMNS:
+            self.df[column] = rng.random(n) * 1e7
+        self.df.loc[::41, "MSISDN/Number"] = np.nan
+        self.df.loc[::17, "Avg RTT DL (ms)"] = np.nan
+        self.shard_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.shard_dir)
+
+    def test_matches_single_process(self):
+        for aggregate in [
+            aggregate_metrics,
+            aggregate_user_data,
+            aggregate_per_customer,
+            aggregate_satisfaction,
+        ]:
+            pd.testing.assert_frame_equal(
+                aggregate(self.df, backend="parallel"),
+                aggregate(self.df),
+                check_exact=True,
+            )
+
+    def test_worker_counts(self):
+        expected = aggregate_in_parallel(self.df, EXPERIENCE_METRICS, n_workers=1)
+        for n_workers in [2, 3]:
+            result = aggregate_in_parallel(
+                self.df,
+                EXPERIENCE_METRICS,
+                n_workers=n_workers,
+                shard_dir=self.shard_dir,
+            )
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        self.assertEqual(os.listdir(self.shard_dir), [])
+        with self.assertRaises(ValueError):
+            aggregate_in_parallel(self.df, EXPERIENCE_METRICS, n_workers=-1)
+
+    def test_nullable_and_object_columns(self):
+        df = self.df.astype({"MSISDN/Number": "Int64", "Handset Type": object})
+        expected = aggregate_in_parallel(df, EXPERIENCE_METRICS, n_workers=1)
+        result = aggregate_in_parallel(
+            df, EXPERIENCE_METRICS, n_workers=2, shard_dir=self.shard_dir
+        )
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+    def test_top_10_users_per_application(self):
+        result = top_10_users_per_application(self.df, backend="parallel")
+        expected = top_10_users_per_application(self.df)
+        for application, table in expected.items():
+            pd.testing.assert_frame_equal(result[application], table, check_exact=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
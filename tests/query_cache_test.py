@@ -0,0 +1,181 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+from scripts.snapshot_cache import UNTRACKED
+from scripts.query_cache import (
+    cache_key,
+    cached_query,
+    cache_stats,
+    clear_query_cache,
+    tables_read,
+    version_tracking_sql,
+)
+
+QUERY = 'SELECT "Handset Type", COUNT(*) FROM xdr_data GROUP BY "Handset Type"'
+SUMMARY_QUERY = 'SELECT "MSISDN/Number", total_dl FROM subscriber_summary'
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        clear_query_cache(self.cache_dir)
+        self.df = pd.DataFrame(
+            {
+                "Handset Type": ["Apple iPhone 6S", "Huawei B528S-23A"],
+                "count": [9419, 19752],
+            }
+        )
+        patcher = patch(
+            "scripts.query_cache.table_version",
+            return_value='[["subscriber_summary", 1], ["xdr_data", 7]]',
+        )
+        self.mock_table_version = patcher.start()
+        self.addCleanup(patcher.stop)
+        interval_patcher = patch("scripts.query_cache.QUERY_CACHE_VERSION_INTERVAL", 0)
+        interval_patcher.start()
+        self.addCleanup(interval_patcher.stop)
+
+    def tearDown(self):
+        clear_query_cache(self.cache_dir)
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_key(self):
+        self.assertEqual(
+            cache_key(QUERY + ";"), cache_key("  " + QUERY.replace(" ", "\n  "))
+        )
+        self.assertNotEqual(
+            cache_key(QUERY, {"limit": 5}), cache_key(QUERY, {"limit": 10})
+        )
+        self.assertNotEqual(
+            cache_key(QUERY, namespace="a"), cache_key(QUERY, namespace="b")
+        )
+
+    def test_memory_hit_returns_copy(self):
+        loader = MagicMock(return_value=self.df)
+
+        first = cached_query(QUERY, loader, cache_dir=self.cache_dir)
+        first.loc[0, "count"] = 0
+        second = cached_query(QUERY, loader, cache_dir=self.cache_dir)
+
+        loader.assert_called_once()
+        pd.testing.assert_frame_equal(second, self.df)
+        stats = cache_stats()
+        self.assertEqual(
+            (stats["hits"], stats["memory_hits"], stats["misses"]), (1, 1, 1)
+        )
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_disk_hit_after_memory_is_cleared(self):
+        loader = MagicMock(return_value=self.df)
+
+        cached_query(QUERY, loader, cache_dir=self.cache_dir)
+        clear_query_cache(self.cache_dir, disk=False)
+        df = cached_query(QUERY, loader, cache_dir=self.cache_dir)
+
+        loader.assert_called_once()
+        pd.testing.assert_frame_equal(df, self.df)
+        self.assertEqual(cache_stats()["disk_hits"], 1)
+
+    def test_invalidated_when_table_version_changes(self):
+        loader = MagicMock(return_value=self.df)
+
+        cached_query(QUERY, loader, cache_dir=self.cache_dir)
+        self.mock_table_version.return_value = (
+            '[["subscriber_summary", 1], ["xdr_data", 8]]'
+        )
+        cached_query(QUERY, loader, cache_dir=self.cache_dir)
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(cache_stats()["invalidations"], 1)
+
+    def test_only_tables_read_invalidate(self):
+        loader = MagicMock(return_value=self.df)
+
+        cached_query(SUMMARY_QUERY, loader, cache_dir=self.cache_dir)
+        # New sessions alone leave the summary projection cached; refreshing the summary
+        # does not
+        self.mock_table_version.return_value = (
+            '[["subscriber_summary", 1], ["xdr_data", 8]]'
+        )
+        cached_query(SUMMARY_QUERY, loader, cache_dir=self.cache_dir)
+        self.assertEqual(loader.call_count, 1)
+        self.mock_table_version.return_value = (
+            '[["subscriber_summary", 2], ["xdr_data", 8]]'
+        )
+        cached_query(SUMMARY_QUERY, loader, cache_dir=self.cache_dir)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_tables_read(self):
+        versions = {"subscriber_summary": 1, "xdr_data": 7}
+        self.assertEqual(tables_read(QUERY, versions), ["xdr_data"])
+        self.assertEqual(
+            tables_read('SELECT * FROM "subscriber_summary"', versions),
+            ["subscriber_summary"],
+        )
+        self.assertEqual(
+            tables_read("SELECT * FROM xdr_data_staging", versions),
+            ["subscriber_summary", "xdr_data"],
+        )
+
+    def test_version_tracking_sql(self):
+        statements = version_tracking_sql("subscriber_summary")
+        self.assertIn("CREATE TABLE IF NOT EXISTS xdr_table_versions", statements[0])
+        self.assertIn("version = versions.version + 1", statements[1])
+        self.assertIn(
+            "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON subscriber_summary",
+            statements[-1],
+        )
+        self.assertIn("FOR EACH STATEMENT", statements[-1])
+
+    def test_expired_by_ttl(self):
+        loader = MagicMock(return_value=self.df)
+
+        cached_query(QUERY, loader, cache_dir=self.cache_dir, ttl=0)
+        cached_query(QUERY, loader, cache_dir=self.cache_dir, ttl=0)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_memory_lru_eviction(self):
+        size = int(self.df.memory_usage(deep=True).sum())
+        loader = MagicMock(return_value=self.df)
+
+        for limit in (1, 2, 1):
+            cached_query(
+                QUERY,
+                loader,
+                params={"limit": limit},
+                cache_dir=self.cache_dir,
+                memory_bytes=size,
+            )
+
+        stats = cache_stats()
+        self.assertEqual(stats["memory_entries"], 1)
+        self.assertEqual(stats["evictions"], 2)
+        # The evicted result is still served by the on-disk tier
+        self.assertEqual(stats["disk_hits"], 1)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_failed_load_not_cached(self):
+        loader = MagicMock(return_value=None)
+
+        self.assertIsNone(cached_query(QUERY, loader, cache_dir=self.cache_dir))
+        self.assertIsNone(cached_query(QUERY, loader, cache_dir=self.cache_dir))
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_untracked_expires_by_ttl_only(self):
+        self.mock_table_version.return_value = UNTRACKED
+        loader = MagicMock(return_value=self.df)
+
+        cached_query(QUERY, loader, cache_dir=self.cache_dir)
+        cached_query(QUERY, loader, cache_dir=self.cache_dir)
+        cached_query(QUERY, loader, cache_dir=self.cache_dir, ttl=0)
+
+        self.assertEqual(loader.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
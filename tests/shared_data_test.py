@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+from scripts.shared_data import (
+    get_xdr_data,
+    get_derived,
+    refresh_xdr_data,
+    start_background_refresh,
+    stop_background_refresh,
+    data_layer_stats,
+    reset_data_layer,
+)
+
+
+class TestSharedData(unittest.TestCase):
+
+    def setUp(self):
+        reset_data_layer()
+        self.df = pd.DataFrame(
+            {"MSISDN/Number": [1, 1, 2], "Dur. (ms)": [10.0, 20.0, 30.0]}
+        )
+        patcher = patch(
+            "scripts.shared_data.table_version", return_value="[[16384, 3, 0, 0]]"
+        )
+        self.mock_table_version = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset_data_layer)
+
+    def slow_loader(self):
+        time.sleep(0.05)
+        return self.df
+
+    def test_loaded_once_across_sessions(self):
+        loader = MagicMock(side_effect=self.slow_loader)
+
+        frames = []
+        threads = [
+            threading.Thread(target=lambda: frames.append(get_xdr_data(loader)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        loader.assert_called_once()
+        self.assertTrue(all(df is self.df for df in frames))
+        self.assertEqual(data_layer_stats()["loads"], 1)
+
+    def test_derived_memoized(self):
+        builder = MagicMock(
+            side_effect=lambda df: df.groupby("MSISDN/Number")["Dur. (ms)"].sum()
+        )
+
+        first = get_derived("durations", builder, loader=lambda: self.df)
+        second = get_derived("durations", builder, loader=lambda: self.df)
+
+        builder.assert_called_once()
+        self.assertIs(first, second)
+        self.assertEqual(list(first), [30.0, 30.0])
+
+    def test_derived_without_data(self):
+        builder = MagicMock()
+
+        self.assertIsNone(get_derived("durations", builder, loader=lambda: None))
+
+        builder.assert_not_called()
+
+    def test_build_locks_released(self):
+        for i in range(50):
+            get_derived(f"table_order:{i}", lambda df: len(df), loader=lambda: self.df)
+
+        self.assertEqual(data_layer_stats()["build_locks"], 0)
+
+    def test_refresh_swaps_data_and_rebuilds_derived(self):
+        builder = MagicMock(side_effect=lambda df: len(df))
+        get_derived("rows", builder, loader=lambda: self.df)
+
+        # Unchanged version: nothing is reloaded
+        self.assertFalse(refresh_xdr_data(loader=lambda: self.df.head(1)))
+
+        self.mock_table_version.return_value = "[[16384, 4, 0, 0]]"
+        self.assertTrue(refresh_xdr_data(loader=lambda: self.df.head(1)))
+
+        self.assertEqual(len(get_xdr_data()), 1)
+        self.assertEqual(get_derived("rows", builder), 1)
+        self.assertEqual(builder.call_count, 2)
+        self.assertEqual(data_layer_stats()["generation"], 2)
+
+    def test_lru_eviction_under_budget(self):
+        table = pd.DataFrame({"x": range(100)})
+        size = int(table.memory_usage(deep=True).sum())
+        builder = MagicMock(side_effect=lambda df: table.copy())
+
+        for name in ("a", "b", "a", "c"):
+            get_derived(name, builder, loader=lambda: self.df, max_bytes=2 * size)
+
+        stats = data_layer_stats()
+        self.assertEqual(stats["derived_entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        # 'b' was the least recently used entry, so 'a' is still cached
+        get_derived("a", builder, loader=lambda: self.df, max_bytes=2 * size)
+        self.assertEqual(builder.call_count, 3)
+
+    def test_background_refresh(self):
+        get_xdr_data(lambda: self.df)
+        self.mock_table_version.return_value = "[[16384, 4, 0, 0]]"
+        new_df = self.df.head(2)
+
+        start_background_refresh(interval=0.01, loader=lambda: new_df)
+        start_background_refresh(interval=0.01, loader=lambda: new_df)
+        deadline = time.time() + 2
+        while get_xdr_data() is not new_df and time.time() < deadline:
+            time.sleep(0.01)
+        stop_background_refresh()
+
+        self.assertIs(get_xdr_data(), new_df)
+        self.assertEqual(data_layer_stats()["refreshes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
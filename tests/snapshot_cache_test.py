@@ -0,0 +1,178 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+from scripts.snapshot_cache import (
+    UNTRACKED,
+    snapshot_key,
+    load_with_snapshot,
+    evict_snapshots,
+    table_version,
+)
+
+
+class TestSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": pd.array([33664962239, None], dtype="Int64"),
+                "Handset Type": pd.Categorical(["Samsung Galaxy A5", "Apple iPhone 6"]),
+                "Avg RTT DL (ms)": pd.array([42.0, 65.0], dtype="float32"),
+            }
+        )
+
+    def test_snapshot_key_ignores_whitespace(self):
+        self.assertEqual(
+            snapshot_key("SELECT *  FROM xdr_data;"),
+            snapshot_key("SELECT * FROM xdr_data"),
+        )
+        self.assertNotEqual(
+            snapshot_key("SELECT * FROM xdr_data", "a"),
+            snapshot_key("SELECT * FROM xdr_data", "b"),
+        )
+
+    @patch("scripts.snapshot_cache.table_version")
+    def test_snapshot_reused_while_fresh(self, mock_table_version):
+        mock_table_version.return_value = '[[150001, "4/30/2019 0:01"]]'
+        loader = MagicMock(return_value=self.df)
+
+        first = load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+        second = load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+
+        # The loader only runs once and the dtypes survive the round trip
+        loader.assert_called_once()
+        pd.testing.assert_frame_equal(first, second)
+
+    @patch("scripts.snapshot_cache.table_version")
+    def test_snapshot_invalidated_when_stale(self, mock_table_version):
+        loader = MagicMock(return_value=self.df)
+
+        mock_table_version.return_value = '[[150001, "4/30/2019 0:01"]]'
+        load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+        mock_table_version.return_value = '[[150002, "4/30/2019 0:02"]]'
+        load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+
+        self.assertEqual(loader.call_count, 2)
+
+    @patch("scripts.snapshot_cache.table_version")
+    def test_eviction(self, mock_table_version):
+        mock_table_version.return_value = "[[1, null]]"
+        loader = MagicMock(return_value=self.df)
+
+        for i in range(3):
+            load_with_snapshot(
+                f"SELECT * FROM xdr_data LIMIT {i}",
+                loader,
+                snapshot_dir=self.snapshot_dir,
+            )
+            os.utime(
+                os.path.join(
+                    self.snapshot_dir,
+                    snapshot_key(f"SELECT * FROM xdr_data LIMIT {i}") + ".arrow",
+                ),
+                (i, i),
+            )
+
+        size = os.path.getsize(
+            os.path.join(
+                self.snapshot_dir,
+                snapshot_key("SELECT * FROM xdr_data LIMIT 2") + ".arrow",
+            )
+        )
+        evicted = evict_snapshots(self.snapshot_dir, max_bytes=size)
+
+        # The two least recently used snapshots are removed
+        self.assertEqual(
+            evicted,
+            [
+                snapshot_key("SELECT * FROM xdr_data LIMIT 0"),
+                snapshot_key("SELECT * FROM xdr_data LIMIT 1"),
+            ],
+        )
+        self.assertEqual(
+            len([f for f in os.listdir(self.snapshot_dir) if f.endswith(".arrow")]), 1
+        )
+
+    @patch("scripts.snapshot_cache.table_version")
+    def test_new_snapshot_survives_eviction(self, mock_table_version):
+        mock_table_version.return_value = "[[1, 1]]"
+        loader = MagicMock(return_value=self.df)
+
+        # A budget smaller than one snapshot evicts everything but the snapshot just
+        # written
+        load_with_snapshot(
+            "SELECT * FROM xdr_data LIMIT 0",
+            loader,
+            snapshot_dir=self.snapshot_dir,
+            max_bytes=1,
+        )
+        load_with_snapshot(
+            "SELECT * FROM xdr_data LIMIT 1",
+            loader,
+            snapshot_dir=self.snapshot_dir,
+            max_bytes=1,
+        )
+        load_with_snapshot(
+            "SELECT * FROM xdr_data LIMIT 1",
+            loader,
+            snapshot_dir=self.snapshot_dir,
+            max_bytes=1,
+        )
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(
+            sorted(os.listdir(self.snapshot_dir)),
+            sorted(
+                snapshot_key("SELECT * FROM xdr_data LIMIT 1") + ext
+                for ext in (".arrow", ".json")
+            ),
+        )
+
+    @patch("scripts.snapshot_cache._warned", set())
+    @patch("builtins.print")
+    @patch("scripts.snapshot_cache.get_connection")
+    def test_table_version_tells_untracked_from_unreachable(
+        self, mock_get_connection, mock_print
+    ):
+        undefined_table = Exception('relation "xdr_table_versions" does not exist')
+        undefined_table.pgcode = "42P01"
+        mock_get_connection.side_effect = undefined_table
+
+        self.assertEqual(table_version(), UNTRACKED)
+        self.assertEqual(table_version(), UNTRACKED)
+        self.assertEqual(mock_print.call_count, 1)
+        self.assertIn("create_version_tracking", mock_print.call_args[0][0])
+
+        mock_get_connection.side_effect = Exception("could not connect to server")
+        self.assertIsNone(table_version())
+        self.assertIsNone(table_version())
+        self.assertEqual(mock_print.call_count, 2)
+
+    @patch("scripts.snapshot_cache.table_version", return_value=UNTRACKED)
+    def test_untracked_bypasses_snapshot(self, mock_table_version):
+        loader = MagicMock(return_value=self.df)
+
+        load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+        load_with_snapshot(
+            "SELECT * FROM xdr_data", loader, snapshot_dir=self.snapshot_dir
+        )
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(os.listdir(self.snapshot_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from scripts.sql_pushdown import (
+    compile_aggregation,
+    compile_top_k_per_column,
+    check_backend,
+)
+from scripts.new_engagement_analysis import (
+    aggregate_metrics,
+    top_10_users_per_application,
+)
+from scripts.expriance_analytics import (
+    aggregate_per_customer as experience_per_customer,
+)
+from scripts.satisfaction_analysis import (
+    aggregate_per_customer as satisfaction_per_customer,
+)
+from scripts.users_overview import aggregate_user_data
+
+APPLICATIONS = [
+    "Social Media DL (Bytes)",
+    "Google DL (Bytes)",
+    "Email DL (Bytes)",
+    "Youtube DL (Bytes)",
+    "Netflix DL (Bytes)",
+    "Gaming DL (Bytes)",
+    "Other DL (Bytes)",
+]
+
+
+class TestSqlPushdown(unittest.TestCase):
+
+    def setUp(self):
+        # Synthetic sessions with missing values, stored in an in-memory SQL database
+        n = 2000
+        rng = np.random.default_rng(7)
+        data = {
+            "MSISDN/Number": rng.integers(0, 300, n).astype(float) + 33600000000,
+            "Bearer Id": rng.random(n) * 1e18,
+            "Dur. (ms)": rng.random(n) * 1e5,
+            "Total DL (Bytes)": rng.random(n) * 1e8,
+            "Total UL (Bytes)": rng.random(n) * 1e7,
+            "TCP DL Retrans. Vol (Bytes)": rng.random(n) * 1e6,
+            "Avg RTT DL (ms)": rng.random(n) * 100,
+            "Avg Bearer TP DL (kbps)": rng.random(n) * 1e4,
+            "Handset Type": rng.choice(
+                ["Samsung Galaxy A5", "Apple iPhone 6", "Huawei P20"], n
+            ),
+            # Few distinct start times, so sessions of a subscriber tie and fall back to
+            # the handset
+            "Start": pd.Timestamp("2019-04-04")
+            + pd.to_timedelta(rng.integers(0, 50, n), unit="h"),
+        }
+        for app in APPLICATIONS:
+            data[app] = rng.random(n) * 1e7
+        self.df = pd.DataFrame(data)
+        for column in [
+            "MSISDN/Number",
+            "Bearer Id",
+            "Dur. (ms)",
+            "TCP DL Retrans. Vol (Bytes)",
+            "Avg RTT DL (ms)",
+            "Handset Type",
+        ]:
+            self.df.loc[rng.random(n) < 0.05, column] = np.nan
+
+        self.connection = sqlite3.connect(":memory:")
+        self.df.assign(Start=self.df["Start"].dt.strftime("%Y-%m-%d %H:%M:%S")).to_sql(
+            "xdr_data", self.connection, index=False
+        )
+        # The pandas backend sees the sessions out of start order
+        self.sessions = self.df.sample(frac=1, random_state=3)
+
+        # Run the compiled SQL on SQLite, whose ISO start times sort chronologically as
+        # text
+        self.load_patch = patch(
+            "sql_pushdown.load_data_from_postgres",
+            side_effect=lambda query, method: pd.read_sql_query(query, self.connection),
+        )
+        self.order_patch = patch("sql_pushdown.SESSION_ORDER", '"Start"')
+        self.load_patch.start()
+        self.order_patch.start()
+
+    def tearDown(self):
+        self.load_patch.stop()
+        self.order_patch.stop()
+        self.connection.close()
+
+    def assert_same_table(self, result, expected):
+        pd.testing.assert_frame_equal(
+            result, expected, check_dtype=False, check_categorical=False, rtol=1e-9
+        )
+
+    def test_compile_aggregation(self):
+        sql = compile_aggregation({"avg_rtt": ("Avg RTT DL (ms)", "mean")})
+        self.assertIn('AVG("Avg RTT DL (ms)") AS "avg_rtt"', sql)
+        self.assertIn('GROUP BY "MSISDN/Number"', sql)
+        self.assertIn('WHERE "MSISDN/Number" IS NOT NULL', sql)
+
+        sql = compile_aggregation(
+            {"handset_type": ("Handset Type", "first")},
+            source="(SELECT * FROM xdr_data)",
+        )
+        self.assertIn(
+            'FIRST_VALUE("Handset Type") OVER (PARTITION BY "MSISDN/Number" '
+            'ORDER BY "Handset Type" IS NULL, "Start"::timestamp, "Handset Type") '
+            "AS first_0",
+            sql,
+        )
+        self.assertNotIn("ctid", sql)
+        self.assertIn('MAX(first_0) AS "handset_type"', sql)
+
+    def test_compile_top_k_per_column(self):
+        sql = compile_top_k_per_column(["Google DL (Bytes)", "Email DL (Bytes)"], k=5)
+        self.assertIn(
+            'ROW_NUMBER() OVER (ORDER BY "Email DL (Bytes)" DESC, "MSISDN/Number") '
+            "AS rank_1",
+            sql,
+        )
+        self.assertIn("rank_0 <= 5 OR rank_1 <= 5", sql)
+
+    def test_check_backend(self):
+        with self.assertRaises(ValueError):
+            check_backend("spark")
+
+    def test_aggregate_metrics_equivalence(self):
+        self.assert_same_table(
+            aggregate_metrics(backend="sql"), aggregate_metrics(self.sessions)
+        )
+
+    def test_aggregate_user_data_equivalence(self):
+        self.assert_same_table(
+            aggregate_user_data(backend="sql"), aggregate_user_data(self.sessions)
+        )
+
+    def test_aggregate_per_customer_equivalence(self):
+        self.assert_same_table(
+            experience_per_customer(backend="sql"),
+            experience_per_customer(self.sessions),
+        )
+        self.assert_same_table(
+            satisfaction_per_customer(backend="sql"),
+            satisfaction_per_customer(self.sessions),
+        )
+        chunks = [
+            self.sessions.iloc[start : start + 300]
+            for start in range(0, len(self.sessions), 300)
+        ]
+        for backend in ("pandas", "out_of_core", "parallel"):
+            self.assert_same_table(
+                experience_per_customer(backend="sql"),
+                experience_per_customer(iter(chunks), backend=backend),
+            )
+
+    def test_top_10_users_per_application_equivalence(self):
+        result = top_10_users_per_application(backend="sql")
+        expected = top_10_users_per_application(self.sessions)
+        self.assertEqual(list(result), list(expected))
+        for app in APPLICATIONS:
+            self.assert_same_table(result[app], expected[app].reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
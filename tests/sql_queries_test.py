@@ -1,7 +1,14 @@
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
-from scripts.sql_queries import execute_telecom_queries
+from scripts.sql_queries import (
+    execute_telecom_queries,
+    run_telecom_queries,
+    run_consolidated_telecom_queries,
+    slice_handset_summary,
+    TELECOM_QUERIES
+)
 
 class TestSQLQueries(unittest.TestCase):
 
@@ -78,5 +85,86 @@ class TestSQLQueries(unittest.TestCase):
             LIMIT 10;
         """, mock_engine)
 
+    @patch('scripts.sql_queries.get_engine')
+    @patch('scripts.sql_queries.pd.read_sql_query')
+    def test_run_telecom_queries_concurrently(self, mock_read_sql_query, mock_get_engine):
+        # Every query takes 0.2s and returns two rows
+        def slow_query(query, engine):
+            time.sleep(0.2)
+            return pd.DataFrame({'value': [1, 2]})
+        mock_read_sql_query.side_effect = slow_query
+
+        start = time.perf_counter()
+        results, report = run_telecom_queries(max_workers=len(TELECOM_QUERIES))
+        elapsed = time.perf_counter() - start
+
+        # Same result dict as the sequential run, plus one report row per query
+        self.assertEqual(list(results), list(TELECOM_QUERIES))
+        self.assertEqual(list(report['query']), list(TELECOM_QUERIES))
+        self.assertEqual(list(report['rows']), [2] * len(TELECOM_QUERIES))
+        self.assertTrue((report['seconds'] >= 0.2).all())
+        self.assertLess(elapsed, 0.2 * len(TELECOM_QUERIES) / 2)
+
+    @patch('scripts.sql_queries.run_telecom_queries')
+    def test_execute_telecom_queries_concurrent_flag(self, mock_run_telecom_queries):
+        mock_run_telecom_queries.return_value = ({'unique_imsi_count': pd.DataFrame()}, pd.DataFrame())
+
+        results = execute_telecom_queries('mock_db_url', concurrent=True, max_workers=3)
+
+        self.assertEqual(list(results), ['unique_imsi_count'])
+        mock_run_telecom_queries.assert_called_once_with('mock_db_url', max_workers=3, queries=TELECOM_QUERIES, cache=False)
+
+    @patch('scripts.sql_queries.run_telecom_queries')
+    def test_execute_telecom_queries_with_report(self, mock_run_telecom_queries):
+        report = pd.DataFrame({'query': ['unique_imsi_count'], 'rows': [1], 'seconds': [0.1]})
+        mock_run_telecom_queries.return_value = ({'unique_imsi_count': pd.DataFrame()}, report)
+
+        results, returned_report = execute_telecom_queries('mock_db_url', with_report=True)
+
+        self.assertEqual(list(results), ['unique_imsi_count'])
+        self.assertIs(returned_report, report)
+
+    def consolidated_summary(self):
+        # Result of CONSOLIDATED_SUMMARY_QUERY for a small dataset
+        return pd.DataFrame({
+            'Handset Manufacturer': ['Apple', 'Apple', 'Samsung', 'Samsung', 'Huawei', 'Sony', None],
+            'Handset Type': ['iPhone 6', 'iPhone 7', 'Galaxy S8', 'Galaxy A5', 'P20', 'Xperia', None],
+            'grouping_level': [0, 0, 0, 0, 0, 0, 3],
+            'count': [5, 3, 6, 1, 2, 1, 18],
+            'unique_imsi_count': [None, None, None, None, None, None, 12],
+            'duration_sum': [None, None, None, None, None, None, 3600.0],
+            'duration_count': [None, None, None, None, None, None, 18]
+        })
+
+    def test_slice_handset_summary(self):
+        results = slice_handset_summary(self.consolidated_summary())
+
+        self.assertEqual(results['unique_imsi_count']['unique_imsi_count'].iloc[0], 12)
+        self.assertEqual(results['average_duration']['average_duration'].iloc[0], 200.0)
+        self.assertEqual(list(results['top_10_handsets']['Handset Type'][:2]), ['Galaxy S8', 'iPhone 6'])
+        self.assertEqual(list(results['top_3_manufacturers']['Handset Manufacturer']), ['Apple', 'Samsung', 'Huawei'])
+        self.assertEqual(list(results['top_3_manufacturers']['count']), [8, 7, 2])
+
+        # Handsets are ranked within each manufacturer
+        top_5 = results['top_5_handsets_per_manufacturer']
+        self.assertEqual(list(top_5.columns), ['Handset Manufacturer', 'Handset Type', 'count'])
+        self.assertEqual(list(top_5['Handset Type']), ['iPhone 6', 'iPhone 7', 'P20', 'Galaxy S8', 'Galaxy A5'])
+
+    @patch('scripts.sql_queries.run_telecom_queries')
+    def test_run_consolidated_telecom_queries(self, mock_run_telecom_queries):
+        mock_run_telecom_queries.return_value = ({
+            'consolidated_summary': self.consolidated_summary(),
+            'total_data_usage': pd.DataFrame(),
+            'avg_rtt_by_location': pd.DataFrame(),
+            'user_behavior': pd.DataFrame()
+        }, pd.DataFrame())
+
+        results, _ = run_consolidated_telecom_queries()
+
+        # Four queries instead of eight, same result dict
+        queries = mock_run_telecom_queries.call_args[1]['queries']
+        self.assertEqual(list(queries), ['consolidated_summary', 'total_data_usage', 'avg_rtt_by_location', 'user_behavior'])
+        self.assertEqual(list(results), list(TELECOM_QUERIES))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from scripts.subscriber_summary import (
+    SUMMARY_METRICS,
+    upsert_sql,
+    trigger_sql,
+    create_subscriber_summary,
+    refresh_subscriber_summary,
+    projection_query,
+    load_user_metrics,
+)
+
+
+class TestSubscriberSummary(unittest.TestCase):
+
+    def mock_cursor(self, mock_get_connection):
+        mock_connection = mock_get_connection.return_value.__enter__.return_value
+        return (
+            mock_connection,
+            mock_connection.cursor.return_value.__enter__.return_value,
+        )
+
+    def test_upsert_sql_adds_every_metric(self):
+        sql = upsert_sql("xdr_staging")
+        self.assertIn("FROM xdr_staging AS new_rows", sql)
+        self.assertIn('WHERE "MSISDN/Number" IS NOT NULL', sql)
+        self.assertIn(
+            'array_agg("Handset Type" ORDER BY subscriber_summary_start("Start"::text) '
+            'NULLS LAST, "Handset Type")',
+            sql,
+        )
+        self.assertNotIn('"Start"::timestamp', sql)
+        # A stored handset is only replaced by one from an earlier session
+        self.assertIn(
+            "(EXCLUDED.handset_start, EXCLUDED.handset_type) "
+            "< (subscriber_summary.handset_start, subscriber_summary.handset_type)",
+            " ".join(sql.split()),
+        )
+        for name in SUMMARY_METRICS:
+            self.assertIn(f"{name} = subscriber_summary.{name} + EXCLUDED.{name}", sql)
+
+    def test_trigger_uses_transition_table(self):
+        function_sql, drop_sql, trigger = trigger_sql()
+        self.assertIn("FROM inserted_rows AS new_rows", function_sql)
+        self.assertIn("REFERENCING NEW TABLE AS inserted_rows", trigger)
+        self.assertIn("FOR EACH STATEMENT", trigger)
+
+    @patch("scripts.subscriber_summary.get_connection")
+    def test_create_tracks_versions(self, mock_get_connection):
+        mock_connection, mock_cursor = self.mock_cursor(mock_get_connection)
+
+        create_subscriber_summary(refresh=False)
+
+        statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertTrue(
+            any(
+                "CREATE TRIGGER xdr_data_version_bump" in statement
+                for statement in statements
+            )
+        )
+        self.assertTrue(
+            any(
+                "CREATE TRIGGER subscriber_summary_version_bump" in statement
+                for statement in statements
+            )
+        )
+        self.assertTrue(
+            any(
+                "FUNCTION subscriber_summary_start(value text)" in statement
+                for statement in statements
+            )
+        )
+        mock_connection.commit.assert_called_once()
+
+    @patch("scripts.subscriber_summary.get_connection")
+    def test_full_refresh(self, mock_get_connection):
+        mock_connection, mock_cursor = self.mock_cursor(mock_get_connection)
+
+        refresh_subscriber_summary()
+
+        statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertEqual(statements[0], "LOCK TABLE xdr_data IN SHARE MODE")
+        self.assertEqual(statements[1], "TRUNCATE subscriber_summary")
+        self.assertIn("FROM xdr_data AS new_rows", statements[2])
+        mock_connection.commit.assert_called_once()
+
+    @patch("scripts.subscriber_summary.get_connection")
+    def test_incremental_refresh(self, mock_get_connection):
+        mock_connection, mock_cursor = self.mock_cursor(mock_get_connection)
+
+        refresh_subscriber_summary(source="xdr_staging")
+
+        mock_cursor.execute.assert_called_once()
+        self.assertIn(
+            "FROM xdr_staging AS new_rows", mock_cursor.execute.call_args[0][0]
+        )
+
+    def test_projection_query(self):
+        sql = projection_query("engagement")
+        self.assertIn('bearer_sessions AS "sessions_frequency"', sql)
+        self.assertIn('total_dl + total_ul AS "total_data_volume"', sql)
+        with self.assertRaises(ValueError):
+            projection_query("unknown")
+
+    @patch("scripts.subscriber_summary.load_data_from_postgres")
+    def test_load_user_metrics(self, mock_load_data_from_postgres):
+        mock_load_data_from_postgres.return_value = pd.DataFrame(
+            {"MSISDN/Number": [1.0], "avg_rtt": [42.0]}
+        )
+
+        df = load_user_metrics("experience")
+
+        self.assertEqual(len(df), 1)
+        mock_load_data_from_postgres.assert_called_once_with(
+            projection_query("experience"), method="read_sql", cache=False
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from scripts.table_pager import (
+    build_page_query,
+    fetch_sql_page,
+    count_sql_rows,
+    indexed_columns,
+    parse_filter_value,
+    filter_mask,
+    frame_order,
+    fetch_frame_page,
+)
+
+
+class TestTablePager(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": pd.array(
+                    [33664962239, 33681854413, None, 33760627129, 33750343200],
+                    dtype="Int64",
+                ),
+                "Handset Type": pd.Categorical(
+                    [
+                        "Samsung Galaxy A5",
+                        "Apple iPhone 6",
+                        "Apple iPhone 7",
+                        None,
+                        "Huawei P20",
+                    ]
+                ),
+                "Dur. (ms)": pd.array(
+                    [1823652.0, 1365104.0, np.nan, 1361762.0, 1321509.0],
+                    dtype="float32",
+                ),
+            }
+        )
+
+    def test_build_page_query_offset(self):
+        query, params = build_page_query(
+            ["MSISDN/Number", "Dur. (ms)"],
+            filters=[("Dur. (ms)", ">", 1000)],
+            sort_by="Dur. (ms)",
+            descending=True,
+            page_size=20,
+            offset=40,
+        )
+        self.assertEqual(
+            query,
+            'SELECT "MSISDN/Number", "Dur. (ms)", "Bearer Id" AS _row_key '
+            'FROM xdr_data WHERE "Dur. (ms)" > %s '
+            'ORDER BY "Dur. (ms)" DESC NULLS LAST, "Bearer Id" DESC LIMIT 21 OFFSET 40',
+        )
+        self.assertEqual(params, [1000])
+
+    def test_build_page_query_keyset(self):
+        query, params = build_page_query(
+            ["Dur. (ms)"],
+            filters=[("Handset Type", "contains", "iphone")],
+            sort_by="Dur. (ms)",
+            after=(1365104.0, 1.3114e19),
+            offset=40,
+        )
+        self.assertIn('"Handset Type"::text ILIKE %s', query)
+        # A row comparison an index on the sort column can start from
+        self.assertIn(
+            '"Dur. (ms)" IS NOT NULL AND ("Dur. (ms)", "Bearer Id") > (%s, %s)', query
+        )
+        self.assertIn('ORDER BY "Dur. (ms)" ASC, "Bearer Id" ASC LIMIT', query)
+        self.assertNotIn("OFFSET", query)
+        self.assertEqual(params, ["%iphone%", 1365104.0, 1.3114e19])
+
+        query, params = build_page_query(
+            ["Dur. (ms)"], sort_by="Dur. (ms)", descending=True, after=(None, 1.3114e19)
+        )
+        self.assertIn(
+            'WHERE "Dur. (ms)" IS NULL AND "Bearer Id" < %s ORDER BY "Bearer Id" DESC',
+            query,
+        )
+        self.assertEqual(params, [1.3114e19])
+
+        query, _ = build_page_query(
+            ["Dur. (ms)"], filters=[("Start", ">=", pd.Timestamp("2019-04-25"))]
+        )
+        self.assertIn('"Start"::timestamp >= %s', query)
+
+        # Pages without a sort follow the row key, which UPDATE and VACUUM FULL leave in
+        # place
+        query, params = build_page_query(
+            ["Dur. (ms)"], after=(None, 1.3114e19), row_key="id"
+        )
+        self.assertIn('WHERE "id" > %s ORDER BY "id" LIMIT', query)
+        self.assertNotIn("ctid", query)
+        self.assertEqual(params, [1.3114e19])
+
+        with self.assertRaises(ValueError):
+            build_page_query(filters=[("Dur. (ms)", "LIKE", 1)])
+
+    @patch("scripts.table_pager.load_data_from_postgres")
+    def test_fetch_sql_page(self, mock_load_data):
+        mock_load_data.return_value = pd.DataFrame(
+            {"Dur. (ms)": [1.0, 2.0, 3.0], "_row_key": [11.0, 12.0, 13.0]}
+        )
+
+        df, cursor = fetch_sql_page(["Dur. (ms)"], sort_by="Dur. (ms)", page_size=2)
+
+        self.assertEqual(list(df.columns), ["Dur. (ms)"])
+        self.assertEqual(len(df), 2)
+        self.assertEqual(cursor, (2.0, 12.0))
+        self.assertIsNone(mock_load_data.call_args[1]["params"])
+        mock_load_data.assert_called_once()
+
+    @patch("scripts.table_pager.load_data_from_postgres")
+    def test_fetch_sql_page_completes_with_nulls(self, mock_load_data):
+        # The last rows with a sort value are followed by the first rows without one
+        mock_load_data.side_effect = [
+            pd.DataFrame({"Dur. (ms)": [3.0], "_row_key": [13.0]}),
+            pd.DataFrame({"Dur. (ms)": [np.nan, np.nan], "_row_key": [11.0, 15.0]}),
+        ]
+        df, cursor = fetch_sql_page(
+            ["Dur. (ms)"], sort_by="Dur. (ms)", page_size=2, after=(2.0, 12.0)
+        )
+
+        self.assertEqual(len(df), 2)
+        self.assertEqual(cursor, (None, 11.0))
+        nulls_query = mock_load_data.call_args_list[1][0][0]
+        self.assertIn(
+            '"Dur. (ms)" IS NULL ORDER BY "Bearer Id" ASC LIMIT 2', nulls_query
+        )
+
+        mock_load_data.side_effect = [
+            pd.DataFrame({"Dur. (ms)": [np.nan], "_row_key": [15.0]})
+        ]
+        df, cursor = fetch_sql_page(
+            ["Dur. (ms)"], sort_by="Dur. (ms)", page_size=2, after=cursor
+        )
+        self.assertEqual(len(df), 1)
+        self.assertIsNone(cursor)
+
+    @patch("scripts.table_pager.load_data_from_postgres")
+    def test_indexed_columns(self, mock_load_data):
+        mock_load_data.return_value = pd.DataFrame(
+            {"column": ["IMSI", "MSISDN/Number", "MSISDN/Number"]}
+        )
+        self.assertEqual(indexed_columns(), ["IMSI", "MSISDN/Number"])
+        self.assertEqual(mock_load_data.call_args[1]["params"], ["xdr_data"])
+
+        mock_load_data.return_value = None
+        self.assertIsNone(indexed_columns())
+
+    def test_parse_filter_value(self):
+        self.assertEqual(
+            parse_filter_value(self.df["Dur. (ms)"].dtype, ">", "1000"), 1000.0
+        )
+        self.assertEqual(
+            parse_filter_value(np.dtype("datetime64[ns]"), "<", "2019-04-25"),
+            pd.Timestamp("2019-04-25"),
+        )
+        self.assertEqual(
+            parse_filter_value(self.df["Handset Type"].dtype, "=", "Huawei P20"),
+            "Huawei P20",
+        )
+        self.assertEqual(
+            parse_filter_value(self.df["Dur. (ms)"].dtype, "contains", "13"), "13"
+        )
+        with self.assertRaises(ValueError):
+            parse_filter_value(self.df["Dur. (ms)"].dtype, ">", "abc")
+        with self.assertRaises(ValueError):
+            parse_filter_value(np.dtype("datetime64[ns]"), ">", "yesterday-ish")
+        with self.assertRaises(ValueError):
+            parse_filter_value(self.df["Handset Type"].dtype, "<", "Huawei P20")
+
+    @patch("scripts.table_pager.load_data_from_postgres")
+    def test_count_sql_rows_is_cached(self, mock_load_data):
+        mock_load_data.return_value = pd.DataFrame({"count": [150001]})
+
+        self.assertEqual(count_sql_rows([("IMSI", "=", 208201448079117)]), 150001)
+        self.assertTrue(mock_load_data.call_args[1]["cache"])
+        self.assertIn('WHERE "IMSI" = %s', mock_load_data.call_args[0][0])
+
+    def test_filter_mask(self):
+        self.assertEqual(
+            list(filter_mask(self.df, [("Handset Type", "contains", "IPHONE")])),
+            [False, True, True, False, False],
+        )
+        self.assertEqual(
+            list(filter_mask(self.df, [("Dur. (ms)", "<", 1362000)])),
+            [False, False, False, True, True],
+        )
+
+    def test_frame_order_and_pages(self):
+        order = frame_order(self.df, sort_by="Dur. (ms)")
+        self.assertEqual(list(order), [4, 3, 1, 0, 2])
+
+        order = frame_order(
+            self.df,
+            filters=[("Dur. (ms)", ">", 1322000)],
+            sort_by="Dur. (ms)",
+            descending=True,
+        )
+        self.assertEqual(list(order), [0, 1, 3])
+
+        page = fetch_frame_page(self.df, order, 1, page_size=2)
+        self.assertEqual(list(page["MSISDN/Number"]), [33760627129])
+
+
+if __name__ == "__main__":
+    unittest.main()
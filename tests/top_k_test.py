@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.top_k import top_k_positions, top_k_per_column
+from scripts.new_engagement_analysis import (
+    top_k_users_per_application,
+    top_10_users_per_application,
+)
+from scripts.xdr_schema import APPLICATION_COLUMNS
+
+
+class TestTopK(unittest.TestCase):
+
+    def setUp(self):
+        # Sample per-user table with many ties
+        rng = np.random.default_rng(3)
+        self.table = pd.DataFrame(
+            {
+                "MSISDN/Number": np.arange(500, dtype=float) + 1e10,
+                "a": rng.integers(0, 20, 500).astype(float),
+                "b": rng.random(500),
+                "c": np.where(rng.random(500) < 0.98, np.nan, 1.0),
+            }
+        )
+
+    def test_matches_nlargest_with_ties_and_nans(self):
+        for k in (1, 10, 37, 600):
+            top, _ = top_k_per_column(self.table, ["a", "b", "c"], k=k)
+            for column in ("a", "b", "c"):
+                expected = self.table[["MSISDN/Number", column]].nlargest(k, column)
+                pd.testing.assert_frame_equal(top[column], expected)
+
+    def test_zero_k(self):
+        positions = top_k_positions(np.ones((4, 2)), 0)
+        self.assertEqual([len(p) for p in positions], [0, 0])
+
+    def test_totals_are_ranked(self):
+        _, totals = top_k_per_column(self.table, ["a", "b", "c"], k=5)
+        self.assertEqual(list(totals.index), ["a", "b", "c"])
+        self.assertAlmostEqual(totals["a"], self.table["a"].sum())
+        self.assertAlmostEqual(totals["c"], self.table["c"].sum())
+
+    def test_top_k_users_per_application(self):
+        rng = np.random.default_rng(4)
+        sessions = pd.DataFrame(
+            {"MSISDN/Number": rng.integers(0, 50, 400).astype(float)}
+        )
+        for app in APPLICATION_COLUMNS:
+            sessions[app] = rng.random(400) * 1e6
+        top, totals = top_k_users_per_application(
+            sessions, k=3, applications=APPLICATION_COLUMNS
+        )
+        self.assertEqual(set(top), set(APPLICATION_COLUMNS))
+        for app in APPLICATION_COLUMNS:
+            expected = (
+                sessions.groupby("MSISDN/Number")[app]
+                .sum()
+                .reset_index()
+                .nlargest(3, app)
+            )
+            pd.testing.assert_frame_equal(top[app], expected)
+        pd.testing.assert_series_equal(
+            totals,
+            sessions[APPLICATION_COLUMNS].sum().sort_values(ascending=False),
+            check_names=False,
+        )
+        self.assertEqual(
+            len(top_10_users_per_application(sessions)["Gaming DL (Bytes)"]), 10
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
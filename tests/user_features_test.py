@@ -0,0 +1,171 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from scripts.user_features import (
+    build_user_features,
+    project_user_features,
+    is_user_features,
+    aggregate_per_user,
+    USER_FEATURES,
+)
+from scripts.users_overview import aggregate_user_data, USER_METRICS
+from scripts.new_engagement_analysis import (
+    aggregate_metrics,
+    top_10_users_per_application,
+    ENGAGEMENT_METRICS,
+)
+from scripts import expriance_analytics, satisfaction_analysis
+from scripts.xdr_schema import APPLICATION_COLUMNS
+
+APPLICATIONS = [column for column in APPLICATION_COLUMNS if " DL " in column]
+
+
+class TestUserFeatures(unittest.TestCase):
+
+    def setUp(self):
+        # Sample data for testing
+        rng = np.random.default_rng(0)
+        n = 200
+        data = {
+            "MSISDN/Number": rng.integers(0, 30, n).astype(float),
+            "Bearer Id": np.where(rng.random(n) < 0.1, np.nan, np.arange(n)),
+            "Dur. (ms)": rng.integers(1, 1000, n).astype(float),
+            "Total DL (Bytes)": rng.random(n) * 1e6,
+            "Total UL (Bytes)": rng.random(n) * 1e5,
+            "TCP DL Retrans. Vol (Bytes)": np.where(
+                rng.random(n) < 0.3, np.nan, rng.random(n) * 1e4
+            ),
+            "Avg RTT DL (ms)": rng.random(n) * 100,
+            "Handset Type": np.where(
+                rng.random(n) < 0.2, None, rng.choice(["A", "B", "C"], n)
+            ),
+            "Avg Bearer TP DL (kbps)": rng.random(n) * 1e3,
+        }
+        for app in APPLICATIONS:
+            data[app] = rng.random(n) * 1e5
+        self.df = pd.DataFrame(data)
+        self.df.loc[5, "MSISDN/Number"] = np.nan
+
+    def expected(self, spec):
+        return self.df.groupby("MSISDN/Number").agg(**spec).reset_index()
+
+    def test_build_user_features_uses_available_columns(self):
+        features = build_user_features(self.df)
+        self.assertTrue(is_user_features(features))
+        self.assertNotIn("Social Media UL (Bytes)", features.columns)
+        expected_features = [
+            name
+            for name, (column, _) in USER_FEATURES.items()
+            if column in self.df.columns
+        ]
+        pd.testing.assert_frame_equal(
+            features,
+            self.expected({name: USER_FEATURES[name] for name in expected_features}),
+            check_flags=False,
+        )
+
+    def test_build_user_features_groups_once(self):
+        with patch.object(
+            pd.DataFrame, "groupby", autospec=True, side_effect=pd.DataFrame.groupby
+        ) as mock_groupby:
+            build_user_features(self.df)
+        self.assertEqual(mock_groupby.call_count, 1)
+
+    def test_projections_match_groupby(self):
+        features = build_user_features(self.df)
+        for spec in (
+            USER_METRICS,
+            ENGAGEMENT_METRICS,
+            expriance_analytics.EXPERIENCE_METRICS,
+            satisfaction_analysis.CUSTOMER_METRICS,
+        ):
+            expected = self.expected(spec)
+            pd.testing.assert_frame_equal(
+                project_user_features(features, spec), expected
+            )
+            pd.testing.assert_frame_equal(
+                project_user_features(self.df, spec), expected
+            )
+
+    def test_analysis_functions_accept_features(self):
+        features = build_user_features(self.df)
+        for function in (
+            aggregate_user_data,
+            aggregate_metrics,
+            expriance_analytics.aggregate_per_customer,
+            satisfaction_analysis.aggregate_per_customer,
+        ):
+            pd.testing.assert_frame_equal(function(features), function(self.df))
+
+    def test_is_user_features_checks_columns(self):
+        features = build_user_features(self.df)
+        self.assertTrue(is_user_features(features))
+        self.assertTrue(
+            is_user_features(features[["MSISDN/Number", "sessions", "avg_rtt"]].copy())
+        )
+        self.assertFalse(is_user_features(self.df))
+        # Frames derived from a feature table are only feature tables if their columns
+        # still are
+        self.assertFalse(
+            is_user_features(features.rename(columns={"sessions": "Bearer Id"}))
+        )
+        self.assertFalse(
+            is_user_features(features.assign(sessions=features["sessions"].astype(str)))
+        )
+        self.assertFalse(is_user_features(pd.concat([features, features.head(1)])))
+        # Application totals alone look like sessions and grouping them again changes
+        # nothing
+        totals = features[["MSISDN/Number"] + APPLICATIONS]
+        self.assertFalse(is_user_features(totals))
+        pd.testing.assert_frame_equal(
+            top_10_users_per_application(totals)[APPLICATIONS[0]],
+            top_10_users_per_application(features)[APPLICATIONS[0]],
+        )
+
+    def test_chunked_features(self):
+        chunks = (self.df.iloc[i : i + 64] for i in range(0, len(self.df), 64))
+        pd.testing.assert_frame_equal(
+            build_user_features(chunks), build_user_features(self.df)
+        )
+
+    def test_top_10_users_per_application_matches_loop(self):
+        result = top_10_users_per_application(build_user_features(self.df))
+        for app in APPLICATIONS:
+            expected = (
+                self.df.groupby("MSISDN/Number")[app]
+                .sum()
+                .reset_index()
+                .nlargest(10, app)
+            )
+            pd.testing.assert_frame_equal(result[app], expected)
+
+    def test_missing_and_unknown_features(self):
+        features = build_user_features(self.df, ["sessions"])
+        with self.assertRaises(ValueError):
+            aggregate_metrics(features)
+        with self.assertRaises(ValueError):
+            project_user_features(self.df, {"max_duration": ("Dur. (ms)", "max")})
+
+    def test_aggregate_per_user_dispatches_backends(self):
+        expected = self.expected(ENGAGEMENT_METRICS)
+        for backend in ("pandas", "out_of_core", "parallel"):
+            pd.testing.assert_frame_equal(
+                aggregate_per_user(self.df, ENGAGEMENT_METRICS, backend), expected
+            )
+        with patch(
+            "scripts.user_features.aggregate_in_sql", return_value=expected
+        ) as aggregate:
+            self.assertIs(
+                aggregate_per_user(
+                    None, ENGAGEMENT_METRICS, "sql", source="xdr_sample"
+                ),
+                expected,
+            )
+        aggregate.assert_called_once_with(ENGAGEMENT_METRICS, source="xdr_sample")
+        with self.assertRaises(ValueError):
+            aggregate_per_user(self.df, ENGAGEMENT_METRICS, "spark")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.user_state import (
+    update_user_state,
+    load_user_state,
+    batch_state,
+    merge_states,
+    features_from_state,
+)
+from scripts.users_overview import aggregate_user_data
+from scripts.new_engagement_analysis import aggregate_metrics
+from scripts import expriance_analytics, satisfaction_analysis
+
+
+class TestUserState(unittest.TestCase):
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.state_dir, "user_state.arrow")
+        # Sample data for testing
+        rng = np.random.default_rng(1)
+        n = 300
+        self.df = pd.DataFrame(
+            {
+                "MSISDN/Number": rng.integers(0, 40, n).astype(float),
+                "Bearer Id": np.where(rng.random(n) < 0.1, np.nan, np.arange(n)),
+                "Dur. (ms)": rng.integers(1, 1000, n),
+                "Total DL (Bytes)": rng.random(n) * 1e6,
+                "Total UL (Bytes)": rng.random(n) * 1e5,
+                "TCP DL Retrans. Vol (Bytes)": np.where(
+                    rng.random(n) < 0.4, np.nan, rng.random(n) * 1e4
+                ),
+                "Avg RTT DL (ms)": rng.random(n) * 100,
+                "Handset Type": np.where(
+                    rng.random(n) < 0.5, None, rng.choice(["A", "B", "C"], n)
+                ),
+                "Avg Bearer TP DL (kbps)": rng.random(n) * 1e3,
+            }
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def batches(self):
+        return [self.df.iloc[:100], self.df.iloc[100:110], self.df.iloc[110:]]
+
+    def test_updates_match_full_history(self):
+        for i, batch in enumerate(self.batches()):
+            tables = update_user_state(batch, path=self.path, batch_id=f"day-{i}")
+
+        pd.testing.assert_frame_equal(
+            tables["user_overview"], aggregate_user_data(self.df)
+        )
+        pd.testing.assert_frame_equal(tables["engagement"], aggregate_metrics(self.df))
+        pd.testing.assert_frame_equal(
+            tables["experience"], expriance_analytics.aggregate_per_customer(self.df)
+        )
+        pd.testing.assert_frame_equal(
+            tables["satisfaction"],
+            satisfaction_analysis.aggregate_per_customer(self.df),
+        )
+
+        state, info = load_user_state(self.path)
+        self.assertEqual(info["rows"], len(self.df))
+        self.assertEqual(info["batches"], ["day-0", "day-1", "day-2"])
+
+    def test_variance_matches_groupby(self):
+        state = batch_state(self.df.iloc[:150])
+        state = merge_states(state, batch_state(self.df.iloc[150:]))
+        features = features_from_state(state)
+        expected = self.df.groupby("MSISDN/Number")["Avg RTT DL (ms)"].var(ddof=0)
+        np.testing.assert_allclose(features["var_rtt"], expected.to_numpy())
+
+    def test_batch_is_folded_once(self):
+        update_user_state(self.df, path=self.path, batch_id="day-0")
+        tables = update_user_state(self.df, path=self.path, batch_id="day-0")
+        pd.testing.assert_frame_equal(tables["engagement"], aggregate_metrics(self.df))
+
+    def test_batch_missing_tracked_columns(self):
+        update_user_state(self.df, path=self.path)
+        with self.assertRaises(ValueError):
+            update_user_state(self.df.drop(columns=["Avg RTT DL (ms)"]), path=self.path)
+
+    def test_partial_columns_only_return_covered_tables(self):
+        columns = [
+            "MSISDN/Number",
+            "Bearer Id",
+            "Dur. (ms)",
+            "Total DL (Bytes)",
+            "Total UL (Bytes)",
+        ]
+        tables = update_user_state(self.df[columns], path=self.path)
+        self.assertEqual(set(tables), {"features", "user_overview", "engagement"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.xdr_schema import (
+    XDR_SCHEMA,
+    COLUMN_SETS,
+    resolve_columns,
+    build_select_query,
+    apply_schema,
+)
+
+
+class TestXdrSchema(unittest.TestCase):
+
+    def setUp(self):
+        # Sample data shaped like the raw pandas-inferred load
+        n = 1000
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(
+            {
+                "Bearer Id": rng.integers(6.9e18, 9.0e18, n, dtype=np.int64).astype(
+                    float
+                ),
+                "MSISDN/Number": np.where(
+                    rng.random(n) < 0.1, np.nan, 33660000000 + rng.integers(0, 500, n)
+                ),
+                "Handset Type": rng.choice(
+                    ["Samsung Galaxy A5", "Apple iPhone 6", "Huawei P20"], n
+                ).astype(object),
+                "Total DL (Bytes)": rng.random(n) * 9e8,
+                "Avg RTT DL (ms)": rng.random(n) * 100,
+            }
+        )
+
+    def test_schema_covers_every_column(self):
+        self.assertEqual(len(XDR_SCHEMA), 55)
+        for columns in COLUMN_SETS.values():
+            self.assertEqual(resolve_columns(columns), columns)
+
+    def test_resolve_columns(self):
+        self.assertEqual(resolve_columns(), list(XDR_SCHEMA))
+        self.assertEqual(len(resolve_columns("experience")), 6)
+        with self.assertRaises(ValueError):
+            resolve_columns("unknown")
+        with self.assertRaises(ValueError):
+            resolve_columns(["Not a column"])
+
+    def test_build_select_query(self):
+        query = build_select_query(
+            ["MSISDN/Number", "Dur. (ms)"], where='"Dur. (ms)" > 0'
+        )
+        self.assertEqual(
+            query,
+            'SELECT "MSISDN/Number", "Dur. (ms)" FROM xdr_data WHERE "Dur. (ms)" > 0',
+        )
+
+    def test_counters_keep_byte_precision(self):
+        # float32 would round a per-session byte count of this size to a multiple of 128
+        df = apply_schema(
+            pd.DataFrame(
+                {"Total DL (Bytes)": [2**31 + 1.0], "Dur. (ms)": [2**25 + 1.0]}
+            )
+        )
+        self.assertEqual(df["Total DL (Bytes)"].iloc[0], 2**31 + 1)
+        self.assertEqual(df["Dur. (ms)"].iloc[0], 2**25 + 1)
+
+    def test_apply_schema(self):
+        before = self.df.memory_usage(deep=True).sum()
+        df = apply_schema(self.df.copy())
+        self.assertEqual(str(df["MSISDN/Number"].dtype), "Int64")
+        self.assertEqual(
+            df["MSISDN/Number"].isna().sum(), self.df["MSISDN/Number"].isna().sum()
+        )
+        self.assertEqual(str(df["Bearer Id"].dtype), "UInt64")
+        self.assertEqual(str(df["Handset Type"].dtype), "category")
+        self.assertEqual(df["Total DL (Bytes)"].dtype, np.float64)
+        self.assertEqual(df["Avg RTT DL (ms)"].dtype, np.float32)
+        self.assertLess(df.memory_usage(deep=True).sum(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()